@@ -0,0 +1,67 @@
+"""
+Hash many files with `sha256sum`: the builtin with one thread and
+with the thread pool, and an external process per file
+
+Usage:
+    python -m benchmarks.checksum [FILES] [MEGABYTES]
+
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from src.checksum import DEFAULT_WORKERS, hashFiles
+
+REPEATS: int = 3
+
+
+def bestTime(run) -> float:
+    best: float = float('inf')
+
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def main() -> None:
+    files: int = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    megabytes: int = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+
+    with tempfile.TemporaryDirectory() as root:
+        paths: list[str] = []
+
+        for i in range(files):
+            path = os.path.join(root, f'artifact{i}.bin')
+
+            with open(path, 'wb') as f:
+                f.write(os.urandom(megabytes << 20))
+
+            paths.append(path)
+
+        runs = {
+            'one thread': lambda: list(hashFiles(paths, 'sha256', 1)),
+            f'pool of {DEFAULT_WORKERS}':
+                lambda: list(hashFiles(paths, 'sha256')),
+        }
+
+        external = shutil.which('sha256sum')
+        if external:
+            runs['external'] = lambda: [
+                subprocess.run([external, p], stdout=subprocess.DEVNULL)
+                for p in paths]
+
+        for name, run in runs.items():
+            elapsed = bestTime(run)
+            print(f'{name:>12}: {elapsed:6.2f} s, '
+                  f'{files * megabytes / elapsed:7.1f} MB/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Run many small commands in one session, like a script does,
+and report the best time per command of some repeats
+
+Usage:
+    python -m benchmarks.commands [RUNS]
+
+"""
+
+import io
+import sys
+import time
+
+from src.session import Session
+
+COMMANDS: list[str] = ['echo 42 | grep -w 4.', 'echo a b c | wc',
+                       'echo 3 1 2 | sort -n | head -n 1', 'echo $x',
+                       'y=$(echo a b | wc -w)']
+REPEATS: int = 5
+
+
+def main() -> None:
+    runs: int = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    session = Session(stdin=io.StringIO())
+    session.getCmdResult('x=42')
+
+    for line in COMMANDS:
+        best: float = float('inf')
+
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+
+            for _ in range(runs):
+                session.getCmdResult(line)
+
+            best = min(best, time.perf_counter() - start)
+
+        print(f'{line:>36}: {best / runs * 1e6:7.1f} us')
+
+    # the same commands in a loop body, which is compiled once
+    session.getCmdResult(f'n="{" ".join(map(str, range(runs)))}"')
+    body: str = '; '.join(COMMANDS)
+    start = time.perf_counter()
+    session.getCmdResult(f'for i in $n; do {body}; done')
+    elapsed = time.perf_counter() - start
+
+    print(f'{"for loop, per iteration":>36}: '
+          f'{elapsed / runs * 1e6:7.1f} us')
+
+    session.endSession()
+
+
+if __name__ == '__main__':
+    main()
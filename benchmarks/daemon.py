@@ -0,0 +1,71 @@
+"""
+Compare running a command with a new interpreter per command
+(`python -m src.main`) and with the shell daemon and its thin client
+
+Usage:
+    python -m benchmarks.daemon [RUNS]
+
+"""
+
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from src.client import runCommands
+from src.daemon import ShellServer
+
+COMMAND: str = 'echo 42 | wc'
+
+
+def coldRun() -> bytes:
+    return subprocess.run([sys.executable, '-m', 'src.main'],
+                          input=f'{COMMAND}\n'.encode(),
+                          capture_output=True).stdout
+
+
+def clientRun(path: str) -> bytes:
+    return subprocess.run([sys.executable, '-m', 'src.client',
+                           '-s', path, COMMAND],
+                          capture_output=True).stdout
+
+
+def inProcessRun(path: str) -> bytes:
+    out = io.BytesIO()
+    runCommands([COMMAND], path, out)
+    return out.getvalue()
+
+
+def measure(fn, runs: int, *args) -> float:
+    start = time.perf_counter()
+
+    for _ in range(runs):
+        fn(*args)
+
+    return (time.perf_counter() - start) / runs * 1000
+
+
+def main() -> None:
+    runs: int = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    with tempfile.TemporaryDirectory() as tmpDir:
+        path = os.path.join(tmpDir, 'sd.sock')
+
+        with ShellServer(path) as server:
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+
+            print(f'{"new interpreter":>20}: '
+                  f'{measure(coldRun, runs):7.2f} ms')
+            print(f'{"client process":>20}: '
+                  f'{measure(clientRun, runs, path):7.2f} ms')
+            print(f'{"client in process":>20}: '
+                  f'{measure(inProcessRun, runs, path):7.2f} ms')
+
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Walk a directory tree with the `find` builtin and with the external
+`find`, and report the time to the first path and to the end
+
+Usage:
+    python -m benchmarks.find [DIR]
+
+"""
+
+import io
+import shutil
+import sys
+import time
+
+from src.session import Session
+
+REPEATS: int = 3
+
+
+def measure(session: Session, line: str) -> tuple[float, float, int]:
+    """
+    Returns:
+        float: the best time to the first chunk of the output
+        float: the best time to the end
+        int: the count of paths
+
+    """
+
+    first, total = float('inf'), float('inf')
+    count: int = 0
+
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        output = session.streamCmdResult(line)
+
+        try:
+            chunk = next(output, '')
+            first = min(first, time.perf_counter() - start)
+            # the session ends the output with one more newline
+            count = chunk.count('\n') - 1 + \
+                sum(c.count('\n') for c in output)
+        finally:
+            output.close()
+
+        total = min(total, time.perf_counter() - start)
+
+    return first, total, count
+
+
+def main() -> None:
+    root: str = sys.argv[1] if len(sys.argv) > 1 else '/usr'
+    session = Session(stdin=io.StringIO())
+    lines: list[str] = [f'find {root} -name "*.py"']
+
+    external = shutil.which('find')
+    if external:
+        lines.append(f'{external} {root} -name "*.py"')
+
+    for line in lines:
+        first, total, count = measure(session, line)
+        print(f'{line:>40}: {count} paths, first in {first * 1e3:7.1f} ms, '
+              f'all in {total * 1e3:7.1f} ms')
+
+    session.endSession()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Glob a large directory many times and report the best time per glob
+with the directory listing cache and without it
+
+Usage:
+    python -m benchmarks.globs [ENTRIES] [RUNS]
+
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from src.globbing import DirCache, expandGlob
+
+PATTERNS: list[str] = ['*7.txt', 'f1[0-2]*', 'nomatch*']
+REPEATS: int = 5
+
+
+def bestTime(pattern: str, root: str, cache: DirCache, runs: int) -> float:
+    best: float = float('inf')
+
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+
+        for _ in range(runs):
+            expandGlob(pattern, root, cache)
+
+        best = min(best, time.perf_counter() - start)
+
+    return best / runs
+
+
+def main() -> None:
+    entries: int = int(sys.argv[1]) if len(sys.argv) > 1 else 30000
+    runs: int = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    with tempfile.TemporaryDirectory() as root:
+        for i in range(entries):
+            open(os.path.join(root, f'f{i}.txt'), 'w').close()
+
+        # a directory changed just now isn't cached
+        old: float = time.time() - 60
+        os.utime(root, (old, old))
+
+        for pattern in PATTERNS:
+            listed = bestTime(pattern, root, DirCache(0), runs)
+            cached = bestTime(pattern, root, DirCache(), runs)
+
+            print(f'{pattern:>12}: {listed * 1e3:7.2f} ms listed, '
+                  f'{cached * 1e3:7.2f} ms cached')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Run many sessions at once in a thread pool, each one in its own
+directory, and report the throughput of commands
+
+Usage:
+    python -m benchmarks.sessions [SESSIONS] [WORKERS]
+
+"""
+
+import io
+import os
+import sys
+import tempfile
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from src.filecache import FileCache
+from src.session import Session
+
+COMMANDS: list[str] = ['cat words.txt | grep 7 | wc', 'sort words.txt | head',
+                       'echo $n > out.txt', 'cat out.txt', 'pwd']
+ROUNDS: int = 20
+
+
+def runSession(root: str, num: int, fileCache: FileCache) -> int:
+    session = Session(fileCache=fileCache, stdin=io.StringIO())
+    home = os.path.join(root, str(num))
+
+    try:
+        session.getCmdResult(f'cd {home}')
+        session.getCmdResult(f'n={num}')
+
+        for _ in range(ROUNDS):
+            for line in COMMANDS:
+                session.getCmdResult(line).close()
+    finally:
+        session.endSession()
+
+    return ROUNDS * len(COMMANDS)
+
+
+def main() -> None:
+    sessions: int = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    workers: int = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    fileCache = FileCache()
+
+    with tempfile.TemporaryDirectory() as root:
+        for num in range(sessions):
+            os.mkdir(os.path.join(root, str(num)))
+
+            with open(os.path.join(root, str(num), 'words.txt'), 'w') as f:
+                f.writelines(f'{num} {i}\n' for i in range(1000))
+
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            cmds = sum(pool.map(lambda n: runSession(root, n, fileCache),
+                                range(sessions)))
+
+        elapsed = time.perf_counter() - start
+
+    print(f'{sessions} sessions, {workers} workers: {cmds} commands '
+          f'in {elapsed:.2f} s, {cmds / elapsed:.0f} commands/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Compare the cost of starting an external command with
+`subprocess.Popen` (the old ExternalExecutor path) and with
+`src.launcher` (os.posix_spawn), while the interpreter grows
+
+Usage:
+    python -m benchmarks.spawn [RUNS] [MAX_BALLAST_MB]
+
+"""
+
+import shutil
+import subprocess
+import sys
+import time
+
+from src import launcher
+
+
+def popenRun(path: str) -> bytes:
+    proc = subprocess.Popen([path], stdin=subprocess.PIPE,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    return proc.communicate(b'')[0]
+
+
+def spawnRun(path: str) -> bytes:
+    return launcher.spawn(path, [path]).communicate(b'')
+
+
+def measure(fn, path: str, runs: int) -> float:
+    start = time.perf_counter()
+
+    for _ in range(runs):
+        fn(path)
+
+    return (time.perf_counter() - start) / runs * 1e6
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    maxBallast = int(sys.argv[2]) if len(sys.argv) > 2 else 1024
+    path = shutil.which('true')
+
+    ballast: list[bytearray] = []
+    ballastMb = 0
+
+    print(f'{"RSS+, MB":>10} {"Popen, us":>12} {"posix_spawn, us":>16}')
+
+    while ballastMb <= maxBallast:
+        popenCost = measure(popenRun, path, runs)
+        spawnCost = measure(spawnRun, path, runs)
+        print(f'{ballastMb:>10} {popenCost:>12.1f} {spawnCost:>16.1f}')
+
+        step = max(ballastMb, 128)
+        # touch the pages, so they are really mapped
+        ballast.append(bytearray(b'x' * (step << 20)))
+        ballastMb += step
+
+
+if __name__ == '__main__':
+    main()
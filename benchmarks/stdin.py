@@ -0,0 +1,61 @@
+"""
+Feed a large file to the shell through a pipe after a command
+which reads it from the console, and report the throughput
+
+Usage:
+    python -m benchmarks.stdin [MEGABYTES]
+
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+COMMANDS: list[str] = ['wc', 'cat', 'cat | wc', 'grep 999 | wc -l']
+
+
+def run(command: str, data: str) -> float:
+    env = dict(os.environ)
+    env.pop('PYTHONUNBUFFERED', None)
+
+    # the output goes to a file, like in a batch job
+    with open(data, 'rb') as f, tempfile.TemporaryFile() as out:
+        start = time.perf_counter()
+        shell = subprocess.Popen([sys.executable, '-m', 'src.main'],
+                                 stdin=subprocess.PIPE, stdout=out, env=env)
+        shell.stdin.write(f'{command}\n'.encode())
+
+        while True:
+            block = f.read(1 << 20)
+            if not block:
+                break
+            shell.stdin.write(block)
+
+        shell.stdin.close()
+        shell.wait()
+
+        return time.perf_counter() - start
+
+
+def main() -> None:
+    megabytes: int = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+
+    with tempfile.NamedTemporaryFile('w', suffix='.txt') as f:
+        num: int = 0
+
+        while f.tell() < megabytes << 20:
+            f.write(f'line {num} of some words {num * 7}\n')
+            num += 1
+
+        f.flush()
+
+        for command in COMMANDS:
+            elapsed = run(command, f.name)
+            print(f'{command:>16}: {elapsed:6.2f} s, '
+                  f'{megabytes / elapsed:7.1f} MB/s')
+
+
+if __name__ == '__main__':
+    main()
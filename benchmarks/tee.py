@@ -0,0 +1,90 @@
+"""
+Copy a large file to several files with the `tee` builtin and with
+the external `tee`, and with the writers of the builtin in threads
+and in the calling thread
+
+Usage:
+    python -m benchmarks.tee [MEGABYTES] [FILES]
+
+"""
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from src.fanout import FanOut
+from src.session import Session
+
+REPEATS: int = 3
+
+
+def bestTime(session: Session, line: str) -> float:
+    best: float = float('inf')
+
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        session.getCmdResult(line)
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def fanOutTime(source: str, paths: list[str], parallel: bool) -> float:
+    best: float = float('inf')
+
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+
+        with open(source, 'rb') as f, FanOut(paths, parallel=parallel) as out:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                out.write(block)
+
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def main() -> None:
+    megabytes: int = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    files: int = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    with tempfile.TemporaryDirectory() as root:
+        with open(os.path.join(root, 'in.txt'), 'w') as f:
+            num: int = 0
+
+            while f.tell() < megabytes << 20:
+                f.write(f'line {num} of some words {num * 7}\n')
+                num += 1
+
+        session = Session(stdin=io.StringIO())
+        session.getCmdResult(f'cd {root}')
+
+        outputs = ' '.join(f'out{i}.txt' for i in range(files))
+        lines: dict[str, str] = {
+            'builtin': f'tee {outputs} < in.txt > /dev/null'}
+
+        external = shutil.which('tee')
+        if external:
+            lines['external'] = f'{external} {outputs} < in.txt > /dev/null'
+
+        for name, line in lines.items():
+            elapsed = bestTime(session, line)
+            print(f'{name:>10}: {elapsed:6.2f} s, '
+                  f'{megabytes * files / elapsed:7.1f} MB/s written')
+
+        paths = [os.path.join(root, f'out{i}.txt') for i in range(files)]
+
+        for parallel in (True, False):
+            elapsed = fanOutTime(os.path.join(root, 'in.txt'), paths,
+                                 parallel)
+            name = 'threads' if parallel else 'serial'
+
+            print(f'{name:>10}: {elapsed:6.2f} s, '
+                  f'{megabytes * files / elapsed:7.1f} MB/s written')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,650 @@
+from __future__ import annotations
+from typing import Callable, Iterator, Optional, TYPE_CHECKING
+from .clparser import CmdIR
+from .executor import CmdExecutor, ExternalExecutor, processCmd
+from .executor import DECODE_ERRORS, closeStream, openRedirects
+from .spillbuffer import SpillBuffer
+import asyncio
+import codecs
+import os
+import threading
+
+if TYPE_CHECKING:
+    from .session import Session
+
+_READ_SIZE: int = 64 * 1024
+
+# the most chars a channel holds, then its writer waits
+_CHANNEL_SIZE: int = 4 * _READ_SIZE
+
+
+def _resolve(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class _Channel:
+    """
+    Passes the text from one stage of the pipeline to the next one.
+    A builtin uses it from its thread with blocking calls, an external
+    command from coroutines of the event loop. The writer waits while
+    `_CHANNEL_SIZE` chars aren't read, the reader takes all the written
+    text at once, so lines are passed in batches when the reader is slow
+
+    The writer ends the channel when it's done. The reader closes it
+    when it doesn't read anymore, then the written text is dropped
+    and the writer is told to stop
+
+    """
+
+    def __init__(self) -> None:
+        self.__chunks: list[str] = []
+        self.__size: int = 0
+        self.__ended: bool = False
+        self.__closed: bool = False
+        self.__cond = threading.Condition(threading.Lock())
+        # threads and coroutines which wait for the channel,
+        # the others aren't woken on each write
+        self.__sleepers: int = 0
+        self.__waiters: list[asyncio.Future] = []
+
+    def write(self, text: str) -> bool:
+        """
+        Write from a thread, it waits while the channel is full
+
+        Returns:
+            bool: False if the reader is gone
+
+        """
+
+        with self.__cond:
+            self.__sleep(self.__canWrite)
+            return self.__put(text)
+
+    async def awrite(self, text: str) -> bool:
+        """
+        The same as `write`, but for a coroutine
+
+        """
+
+        await self.__wait(self.__canWrite)
+
+        with self.__cond:
+            return self.__put(text)
+
+    def read(self) -> str:
+        """
+        Read from a thread, it waits for the text
+
+        Returns:
+            str: all the text written since the last read,
+                empty at the end
+
+        """
+
+        with self.__cond:
+            self.__sleep(self.__canRead)
+            return self.__take()
+
+    async def aread(self) -> str:
+        """
+        The same as `read`, but for a coroutine
+
+        """
+
+        await self.__wait(self.__canRead)
+
+        with self.__cond:
+            return self.__take()
+
+    def lines(self) -> Iterator[str]:
+        """
+        Read lines from a thread, the input of a builtin
+
+        """
+
+        partial: str = ''
+
+        while True:
+            text = self.read()
+            if not text:
+                break
+
+            lines = (partial + text).split('\n')
+            partial = lines.pop()
+            for line in lines:
+                yield f'{line}\n'
+
+        if partial:
+            yield partial
+
+    async def waitClosed(self) -> None:
+        await self.__wait(lambda: self.__closed)
+
+    def end(self) -> None:
+        """
+        The writer is done, the reader gets the rest of the text
+
+        """
+
+        with self.__cond:
+            self.__ended = True
+            self.__wake()
+
+    def close(self) -> None:
+        """
+        The reader is gone, the writer stops at its next write
+
+        """
+
+        with self.__cond:
+            self.__closed = True
+            self.__chunks.clear()
+            self.__size = 0
+            self.__wake()
+
+    def __canWrite(self) -> bool:
+        return self.__closed or self.__size < _CHANNEL_SIZE
+
+    def __canRead(self) -> bool:
+        return bool(self.__chunks) or self.__ended or self.__closed
+
+    def __put(self, text: str) -> bool:
+        if self.__closed or self.__ended:
+            return False
+
+        if text:
+            self.__chunks.append(text)
+            self.__size += len(text)
+            self.__wake()
+
+        return True
+
+    def __take(self) -> str:
+        text: str = ''.join(self.__chunks)
+        self.__chunks.clear()
+        self.__size = 0
+
+        if text:
+            # the writer may go on
+            self.__wake()
+
+        return text
+
+    def __sleep(self, ready: Callable[[], bool]) -> None:
+        while not ready():
+            self.__sleepers += 1
+            try:
+                self.__cond.wait()
+            finally:
+                self.__sleepers -= 1
+
+    def __wake(self) -> None:
+        if self.__sleepers:
+            self.__cond.notify_all()
+
+        for waiter in self.__waiters:
+            waiter.get_loop().call_soon_threadsafe(_resolve, waiter)
+        self.__waiters.clear()
+
+    async def __wait(self, ready: Callable[[], bool]) -> None:
+        loop = asyncio.get_running_loop()
+
+        while True:
+            with self.__cond:
+                if ready():
+                    return
+                waiter = loop.create_future()
+                self.__waiters.append(waiter)
+
+            try:
+                await waiter
+            finally:
+                with self.__cond:
+                    if waiter in self.__waiters:
+                        self.__waiters.remove(waiter)
+
+
+def _runStopping(executor: CmdExecutor, source: Optional[_Channel],
+                 output: _Channel) -> None:
+    """
+    Run the builtin in its thread. A thread can't be killed,
+    so the builtin is stopped when it's cancelled: at its next line
+    of output or, like `tail -f`, while it waits. It's also stopped
+    when the next command doesn't read its output anymore
+
+    """
+
+    lines = executor.streamRedirected(
+        None if source is None else source.lines())
+
+    try:
+        for line in lines:
+            if executor.cancelled.is_set() or not output.write(line):
+                break
+    finally:
+        closeStream(lines)
+
+        if source is not None:
+            source.close()
+        output.end()
+
+
+def _inThread(fn: Callable[..., None], *args) -> asyncio.Future:
+    """
+    Run the function in a new thread. Not in a pool: the builtins
+    of a pipeline wait for each other, so they all must run at once.
+    And not in the loop default executor: `asyncio.run` would wait
+    for a cancelled builtin until it notices it
+
+    """
+
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def done(error: Optional[BaseException]) -> None:
+        if future.done():
+            return
+
+        if error is None:
+            future.set_result(None)
+        else:
+            future.set_exception(error)
+
+    def run() -> None:
+        error: Optional[BaseException] = None
+
+        try:
+            fn(*args)
+        except BaseException as e:
+            error = e
+
+        try:
+            loop.call_soon_threadsafe(done, error)
+        except RuntimeError:
+            # the loop is closed, the builtin was cancelled
+            pass
+
+    threading.Thread(target=run, name='builtin', daemon=True).start()
+
+    return future
+
+
+def _whenClosed(channel: _Channel, stop: Callable[[], None]) -> asyncio.Task:
+    """
+    Call `stop` when the reader of the channel is gone: like in
+    `streamCommand`, a command which isn't read anymore is stopped,
+    even while it waits for its input
+
+    """
+
+    async def watch() -> None:
+        await channel.waitClosed()
+        stop()
+
+    return asyncio.ensure_future(watch())
+
+
+class _Pipeline:
+    """
+    Runs one pipeline in the event loop
+
+    All commands run at the same time: consecutive external commands
+    are connected with OS pipes, builtins run in their threads,
+    the others are connected with channels.
+
+    Args:
+        cmdTimeout (float): the time limit for each command
+
+    Attributes:
+        procs (list[asyncio.subprocess.Process]): started children
+
+    """
+
+    def __init__(self, cmdTimeout: Optional[float] = None) -> None:
+        self.cmdTimeout = cmdTimeout
+        self.procs: list[asyncio.subprocess.Process] = []
+
+    async def run(self, executors: list[CmdExecutor],
+                  output: _Channel) -> None:
+        channels: list[_Channel] = []
+        tasks: list[asyncio.Future] = []
+        source: Optional[_Channel] = None
+        i = 0
+
+        try:
+            while i < len(executors):
+                j = i
+                while j < len(executors) and \
+                        isinstance(executors[j], ExternalExecutor):
+                    j += 1
+
+                j = max(j, i + 1)
+                sink = output if j == len(executors) else _Channel()
+
+                if sink is not output:
+                    channels.append(sink)
+
+                if isinstance(executors[i], ExternalExecutor):
+                    stage = self._runExternals(executors[i:j], source, sink)
+                else:
+                    stage = self._runBuiltin(executors[i], source, sink)
+
+                tasks.append(asyncio.ensure_future(stage))
+                source = sink
+                i = j
+
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+            # builtins which wait for their input or their reader go on
+            for channel in channels:
+                channel.close()
+
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self._killAll()
+
+    async def _runBuiltin(self, executor: CmdExecutor,
+                          source: Optional[_Channel],
+                          output: _Channel) -> None:
+        def stop() -> None:
+            executor.cancelled.set()
+            if source is not None:
+                source.close()
+
+        future = _inThread(_runStopping, executor, source, output)
+        unread = _whenClosed(output, stop)
+
+        try:
+            await self._withTimeout(future, executor.name)
+        except BaseException:
+            # a timeout of the command or of the whole pipeline
+            executor.cancelled.set()
+            raise
+        finally:
+            unread.cancel()
+
+    async def _runExternals(self, executors: list[ExternalExecutor],
+                            source: Optional[_Channel],
+                            output: _Channel) -> None:
+        PIPE: int = asyncio.subprocess.PIPE
+        stdin: int = PIPE
+        procs: list[asyncio.subprocess.Process] = []
+
+        try:
+            for num, executor in enumerate(executors):
+                readEnd: Optional[int] = None
+                stdout: int = PIPE
+
+                # the parent closes its copies after the spawn
+                parentFds: list[int] = [] if stdin == PIPE else [stdin]
+
+                try:
+                    if num + 1 < len(executors):
+                        readEnd, stdout = os.pipe()
+                        parentFds.append(stdout)
+
+                    redirectIn, redirectOut = openRedirects(
+                        executor.redirects, executor._cwd())
+
+                    if redirectIn is not None:
+                        stdin = redirectIn
+                        parentFds.append(redirectIn)
+
+                    if redirectOut is not None:
+                        # the next command gets EOF at once
+                        stdout = redirectOut
+                        parentFds.append(redirectOut)
+
+                    procs.append(await self._spawn(executor, stdin, stdout))
+                except BaseException:
+                    if readEnd is not None:
+                        os.close(readEnd)
+                    raise
+                finally:
+                    for fd in parentFds:
+                        os.close(fd)
+
+                stdin = readEnd
+        except BaseException:
+            if source is not None:
+                source.close()
+            output.end()
+            raise
+
+        def stop() -> None:
+            if source is not None:
+                source.close()
+
+            for proc in procs:
+                if proc.returncode is None:
+                    try:
+                        proc.terminate()
+                    except ProcessLookupError:
+                        pass
+
+        tasks = [self._feed(procs[0], source),
+                 self._collect(procs[-1], output)]
+        tasks += [self._wait(p, e.name) for p, e in zip(procs, executors)]
+        unread = _whenClosed(output, stop)
+
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            unread.cancel()
+
+    async def _spawn(self, executor: ExternalExecutor,
+                     stdin: int, stdout: int) -> asyncio.subprocess.Process:
+        fullPath = executor._findPath()
+        session = executor.session
+        env = None if session is None else session.env
+
+        async def spawn(path: Optional[str]) -> asyncio.subprocess.Process:
+            if path is None:
+                raise FileNotFoundError(2, 'No such file or directory',
+                                        executor.name)
+
+            return await asyncio.create_subprocess_exec(
+                executor.name, *executor.args, executable=path,
+                stdin=stdin, stdout=stdout, cwd=executor._cwd(), env=env)
+
+        try:
+            proc = await spawn(fullPath)
+        except OSError as e:
+            proc = await spawn(executor._rehash(fullPath, e))
+
+        self.procs.append(proc)
+
+        return proc
+
+    async def _feed(self, proc: asyncio.subprocess.Process,
+                    source: Optional[_Channel]) -> None:
+        try:
+            if proc.stdin is None:
+                return
+
+            try:
+                while source is not None:
+                    text = await source.aread()
+                    if not text:
+                        break
+                    proc.stdin.write(text.encode('utf-8', DECODE_ERRORS))
+                    await proc.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                # the command doesn't read its input
+                pass
+            finally:
+                proc.stdin.close()
+        finally:
+            if source is not None:
+                source.close()
+
+    async def _collect(self, proc: asyncio.subprocess.Process,
+                       output: _Channel) -> None:
+        decoder = codecs.getincrementaldecoder('utf-8')(DECODE_ERRORS)
+
+        try:
+            while proc.stdout is not None:
+                chunk = await proc.stdout.read(_READ_SIZE)
+                text = decoder.decode(chunk, final=not chunk)
+
+                # the command isn't read anymore, it's terminated
+                if text and not await output.awrite(text):
+                    return
+
+                if not chunk:
+                    return
+        finally:
+            output.end()
+
+    async def _wait(self, proc: asyncio.subprocess.Process,
+                    name: str) -> int:
+        return await self._withTimeout(proc.wait(), name)
+
+    async def _withTimeout(self, aw, name: str):
+        try:
+            return await asyncio.wait_for(aw, self.cmdTimeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(
+                f'{name}: timed out after {self.cmdTimeout:g} s') from None
+
+    async def _killAll(self) -> None:
+        for proc in self.procs:
+            if proc.returncode is None:
+                try:
+                    proc.kill()
+                except ProcessLookupError:
+                    pass
+                await proc.wait()
+
+
+async def runPipeline(executors: list[CmdExecutor], output: _Channel,
+                      cmdTimeout: Optional[float] = None,
+                      pipeTimeout: Optional[float] = None) -> None:
+    """
+    Coroutine which executes the pipeline
+
+    Args:
+        executors (list[CmdExecutor]): the pipeline
+        output (_Channel): gets the output of the pipeline, if it's
+            closed by its reader, the pipeline is stopped
+        cmdTimeout (float): the time limit for each command in seconds
+        pipeTimeout (float): the time limit for the whole pipeline
+
+    Raises:
+        TimeoutError: if some time limit is exceeded,
+            all running commands are killed or cancelled
+
+    """
+
+    pipeline = _Pipeline(cmdTimeout)
+    task = asyncio.ensure_future(pipeline.run(executors, output))
+    closed = asyncio.ensure_future(output.waitClosed())
+
+    # not `wait_for`: a command timeout must not look like this one
+    try:
+        done, _ = await asyncio.wait({task, closed}, timeout=pipeTimeout,
+                                     return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        closed.cancel()
+
+        if not task.done():
+            task.cancel()
+            await asyncio.wait({task})
+
+    if task in done:
+        task.result()
+    elif closed not in done:
+        raise TimeoutError(f'pipeline timed out after {pipeTimeout:g} s')
+
+
+def streamCommandAsync(cmds: list[CmdIR],
+                       session: Optional[Session] = None,
+                       cmdTimeout: Optional[float] = None,
+                       pipeTimeout: Optional[float] = None
+                       ) -> Iterator[str]:
+    """
+    The same as `executor.streamCommand`, but runs the pipeline
+    in an event loop with time limits. The loop runs in its own
+    thread, so the output is yielded as soon as the last command
+    makes it. Closing the output stops the pipeline
+
+    Args:
+        cmds (list[CmdIR]): commands
+        session (Session): the session which runs the command
+        cmdTimeout (float): the time limit for each command in seconds
+        pipeTimeout (float): the time limit for the whole pipeline
+
+    Yields:
+        str: pieces of the pipeline output
+
+    Raises:
+        TimeoutError: if some time limit is exceeded
+
+    """
+
+    executors: list[CmdExecutor] = [processCmd(c, session) for c in cmds]
+    output = _Channel()
+    errors: list[BaseException] = []
+
+    def run() -> None:
+        try:
+            asyncio.run(
+                runPipeline(executors, output, cmdTimeout, pipeTimeout))
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            output.end()
+
+    thread = threading.Thread(target=run, name='pipeline', daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            text = output.read()
+            if not text:
+                break
+            yield text
+    except BaseException:
+        # the output isn't read anymore, the pipeline is stopped
+        output.close()
+        raise
+    finally:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+
+
+def runCommandAsync(cmds: list[CmdIR],
+                    session: Optional[Session] = None,
+                    cmdTimeout: Optional[float] = None,
+                    pipeTimeout: Optional[float] = None) -> SpillBuffer:
+    """
+    The same as `executor.runCommand`, but runs the pipeline
+    in an event loop with time limits, e.g. for a background job
+
+    Args:
+        cmds (list[CmdIR]): commands
+        session (Session): the session which runs the command
+        cmdTimeout (float): the time limit for each command in seconds
+        pipeTimeout (float): the time limit for the whole pipeline
+
+    Returns:
+        SpillBuffer: the output stream with the result of the command
+
+    """
+
+    result = SpillBuffer(None if session is None else session.memory)
+    output = streamCommandAsync(cmds, session, cmdTimeout, pipeTimeout)
+
+    try:
+        result.writelines(output)
+    finally:
+        closeStream(output)
+
+    result.write('\n')
+
+    return result
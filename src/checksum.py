@@ -0,0 +1,152 @@
+"""
+Hashing files and streams for the checksum builtins:
+`sha256sum`, `md5sum` and `b2sum`
+
+"""
+
+from __future__ import annotations
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterable, Iterator
+import collections
+import hashlib
+import os
+import time
+
+# the size of one read, `hashlib` releases the GIL while it hashes
+# a block larger than 2K, so the threads hash files at once
+BLOCK_SIZE: int = 1 << 20
+
+# hashing is bound by the CPU, more threads than cores don't help
+DEFAULT_WORKERS: int = os.cpu_count() or 1
+
+# the files being hashed and queued for the threads, so the digests
+# of the first files are printed while the rest are hashed
+_AHEAD: int = 2
+
+
+def hashFile(path: str, algorithm: str) -> tuple[str, int]:
+    """
+    Args:
+        path (str): the file path
+        algorithm (str): a `hashlib` algorithm name
+
+    Returns:
+        str: the hex digest of the file
+        int: the size of the file in bytes
+
+    Raises:
+        OSError: if the file can't be read
+
+    """
+
+    digest = hashlib.new(algorithm)
+    buffer = bytearray(BLOCK_SIZE)
+    view = memoryview(buffer)
+    size: int = 0
+
+    # the file is read into one buffer, so no block is allocated
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            count = f.readinto(buffer)
+
+            if not count:
+                break
+
+            digest.update(view[:count])
+            size += count
+
+    return digest.hexdigest(), size
+
+
+def hashStream(chunks: Iterable[bytes], algorithm: str) -> tuple[str, int]:
+    """
+    Returns:
+        str: the hex digest of the stream
+        int: the size of the stream in bytes
+
+    """
+
+    digest = hashlib.new(algorithm)
+    size: int = 0
+
+    for chunk in chunks:
+        digest.update(chunk)
+        size += len(chunk)
+
+    return digest.hexdigest(), size
+
+
+def hashFiles(paths: list[str], algorithm: str,
+              workers: int = DEFAULT_WORKERS) -> Iterator[tuple[str, int]]:
+    """
+    Hash the files in a thread pool. The results come in the order
+    of the paths, a few files ahead of the consumer are hashed
+    at once
+
+    Args:
+        paths (list[str]): the file paths
+        algorithm (str): a `hashlib` algorithm name
+        workers (int): the count of threads
+
+    Yields:
+        str: the hex digest of each file
+        int: the size of each file in bytes
+
+    Raises:
+        OSError: if some file can't be read, the files before it
+            are yielded
+
+    """
+
+    if len(paths) < 2:
+        # a thread would only add its start-up
+        for path in paths:
+            yield hashFile(path, algorithm)
+        return
+
+    pool = ThreadPoolExecutor(min(workers, len(paths)),
+                              thread_name_prefix='checksum')
+    ahead: int = max(1, workers) * _AHEAD
+    pending: collections.deque[Future[tuple[str, int]]] = \
+        collections.deque()
+
+    try:
+        for path in paths:
+            pending.append(pool.submit(hashFile, path, algorithm))
+
+            if len(pending) > ahead:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        # a closed stream, e.g. by `head`, stops hashing
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+class Throughput:
+    """
+    Counts the bytes hashed by a command and the time it takes,
+    for the report printed with `SHOWSTATS`
+
+    Args:
+        name (str): the command name
+
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.files: int = 0
+        self.bytes: int = 0
+        self.start: float = time.perf_counter()
+
+    def add(self, size: int) -> None:
+        self.files += 1
+        self.bytes += size
+
+    def report(self) -> str:
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        megabytes = self.bytes / (1 << 20)
+
+        return (f'{self.name}: {self.files} files, {megabytes:.1f} MB '
+                f'in {elapsed:.3f} s, {megabytes / elapsed:.1f} MB/s')
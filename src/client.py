@@ -0,0 +1,160 @@
+"""
+A thin client of the shell daemon (`src.daemon`). It imports nothing
+of the shell, so it starts as fast as the interpreter does
+
+Usage:
+    python -m src.client [-s SOCKET] [COMMAND...]
+
+Runs COMMAND, or each line of stdin if there is no COMMAND,
+in one session of the daemon and prints the output as it comes.
+The commands run in the current directory and the environment
+of the client. The exit status is 1 if some command failed
+
+The first line sent to the daemon is a JSON object with `cwd` and `env`
+of the session, each next one is a command line. The daemon answers
+each command line with frames, the last one is `DONE`
+
+"""
+
+from typing import BinaryIO, Iterable, Mapping, Optional
+import json
+import os
+import socket
+import struct
+import sys
+
+# a frame is a kind byte, a payload length and the payload
+FRAME = struct.Struct('>cI')
+
+# a chunk of the command output
+OUTPUT: bytes = b'o'
+# the error message of a failed command
+ERROR: bytes = b'e'
+# diagnostics of the session, like the plans printed with `SHOWPLAN`
+DIAGNOSTIC: bytes = b'i'
+# the command is done
+DONE: bytes = b'd'
+
+
+def defaultSocketPath() -> str:
+    """
+    `SD_SOCKET` if it's set, otherwise a socket of the user
+    in the runtime directory
+
+    """
+
+    path: Optional[str] = os.environ.get('SD_SOCKET')
+
+    if path:
+        return path
+
+    runtimeDir: str = os.environ.get('XDG_RUNTIME_DIR') or '/tmp'
+
+    return os.path.join(runtimeDir, f'softwaredesign-{os.getuid()}.sock')
+
+
+def readFrame(f: BinaryIO) -> Optional[tuple[bytes, bytes]]:
+    """
+    Returns:
+        bytes: the frame kind
+        bytes: the payload, None if the connection is closed
+
+    """
+
+    header: bytes = f.read(FRAME.size)
+
+    if len(header) < FRAME.size:
+        return None
+
+    kind, size = FRAME.unpack(header)
+
+    return kind, f.read(size)
+
+
+def runCommands(lines: Iterable[str], path: Optional[str] = None,
+                out: Optional[BinaryIO] = None,
+                err: Optional[BinaryIO] = None,
+                cwd: Optional[str] = None,
+                env: Optional[Mapping[str, str]] = None) -> int:
+    """
+    Run the command lines in one session of the daemon
+
+    Args:
+        lines (Iterable[str]): command lines
+        path (str): the daemon socket, `defaultSocketPath` by default
+        out (BinaryIO): gets the output, stdout by default
+        err (BinaryIO): gets the error messages and diagnostics,
+            stderr by default
+        cwd (str): the current directory of the session,
+            the one of the client by default
+        env (Mapping[str, str]): the environment of the session,
+            the one of the client by default
+
+    Returns:
+        int: 1 if some command failed, 0 otherwise
+
+    Raises:
+        OSError: if the daemon isn't running
+
+    """
+
+    out = out or sys.stdout.buffer
+    err = err or sys.stderr.buffer
+    status: int = 0
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path or defaultSocketPath())
+        f = sock.makefile('rb')
+
+        hello = {'cwd': cwd or os.getcwd(),
+                 'env': dict(os.environ if env is None else env)}
+        sock.sendall(json.dumps(hello).encode() + b'\n')
+
+        for line in lines:
+            sock.sendall(line.rstrip('\n').encode() + b'\n')
+
+            while True:
+                frame = readFrame(f)
+
+                # `exit` ends the session
+                if frame is None:
+                    return status
+
+                kind, payload = frame
+
+                if kind == DONE:
+                    break
+
+                if kind == ERROR:
+                    status = 1
+                    err.write(payload + b'\n')
+                    err.flush()
+                elif kind == DIAGNOSTIC:
+                    err.write(payload)
+                    err.flush()
+                else:
+                    out.write(payload)
+                    out.flush()
+
+    return status
+
+
+def main() -> None:
+    args: list[str] = sys.argv[1:]
+    path: Optional[str] = None
+
+    if args[:1] == ['-s']:
+        if len(args) < 2:
+            sys.exit('usage: python -m src.client [-s SOCKET] [COMMAND...]')
+        path, args = args[1], args[2:]
+
+    lines: Iterable[str] = [' '.join(args)] if args else sys.stdin
+
+    try:
+        sys.exit(runCommands(lines, path))
+    except OSError as e:
+        sys.exit(f'the shell daemon isn\'t available: {e}')
+
+
+if __name__ == '__main__':
+    main()
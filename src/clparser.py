@@ -1,28 +1,244 @@
 from __future__ import annotations
 from abc import abstractmethod
+from typing import Any, Iterator, Optional, Union
+import collections
+import copy
 import re
 
+from .registry import registry
 
-class CmdIR:
+# sets a slot of an immutable object, it bypasses its `__setattr__`
+_setattr = object.__setattr__
+
+# an arg of an expanded command, whitespace escaped
+# by a backslash doesn't end it
+_ARG_RE = re.compile(r'(?:\\\s|\S)+')
+_ESCAPED_RE = re.compile(r'\\(\s)')
+
+
+def findSubstitutionEnd(line: str, pos: int) -> int:
+    """
+    Find the end of the command substitution `$(...)`,
+    nested substitutions and quotes are skipped
+
+    Args:
+        line (str): the line
+        pos (int): the position of `$(`
+
+    Returns:
+        int: the position after the closing `)`
+
+    Raises:
+        SyntaxError: if there is no closing `)`
+
+    """
+
+    depth: int = 0
+    inSingleQuote: bool = False
+    inDoubleQuote: bool = False
+
+    for i in range(pos + 1, len(line)):
+        sym = line[i]
+
+        if sym == '"' and not inSingleQuote:
+            inDoubleQuote ^= True
+        elif sym == "'" and not inDoubleQuote:
+            inSingleQuote ^= True
+        elif inSingleQuote or inDoubleQuote:
+            continue
+        elif sym == '(':
+            depth += 1
+        elif sym == ')':
+            depth -= 1
+            if depth == 0:
+                return i + 1
+
+    raise SyntaxError('syntax error: unexpected end of line, `)` is expected')
+
+
+def _unquoted(line: str) -> Iterator[tuple[int, str]]:
+    """
+    Yields:
+        int: the position of a char which is out of quotes
+            and out of command substitutions
+        str: the char
+
+    """
+
+    inSingleQuote: bool = False
+    inDoubleQuote: bool = False
+    pos: int = 0
+
+    while pos < len(line):
+        sym = line[pos]
+
+        if sym == '$' and not inSingleQuote and line.startswith('$(', pos):
+            pos = findSubstitutionEnd(line, pos)
+            continue
+
+        if sym == '"' and not inSingleQuote:
+            inDoubleQuote ^= True
+        elif sym == "'" and not inDoubleQuote:
+            inSingleQuote ^= True
+        elif not (inSingleQuote or inDoubleQuote):
+            yield pos, sym
+
+        pos += 1
+
+
+def _maskSubstitutions(line: str) -> str:
+    """
+    The line where each command substitution is replaced with `$_`,
+    so it's checked like a variable
+
+    """
+
+    masked: str = ''
+    inSingleQuote: bool = False
+    inDoubleQuote: bool = False
+    pos: int = 0
+
+    while pos < len(line):
+        sym = line[pos]
+
+        if sym == '$' and not inSingleQuote and line.startswith('$(', pos):
+            masked += '$_'
+            pos = findSubstitutionEnd(line, pos)
+            continue
+
+        if sym == '"' and not inSingleQuote:
+            inDoubleQuote ^= True
+        elif sym == "'" and not inDoubleQuote:
+            inSingleQuote ^= True
+
+        masked += sym
+        pos += 1
+
+    return masked
+
+
+class _Frozen:
+    """
+    A compact immutable object: its attributes are slots
+    which are set once by the constructor. A changed copy
+    is made with `replace`
+
+    """
+
+    __slots__ = ()
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(
+            f'{type(self).__name__} is immutable, use replace()')
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __setstate__(self, state: tuple[Any, dict[str, Any]]) -> None:
+        # `copy` and `pickle` restore the slots
+        self._set(**state[1])
+
+    def _set(self, **values: Any) -> None:
+        for name, value in values.items():
+            _setattr(self, name, value)
+
+    def replace(self, **changes: Any) -> Any:
+        """
+        The copy of the object with some attributes changed
+
+        """
+
+        obj = copy.copy(self)
+        obj._set(**changes)
+
+        return obj
+
+
+class Redirect(_Frozen):
+    """
+    An I/O redirection of a command
+
+    Attributes:
+        op (str): `<`, `>` or `>>`
+        target (str): the file name
+
+    """
+
+    __slots__ = ('op', 'target')
+
+    def __init__(self, op: str, target: str) -> None:
+        _setattr(self, 'op', op)
+        _setattr(self, 'target', target)
+
+    def __str__(self) -> str:
+        return f'{self.op} {self.target}'
+
+    def __eq__(self, o: object) -> bool:
+        if not isinstance(o, Redirect):
+            return False
+
+        return self.op == o.op and self.target == o.target
+
+    def __hash__(self) -> int:
+        return hash((self.op, self.target))
+
+
+class CmdIR(_Frozen):
     """
     Contains an intermediate representation of a command
 
+    The IR is immutable, so a parsed pipeline may be run many times
+    and shared. Its args, keys and redirects must not be changed
+    in place either. The settings which the executor derives
+    from them are made once, when the IR is built (`compiled`)
+
     Args:
         cmd (str): the user entered command
+        redirects (list[Redirect]): the command redirections
 
     Attributes:
         name (str): the command name
         args (list[str]): the command args splited by whitespace.
         keys (dict[str, str]): the command keys
+        redirects (list[Redirect]): the command redirections
+        compiled (Any): the result of `compile` of the executor class,
+            None for an external command
 
     """
 
-    def __init__(self, cmd: str) -> None:
-        self.name: str
-        self.args: list[str]
-        self.keys: dict[str, str]
+    __slots__ = ('name', 'args', 'keys', 'redirects', 'compiled')
 
-        self.name, self.args, self.keys = self.parseCmd(cmd)
+    name: str
+    args: list[str]
+    keys: dict[str, str]
+    redirects: list[Redirect]
+    compiled: Any
+
+    def __init__(self, cmd: str,
+                 redirects: Optional[list[Redirect]] = None) -> None:
+        name, args, keys = self.parseCmd(cmd)
+        _setattr(self, 'name', name)
+        _setattr(self, 'args', args)
+        _setattr(self, 'keys', keys)
+        _setattr(self, 'redirects', redirects or [])
+        self._compile()
+
+    def replace(self, **changes: Any) -> CmdIR:
+        """
+        The copy of the command with some attributes changed,
+        e.g. `cmd.replace(args=[...])`. It's compiled again
+
+        """
+
+        ir = super().replace(**changes)
+        ir._compile()
+
+        return ir
+
+    def _compile(self) -> None:
+        pair = registry.lookup(self.name)
+        _setattr(self, 'compiled',
+                 None if pair is None else pair[1].compile(self))
 
     @abstractmethod
     def parseCmd(self, cmd: str) -> tuple[str, list[str], dict[str, str]]:
@@ -42,7 +258,7 @@ class CmdIR:
 
         """
 
-        name, *args = cmd.split()
+        name, *args = splitArgs(cmd)
         return name, args, {}
 
     def __str__(self) -> str:
@@ -59,11 +275,12 @@ class CmdIR:
             return kpp.rstrip()
 
         kpp: str = keysPrettyPrinter(self.keys)
+        redirects: str = ''.join(f' {r}' for r in self.redirects)
 
         if kpp:
-            return f'{self.name} {kpp} {" ".join(self.args)}'
+            return f'{self.name} {kpp} {" ".join(self.args)}{redirects}'
 
-        return f'{self.name} {" ".join(self.args)}'
+        return f'{self.name} {" ".join(self.args)}{redirects}'
 
     def __eq__(self, o: object) -> bool:
         if not isinstance(o, CmdIR):
@@ -71,10 +288,89 @@ class CmdIR:
 
         return self.name == o.name \
             and self.args == o.args \
-            and self.keys == self.keys
+            and self.keys == o.keys \
+            and self.redirects == o.redirects
+
+
+class KeyedIR(CmdIR):
+    """
+    Intermediate representation for a builtin with keys.
+    Keys may appear anywhere before `--`,
+    flags can be joined: `-rn` is the same as `-r -n`
+
+    Attributes:
+        flagKeys (frozenset[str]): keys without a value
+        valueKeys (frozenset[str]): keys followed by a value
+        numericKeys (frozenset[str]): keys followed by a number
+        minArgs (int): the minimal count of args
+        usage (str): the command syntax for error messages
+        keysFirst (bool): keys are only before the first arg,
+            the rest tokens are args
+
+    """
+
+    __slots__ = ()
+
+    flagKeys: frozenset[str] = frozenset()
+    valueKeys: frozenset[str] = frozenset()
+    numericKeys: frozenset[str] = frozenset()
+    minArgs: int = 0
+    usage: str = ''
+    keysFirst: bool = False
+
+    def parseCmd(self, cmd: str) -> tuple[str, list[str], dict[str, str]]:
+        """
+        Split name, args and keys
+
+        Raises:
+            SyntaxError if there is unknown key, a key without value,
+                a non-numeric value for numeric key or too few args
+
+        """
+
+        name, *tokens = splitArgs(cmd)
 
+        args: list[str] = []
+        keys: dict[str, str] = {}
+        it = iter(tokens)
+
+        for tok in it:
+            if tok == '--':
+                args.extend(it)
+                break
+
+            if tok in self.valueKeys or tok in self.numericKeys:
+                val = next(it, None)
+                if tok in self.numericKeys and \
+                        (val is None or not val.isnumeric()):
+                    raise SyntaxError(
+                        f'{name}: after "{tok}" key a number must be, '
+                        f'but found {val or "nothing"}')
+                if val is None:
+                    raise SyntaxError(
+                        f'{name}: after "{tok}" key a value must be')
+                keys[tok] = val
+            elif tok in self.flagKeys:
+                keys[tok] = ''
+            elif len(tok) > 1 and tok[0] == '-':
+                flags = [f'-{c}' for c in tok[1:]]
+                if not all(f in self.flagKeys for f in flags):
+                    raise SyntaxError(f'{name}: {tok}: Unknown key')
+                keys.update(dict.fromkeys(flags, ''))
+            else:
+                args.append(tok)
+                if self.keysFirst:
+                    args.extend(it)
+                    break
 
-class GrepIR(CmdIR):
+        if len(args) < self.minArgs:
+            raise SyntaxError(
+                f'{name}: the command must be "{self.usage}"')
+
+        return name, args, keys
+
+
+class GrepIR(KeyedIR):
     """
     Intermediate representation for `grep` command.
     Grep can read from file and from result of
@@ -83,86 +379,177 @@ class GrepIR(CmdIR):
     Supported keys for grep:
         -i -- match with case insensitive
         -w -- match the whole word
+        -r -- search directories recursively
         -A n -- print n next lines after match
 
     """
 
-    def __init__(self, cmd: str) -> None:
-        self.name: str
-        self.args: list[str]
-        self.keys: dict[str, str]
+    __slots__ = ()
 
-        self.name, self.args, self.keys = self.parseCmd(cmd)
+    flagKeys = frozenset(['-i', '-w', '-r'])
+    numericKeys = frozenset(['-A'])
+    minArgs = 1
+    usage = 'grep [KEYS] pat [FILE...]'
 
-    def parseCmd(self, cmd: str) -> tuple[str, list[str], dict[str, str]]:
-        """
-        Split name, args and keys
 
-        Args:
-            cmd (str): the user entered command
+class WcIR(KeyedIR):
+    """
+    Intermediate representation for `wc` command
 
-        Returns:
-            str: the command name
-            list[str]: the command args
-            dict[str, str]: the command keys and its value
+    Supported keys for wc:
+        -l -- print the count of lines
+        -w -- print the count of words
+        -c -- print the count of chars
 
-        Raises:
-            SyntaxError if there is unknown key
-                or wrong syntax with `-A` key
+    """
 
-        Supported keys for grep:
-            -i -- match with case insensitive
-            -w -- match the whole word
-            -A n -- print n next lines after match
+    __slots__ = ()
 
-        """
+    flagKeys = frozenset(['-l', '-w', '-c'])
+    usage = 'wc [-lwc] [FILE]'
 
-        splitted = cmd.split()
 
-        if len(splitted) < 2:
-            raise SyntaxError(
-                'grep: the command must be "grep [KEYS] pat [FILE]"')
+class FindIR(KeyedIR):
+    """
+    Intermediate representation for `find` command.
+    The paths are the args, the tests are the keys
 
-        name = splitted[0]
-        tokens = splitted[1:]
+    Supported keys for find:
+        -name PAT -- the base name matches the glob pattern
+        -type f|d|l -- a file, a directory or a symlink
+        -size [+-]N[bcwkMG] -- the size is more, less or exactly N units
+        -mtime [+-]N -- modified more, less or exactly N days ago
+        -maxdepth N -- descend at most N levels below the paths
 
-        argsStr: str = ''
-        keys: dict[str, str] = {}
+    """
 
-        skipIteration = False
-        errMsg = 'grep: after "-A" key a number must be, but found'
+    __slots__ = ()
 
-        for i in range(len(tokens)):
-            if skipIteration:
-                skipIteration = False
-                continue
+    valueKeys = frozenset(['-name', '-type', '-size', '-mtime'])
+    numericKeys = frozenset(['-maxdepth'])
+    usage = ('find [PATH...] [-name PAT] [-type f|d|l] '
+             '[-size [+-]N[bcwkMG]] [-mtime [+-]N] [-maxdepth N]')
 
-            tok: str = tokens[i]
 
-            if tok == '-i' or tok == '-w':
-                keys[tok] = ''
-            elif tok == '-A':
-                try:
-                    val = tokens[i + 1]
-                    if val.isnumeric():
-                        keys['-A'] = val
-                        skipIteration = True
-                    else:
-                        raise SyntaxError(f'{errMsg} {val}')
-                except IndexError:
-                    raise SyntaxError(f'{errMsg} nothing')
-            # Unknown key
-            elif tok[0] == '-':
-                raise SyntaxError(f'grep: {tok}: Unknown key')
-            else:
-                argsStr += (tok + ' ')
+class TeeIR(KeyedIR):
+    """
+    Intermediate representation for `tee` command
+
+    Supported keys for tee:
+        -a -- append to the files instead of overwriting them
+
+    """
+
+    __slots__ = ()
+
+    flagKeys = frozenset(['-a'])
+    usage = 'tee [-a] [FILE...]'
 
-        argsStr = argsStr.rstrip()
 
-        return name, argsStr.split(), keys
+class ChecksumIR(KeyedIR):
+    """
+    Intermediate representation for `sha256sum`, `md5sum`
+    and `b2sum` commands, they have no keys
+
+    """
+
+    __slots__ = ()
+
+    usage = 'sha256sum [FILE...]'
+
+
+class HashIR(KeyedIR):
+    """
+    Intermediate representation for `hash` command
+
+    Supported keys for hash:
+        -r -- forget all remembered paths
+        -d -- forget the paths of given commands
+        -t -- print the paths of given commands
+
+    """
+
+    __slots__ = ()
+
+    flagKeys = frozenset(['-r', '-d', '-t'])
+    usage = 'hash [-r] [-d|-t] [NAME...]'
+
+
+class XargsIR(KeyedIR):
+    """
+    Intermediate representation for `xargs` command.
+    Keys are only before the command
+
+    Supported keys for xargs:
+        -n N -- use at most N input items per command run
+        -P N -- run at most N commands at the same time
+
+    """
+
+    __slots__ = ()
+
+    numericKeys = frozenset(['-n', '-P'])
+    usage = 'xargs [-n N] [-P N] [COMMAND [ARGS...]]'
+    keysFirst = True
+
+
+class SortIR(KeyedIR):
+    """
+    Intermediate representation for `sort` command
+
+    Supported keys for sort:
+        -n -- compare by a leading number
+        -r -- reverse the result
+        -u -- output only the first of equal lines
+        -k N[,M] -- compare by fields from N to M
+        -t SEP -- the field separator
+        -S SIZE -- the memory budget, e.g. 512M
+        --parallel N -- sort with N processes
+
+    """
+
+    __slots__ = ()
+
+    flagKeys = frozenset(['-n', '-r', '-u'])
+    valueKeys = frozenset(['-k', '-t', '-S'])
+    numericKeys = frozenset(['--parallel'])
+    usage = 'sort [-nru] [-k N[,M]] [-t SEP] [-S SIZE] [FILE...]'
+
+
+class HeadIR(KeyedIR):
+    """
+    Intermediate representation for `head` command
 
+    Supported keys for head:
+        -n N -- print the first N lines
+        -c N -- print the first N bytes
 
-class VarDecl:
+    """
+
+    __slots__ = ()
+
+    numericKeys = frozenset(['-n', '-c'])
+    usage = 'head [-n N | -c N] [FILE]'
+
+
+class TailIR(KeyedIR):
+    """
+    Intermediate representation for `tail` command
+
+    Supported keys for tail:
+        -n N -- print the last N lines
+        -f -- follow data appended to the file
+
+    """
+
+    __slots__ = ()
+
+    flagKeys = frozenset(['-f'])
+    numericKeys = frozenset(['-n'])
+    usage = 'tail [-f] [-n N] [FILE]'
+
+
+class VarDecl(_Frozen):
     """
     Contains an intermediate representation
     of a variable declaration and methods
@@ -177,16 +564,18 @@ class VarDecl:
 
     """
 
+    __slots__ = ('var', 'value')
+
     declRe = re.compile(r'[A-Za-z]\w*=([^|<>\'"]*|\'.*\'|\".*\")$')
 
-    def __init__(self, decl: str) -> None:
-        self.var: str
-        self.value: str
+    var: str
+    value: str
 
+    def __init__(self, decl: str) -> None:
         decl = decl.strip()
         splitPos = decl.find('=')
-        self.var = decl[:splitPos]
-        self.value = self.__parseQuotes(decl[splitPos + 1:])
+        self._set(var=decl[:splitPos],
+                  value=self.__parseQuotes(decl[splitPos + 1:]))
 
     def __str__(self) -> str:
         return f'{self.var}={self.value}'
@@ -204,7 +593,10 @@ class VarDecl:
 
         """
 
-        return bool(VarDecl.declRe.match(line))
+        try:
+            return bool(VarDecl.declRe.match(_maskSubstitutions(line)))
+        except SyntaxError:
+            return False
 
     @staticmethod
     def parseDecl(line: str) -> VarDecl:
@@ -226,18 +618,316 @@ class VarDecl:
         return value
 
 
-def getCmdParser(line: str) -> CmdIR:
+class LoopIR(_Frozen):
+    """
+    Intermediate representation of a loop, the body is a list
+    of statements separated by `;`:
+
+        for VAR in WORDS; do BODY; done
+        [PIPELINE |] while read VAR...; do BODY; done [< FILE]
+
+    `while read` reads lines of the PIPELINE output, of the FILE
+    or of the console. Nothing is expanded here, the loop expands
+    its words and statements when it runs
+
+    Attributes:
+        kind (str): `for` or `while`
+        vars (tuple[str, ...]): the loop variables
+        words (str): the words of `for`
+        body (tuple[Union[str, LoopIR], ...]): the statements,
+            a nested loop is a `LoopIR`
+        source (str): the PIPELINE, empty if there is none
+        inputFile (str): the FILE, empty if there is none
+
+    """
+
+    __slots__ = ('kind', 'vars', 'words', 'body', 'source', 'inputFile')
+
+    forRe = re.compile(r'for\s+([A-Za-z]\w*)\s+in(?:\s+(.*))?$')
+    whileRe = re.compile(
+        r'while\s+read(?:\s+-r)?((?:\s+[A-Za-z]\w*)+)$')
+
+    kind: str
+    vars: tuple[str, ...]
+    words: str
+    body: tuple[Union[str, LoopIR], ...]
+    source: str
+    inputFile: str
+
+    def __init__(self, kind: str, vars: tuple[str, ...], words: str,
+                 body: tuple[Union[str, LoopIR], ...],
+                 source: str = '', inputFile: str = '') -> None:
+        self._set(kind=kind, vars=vars, words=words, body=body,
+                  source=source, inputFile=inputFile)
+
+    def __str__(self) -> str:
+        source: str = f'{self.source} | ' if self.source else ''
+        header: str = f'for {self.vars[0]} in {self.words}' \
+            if self.kind == 'for' else f'while read {" ".join(self.vars)}'
+        body: str = '; '.join(map(str, self.body))
+        inputFile: str = f' < {self.inputFile}' if self.inputFile else ''
+
+        return f'{source}{header}; do {body}; done{inputFile}'
+
+    def __eq__(self, o: object) -> bool:
+        if not isinstance(o, LoopIR):
+            return False
+
+        return (self.kind, self.vars, self.words, self.body,
+                self.source, self.inputFile) == \
+            (o.kind, o.vars, o.words, o.body, o.source, o.inputFile)
+
+
+def _splitStatements(line: str) -> list[str]:
+    """
+    Split the line by `;` out of quotes
+
+    """
+
+    statements: list[str] = []
+    start: int = 0
+
+    for pos, sym in _unquoted(line):
+        if sym == ';':
+            statements.append(line[start:pos].strip())
+            start = pos + 1
+
+    statements.append(line[start:].strip())
+
+    return statements
+
+
+def splitWords(line: str) -> list[str]:
+    """
+    Split the line by whitespace out of quotes
+    and out of command substitutions
+
+    Args:
+        line (str): the line, not expanded
+
+    Returns:
+        list[str]: the words, quotes are kept
+
+    """
+
+    words: list[str] = []
+    start: int = 0
+
+    for pos, sym in _unquoted(line):
+        if sym.isspace():
+            if pos > start:
+                words.append(line[start:pos])
+            start = pos + 1
+
+    if start < len(line):
+        words.append(line[start:])
+
+    return words
+
+
+def splitArgs(line: str) -> list[str]:
+    """
+    Split the expanded command into args by whitespace,
+    like in Bash `a\\ b` is one arg `a b`
+
+    Args:
+        line (str): the expanded line
+
+    Returns:
+        list[str]: the args without escapes
+
+    """
+
+    return [_ESCAPED_RE.sub(r'\1', arg) for arg in _ARG_RE.findall(line)]
+
+
+def escapeArg(arg: str) -> str:
+    """
+    Escape the whitespace of an arg, so `splitArgs` keeps it whole,
+    e.g. a path with a space matched by a glob
+
+    """
+
+    return re.sub(r'(\s)', r'\\\1', arg)
+
+
+def _firstWord(statement: str) -> str:
+    words = statement.split(maxsplit=1)
+    return words[0] if words else ''
+
+
+def _startsLoop(statement: str) -> bool:
+    stages = parsePipes(statement)
+    return bool(stages) and _firstWord(stages[-1]) in ('for', 'while')
+
+
+def _isDone(statement: str) -> bool:
+    return statement == 'done' or (statement.startswith('done')
+                                   and statement[4] in ' \t<')
+
+
+def _parseLoopAt(statements: list[str], pos: int) -> tuple[LoopIR, int]:
+    """
+    Parse the loop which starts with the statement `pos`,
+    `statements` are changed: `do` is cut out of the first statement
+    of the body
+
+    Returns:
+        LoopIR: the loop
+        int: the position of the statement after the loop
+
+    """
+
+    *sourceStages, header = parsePipes(statements[pos])
+    source: str = ' | '.join(sourceStages)
+
+    forMatch = LoopIR.forRe.match(header)
+    whileMatch = LoopIR.whileRe.match(header)
+
+    if forMatch is not None and not source:
+        kind, vars, words = 'for', (forMatch[1],), forMatch[2] or ''
+    elif whileMatch is not None:
+        kind, vars, words = 'while', tuple(whileMatch[1].split()), ''
+    else:
+        raise SyntaxError(
+            f'syntax error: "for VAR in WORDS" or "while read VAR" '
+            f'is expected, but found "{header}"')
+
+    pos += 1
+    if pos == len(statements) or _firstWord(statements[pos]) != 'do':
+        raise SyntaxError(f'{kind}: syntax error: "do" is expected')
+
+    statements[pos] = statements[pos][2:].strip()
+    body: list[Union[str, LoopIR]] = []
+
+    while True:
+        if pos == len(statements):
+            raise SyntaxError(f'{kind}: syntax error: "done" is expected')
+
+        statement: str = statements[pos]
+
+        if _isDone(statement):
+            break
+
+        if not statement:
+            pos += 1
+        elif _startsLoop(statement):
+            loop, pos = _parseLoopAt(statements, pos)
+            body.append(loop)
+        else:
+            body.append(statement)
+            pos += 1
+
+    if not body:
+        raise SyntaxError('syntax error near unexpected token `done\'')
+
+    rest, redirects = parseRedirects(statement[4:])
+    isInput: bool = kind == 'while' and len(redirects) == 1 \
+        and redirects[0].op == '<'
+
+    if rest or (redirects and not isInput):
+        raise SyntaxError(
+            f'{kind}: syntax error: only "done < FILE" of "while read" '
+            f'is supported, but found "{statement}"')
+
+    inputFile: str = redirects[0].target if redirects else ''
+
+    return LoopIR(kind, vars, words, tuple(body), source, inputFile), pos + 1
+
+
+def parseLoop(line: str) -> Optional[LoopIR]:
+    """
+    Parse the line if it's a loop
+
+    Args:
+        line (str): the user entered line
+
+    Returns:
+        LoopIR: the loop, None if the line isn't a loop
+
+    Raises:
+        SyntaxError: if the loop is wrong
+
+    """
+
+    statements: list[str] = _splitStatements(line)
+
+    if not _startsLoop(statements[0]):
+        return None
+
+    loop, pos = _parseLoopAt(statements, 0)
+
+    if any(statements[pos:]):
+        raise SyntaxError(
+            f'syntax error near unexpected token `{statements[pos]}\'')
+
+    return loop
+
+
+def getCmdParser(line: str,
+                 redirects: Optional[list[Redirect]] = None) -> CmdIR:
     """
     Returns parser for current command
 
     """
 
     name: str = line.split()[0]
+    pair = registry.lookup(name)
+
+    if pair is None:
+        return CmdIR(line, redirects)
+
+    irCls, _ = pair
+    return irCls(line, redirects)
 
-    if name == 'grep':
-        return GrepIR(line)
 
-    return CmdIR(line)
+class CmdCache:
+    """
+    Parsed commands by their expanded text, the least recently
+    used are dropped. A script which runs the same commands
+    many times builds and compiles each of them once.
+    The commands are immutable, so they are shared by the runs
+
+    Args:
+        maxSize (int): the maximal count of commands
+
+    """
+
+    def __init__(self, maxSize: int = 1024) -> None:
+        self.maxSize = maxSize
+        self.__cmds: collections.OrderedDict[tuple, CmdIR] = \
+            collections.OrderedDict()
+
+    def parse(self, line: str,
+              redirects: Optional[list[Redirect]] = None) -> CmdIR:
+        """
+        The same as `getCmdParser`, but a command is parsed once
+
+        Raises:
+            SyntaxError: if the command is wrong, it's not cached
+
+        """
+
+        key = (line, tuple(redirects or ()), registry.generation)
+        cmd = self.__cmds.get(key)
+
+        if cmd is not None:
+            self.__cmds.move_to_end(key)
+            return cmd
+
+        cmd = getCmdParser(line, redirects)
+        self.__cmds[key] = cmd
+
+        if len(self.__cmds) > self.maxSize:
+            self.__cmds.popitem(last=False)
+
+        return cmd
+
+    def clear(self) -> None:
+        self.__cmds.clear()
+
+    def __len__(self) -> int:
+        return len(self.__cmds)
 
 
 def parsePipes(line: str) -> list[str]:
@@ -253,34 +943,130 @@ def parsePipes(line: str) -> list[str]:
     """
 
     splited: list[str] = []
-    curCmd: str = ''
+    start: int = 0
+
+    for pos, sym in _unquoted(line):
+        if sym == '|':
+            splited.append(line[start:pos].strip())
+            start = pos + 1
+
+    if line[start:] != '':
+        splited.append(line[start:].strip())
+
+    return splited
+
+
+def parseRedirects(cmd: str) -> tuple[str, list[Redirect]]:
+    """
+    Cut I/O redirections out of the command,
+    redirections in quotes are not cut
+
+    Args:
+        cmd (str): one command of the pipeline, not expanded
+
+    Returns:
+        str: the command without redirections
+        list[Redirect]: the redirections, file names are not expanded
+
+    Raises:
+        SyntaxError: if there is no file after `<`, `>` or `>>`
+            or a command substitution isn't closed
+
+    """
+
+    rest: str = ''
+    redirects: list[Redirect] = []
     inSingleQuote: bool = False
     inDoubleQuote: bool = False
+    pos: int = 0
 
-    for sym in line:
-        if sym == '"':
-            inDoubleQuote ^= True
-            curCmd += sym
+    while pos < len(cmd):
+        sym = cmd[pos]
+
+        if sym == '$' and not inSingleQuote and cmd.startswith('$(', pos):
+            end: int = findSubstitutionEnd(cmd, pos)
+            rest += cmd[pos:end]
+            pos = end
             continue
 
-        if sym == "'":
+        if sym == '"' and not inSingleQuote:
+            inDoubleQuote ^= True
+        elif sym == "'" and not inDoubleQuote:
             inSingleQuote ^= True
-            curCmd += sym
+        elif sym in '<>' and not (inSingleQuote or inDoubleQuote):
+            op: str = '>>' if cmd.startswith('>>', pos) else sym
+            pos += len(op)
+
+            while pos < len(cmd) and cmd[pos].isspace():
+                pos += 1
+
+            target: str = ''
+            while pos < len(cmd):
+                sym = cmd[pos]
+
+                if sym == '$' and not inSingleQuote \
+                        and cmd.startswith('$(', pos):
+                    end = findSubstitutionEnd(cmd, pos)
+                    target += cmd[pos:end]
+                    pos = end
+                    continue
+
+                if sym.isspace() and not (inSingleQuote or inDoubleQuote):
+                    break
+                if sym in '<>' and not (inSingleQuote or inDoubleQuote):
+                    break
+
+                if sym == '"' and not inSingleQuote:
+                    inDoubleQuote ^= True
+                elif sym == "'" and not inDoubleQuote:
+                    inSingleQuote ^= True
+
+                target += sym
+                pos += 1
+
+            if not target:
+                nearToken = cmd[pos] if pos < len(cmd) else 'newline'
+                raise SyntaxError(
+                    f'syntax error near unexpected token `{nearToken}\'')
+
+            redirects.append(Redirect(op, target))
             continue
 
-        if sym != '|':
-            curCmd += sym
-            continue
+        rest += sym
+        pos += 1
 
-        if (sym == '|') and (inSingleQuote or inDoubleQuote):
-            curCmd += sym
-            continue
+    return rest.strip(), redirects
 
-        splited.append(curCmd.strip())
-        curCmd = ''
 
-    if curCmd != '':
-        splited.append(curCmd.strip())
-        curCmd = ''
+def parseBackground(line: str) -> tuple[str, bool]:
+    """
+    Check the command must be run in background,
+    i.e. it ends with `&` out of quotes
 
-    return splited
+    Args:
+        line (str): the user entered line
+
+    Returns:
+        str: the line without `&`
+        bool: True if the line must be run in background
+
+    Raises:
+        SyntaxError: if there is nothing before `&`
+
+    """
+
+    ampPos: int = -1
+
+    for pos, sym in _unquoted(line):
+        if sym == '&':
+            ampPos = pos
+
+    if ampPos < 0 or line[ampPos + 1:].strip():
+        return line, False
+
+    cmd: str = line[:ampPos].rstrip()
+
+    if not cmd or cmd.endswith('&') or cmd.endswith('|'):
+        raise SyntaxError('syntax error near unexpected token `&\'')
+
+    return cmd, True
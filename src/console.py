@@ -0,0 +1,166 @@
+"""
+The console input of the shell when it isn't a terminal,
+e.g. a script or data piped into the shell
+
+"""
+
+from __future__ import annotations
+from typing import Iterator, TextIO, Union
+import io
+import os
+
+# the size of one `os.read` of the input
+BLOCK_SIZE: int = 1 << 20
+
+# undecodable bytes are kept like in the data passed between commands
+_ERRORS: str = 'surrogateescape'
+
+
+class StdinReader:
+    """
+    Reads a piped input by large `os.read` blocks instead of a line
+    per call. The command lines of the shell and the data read
+    by builtins, like `cat` or `wc` without files, are taken from
+    the same buffer, so a builtin reads the lines after its command,
+    like in Bash. The lines which a builtin doesn't take, e.g. after
+    `head`, stay in the input
+
+    Args:
+        fd (int): the input file descriptor
+        blockSize (int): the size of one read
+
+    """
+
+    def __init__(self, fd: int, blockSize: int = BLOCK_SIZE) -> None:
+        self.blockSize = blockSize
+        self.__fd = fd
+        self.__buffer = bytearray()
+        self.__eof: bool = False
+
+    def fileno(self) -> int:
+        return self.__fd
+
+    def isatty(self) -> bool:
+        return False
+
+    def close(self) -> None:
+        pass
+
+    def readline(self) -> str:
+        """
+        Returns:
+            str: the next line with its newline, empty at the end
+
+        """
+
+        start: int = 0
+
+        while True:
+            end: int = self.__buffer.find(b'\n', start) + 1
+
+            if end:
+                return self.__take(end)
+
+            start = len(self.__buffer)
+
+            if not self.__fill():
+                return self.__take(start)
+
+    def read(self) -> str:
+        """
+        Returns:
+            str: the rest of the input
+
+        """
+
+        return b''.join(self.chunks()).decode('utf-8', _ERRORS)
+
+    def chunks(self) -> Iterator[bytes]:
+        """
+        The rest of the input as raw blocks, for builtins
+        which work on bytes
+
+        """
+
+        while self.__buffer or self.__fill():
+            block = bytes(self.__buffer)
+            self.__buffer.clear()
+            yield block
+
+    def __iter__(self) -> Iterator[str]:
+        """
+        Lines of the rest of the input. A block is decoded and split
+        at once, up to its last newline
+
+        """
+
+        lines = io.StringIO()
+
+        try:
+            while True:
+                end: int = self.__buffer.rfind(b'\n') + 1
+
+                if not end and self.__fill():
+                    continue
+
+                # the last line may have no newline
+                text: str = self.__take(end or len(self.__buffer))
+
+                if not text:
+                    return
+
+                # not `yield from`, it would close the rest on exit
+                lines = io.StringIO(text)
+                for line in lines:
+                    yield line
+        finally:
+            # the lines which are not read are put back
+            self.__buffer[:0] = lines.read().encode('utf-8', _ERRORS)
+
+    def __fill(self) -> bool:
+        """
+        Read one more block
+
+        Returns:
+            bool: False at the end of the input
+
+        """
+
+        if self.__eof:
+            return False
+
+        block: bytes = os.read(self.__fd, self.blockSize)
+
+        if not block:
+            self.__eof = True
+            return False
+
+        self.__buffer += block
+
+        return True
+
+    def __take(self, size: int) -> str:
+        data: bytes = bytes(self.__buffer[:size])
+        del self.__buffer[:size]
+
+        return data.decode('utf-8', _ERRORS)
+
+
+def openConsole(stream: TextIO) -> Union[TextIO, StdinReader]:
+    """
+    The console input of the shell: a terminal is read as it is,
+    by lines with editing, any other input is read by blocks
+
+    Args:
+        stream (TextIO): the standard input, not read yet
+
+    """
+
+    try:
+        if stream.isatty():
+            return stream
+
+        return StdinReader(stream.fileno())
+    except (AttributeError, OSError, ValueError):
+        # e.g. an in-memory stream
+        return stream
@@ -0,0 +1,237 @@
+"""
+The shell daemon: it keeps the interpreter, imported modules and
+the file cache warm, and runs command lines sent by `src.client`
+over a Unix domain socket
+
+Usage:
+    python -m src.daemon [SOCKET]
+
+"""
+
+from __future__ import annotations
+from typing import Callable, Optional
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+
+from .client import DIAGNOSTIC, DONE, ERROR, FRAME, OUTPUT
+from .client import defaultSocketPath
+from .executor import DECODE_ERRORS
+from .filecache import FileCache
+from .session import Session
+
+
+class _Disconnected(Exception):
+    pass
+
+
+class _DiagnosticWriter(io.TextIOBase):
+    """
+    The stderr of a session in the daemon: the text is sent
+    to the client in `DIAGNOSTIC` frames
+
+    """
+
+    def __init__(self, send: Callable[[bytes, bytes], None]) -> None:
+        self.__send = send
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        if text:
+            self.__send(DIAGNOSTIC, text.encode('utf-8', DECODE_ERRORS))
+
+        return len(text)
+
+
+class _SessionHandler(socketserver.StreamRequestHandler):
+    """
+    Serves one connection: it has its own session, so variables
+    and jobs of one client are not seen by others. The session
+    runs in the directory and the environment sent by the client
+
+    """
+
+    server: ShellServer
+
+    def setup(self) -> None:
+        super().setup()
+        # builtins in threads of the event loop may print diagnostics
+        self.__lock = threading.Lock()
+
+    def handle(self) -> None:
+        try:
+            hello = self.__readHello()
+        except _Disconnected:
+            return
+
+        if hello is None:
+            return
+
+        # the console of the daemon isn't the client's one
+        session = Session(fileCache=self.server.fileCache,
+                          stdin=io.StringIO(), cwd=hello['cwd'],
+                          env=hello['env'],
+                          stderr=_DiagnosticWriter(self.__send))
+
+        try:
+            for line in self.rfile:
+                line = line.decode('utf-8', DECODE_ERRORS).rstrip('\n')
+                if not self.__run(session, line):
+                    break
+        except _Disconnected:
+            pass
+        finally:
+            session.endSession()
+
+    def __readHello(self) -> Optional[dict]:
+        """
+        Read the first line of the client: its directory and environment
+
+        Returns:
+            dict: `cwd` and `env` of the session, None if the line
+                is invalid, then the client gets an error
+
+        Raises:
+            _Disconnected: if the client is gone
+
+        """
+
+        line: bytes = self.rfile.readline()
+        if not line:
+            return None
+
+        try:
+            hello = json.loads(line)
+            if not isinstance(hello, dict) or \
+                    not isinstance(hello.get('cwd'), str) or \
+                    not isinstance(hello.get('env'), dict) or \
+                    not all(isinstance(value, str)
+                            for value in hello['env'].values()):
+                raise ValueError
+        except ValueError:
+            self.__send(ERROR, b'daemon: the client must send its cwd and env')
+            return None
+
+        return hello
+
+    def __run(self, session: Session, line: str) -> bool:
+        """
+        Returns:
+            bool: False if the session is ended by `exit`
+
+        Raises:
+            _Disconnected: if the client is gone, the command is stopped
+
+        """
+
+        if not line or line.isspace():
+            self.__send(DONE)
+            return True
+
+        output = session.streamCmdResult(line)
+
+        try:
+            for chunk in output:
+                self.__send(OUTPUT, chunk.encode('utf-8', DECODE_ERRORS))
+        except EOFError:
+            return False
+        except _Disconnected:
+            raise
+        except Exception as e:
+            self.__send(ERROR, str(e).encode('utf-8', DECODE_ERRORS))
+        finally:
+            output.close()
+
+        self.__send(DONE)
+
+        return True
+
+    def __send(self, kind: bytes, payload: bytes = b'') -> None:
+        try:
+            with self.__lock:
+                self.wfile.write(FRAME.pack(kind, len(payload)) + payload)
+                self.wfile.flush()
+        except OSError:
+            raise _Disconnected from None
+
+
+class ShellServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Accepts clients on a Unix domain socket, each connection
+    is served in its own thread by its own `Session`.
+    The socket is accessible by its owner only
+
+    Args:
+        path (str): the socket path, a stale socket is replaced
+
+    Attributes:
+        fileCache (FileCache): the file cache shared by all sessions,
+            so it stays warm between connections
+
+    Raises:
+        OSError: if another daemon listens on the socket
+
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path: str) -> None:
+        self.fileCache = FileCache()
+
+        _removeStale(path)
+
+        # the clients run commands as the daemon owner
+        umask = os.umask(0o177)
+        try:
+            super().__init__(path, _SessionHandler)
+        finally:
+            os.umask(umask)
+
+    def server_close(self) -> None:
+        super().server_close()
+
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+def _removeStale(path: str) -> None:
+    if not os.path.exists(path):
+        return
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+        except OSError:
+            os.unlink(path)
+            return
+
+    raise OSError(f'{path}: the shell daemon is already running')
+
+
+def serve(path: Optional[str] = None) -> None:
+    """
+    Run the daemon until it's interrupted
+
+    """
+
+    path = path or defaultSocketPath()
+
+    with ShellServer(path) as server:
+        print(f'listening on {path}', file=sys.stderr)
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    serve(*sys.argv[1:2])
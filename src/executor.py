@@ -1,398 +1,2133 @@
-from abc import abstractmethod
-from typing import IO
-from .clparser import CmdIR
+from __future__ import annotations
+from typing import (IO, Any, AnyStr, Callable, Iterable, Iterator, Mapping,
+                    Optional, TYPE_CHECKING)
+from .clparser import CmdIR, Redirect, escapeArg, getCmdParser
+from .console import StdinReader
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from .registry import registry
+from .filecache import CachedFile
+from .spillbuffer import MemoryBudget, SpillBuffer
+from . import checksum
+from . import extsort
+from . import fanout
+from . import findtree
+from . import launcher
+from . import trigram
+import codecs
+import collections
+import errno
+import functools
+import itertools
 import io
 import os
 import sys
-import subprocess
+import shutil
 import re
+import threading
+import time
+
+if TYPE_CHECKING:
+    from .session import Session
+
+_BUFFER_SIZE: int = 64 * 1024
+
+# text passed between commands is UTF-8, undecodable bytes are kept
+# as lone surrogates, so binary data goes through text builtins unchanged
+DECODE_ERRORS: str = 'surrogateescape'
+
+
+def openRedirects(redirects: list[Redirect], cwd: Optional[str] = None
+                  ) -> tuple[Optional[int], Optional[int]]:
+    """
+    Open the files of the redirections. Like in Bash, all files
+    are opened in order, but only the last input and
+    the last output are used
+
+    Args:
+        redirects (list[Redirect]): the command redirections
+        cwd (str): the directory of relative file names,
+            the current one by default
+
+    Returns:
+        int: the input file descriptor, if any
+        int: the output file descriptor, if any
+            the caller must close them
+
+    """
+
+    fds: dict[str, Optional[int]] = {'<': None, '>': None}
+
+    try:
+        for redirect in redirects:
+            if redirect.op == '<':
+                flags = os.O_RDONLY
+            elif redirect.op == '>>':
+                flags = os.O_WRONLY | os.O_CREAT | os.O_APPEND
+            else:
+                flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+
+            fd = os.open(os.path.join(cwd or '', redirect.target),
+                         flags, 0o666)
+            kind = '<' if redirect.op == '<' else '>'
+
+            if fds[kind] is not None:
+                os.close(fds[kind])
+            fds[kind] = fd
+    except OSError:
+        for fd in fds.values():
+            if fd is not None:
+                os.close(fd)
+        raise
+
+    return fds['<'], fds['>']
+
+
+def _sessionBudget(session: Optional[Session]) -> Optional[MemoryBudget]:
+    return None if session is None else session.memory
+
+
+def closeStream(lines: Optional[Iterator[str]]) -> None:
+    """
+    Close the output of a command, the command stops and
+    closes the commands before it
+
+    """
+
+    close = getattr(lines, 'close', None)
+
+    if close is not None:
+        close()
+
+
+class _ClosingStream:
+    """
+    The output of a pipeline stage. Closing it closes the input of
+    the stage too, even if the stage has never been started
+
+    """
+
+    def __init__(self, lines: Iterator[str],
+                 upstream: Optional[Iterator[str]]) -> None:
+        self.__lines = lines
+        self.__upstream = upstream
+
+    def __iter__(self) -> _ClosingStream:
+        return self
+
+    def __next__(self) -> str:
+        return next(self.__lines)
+
+    def close(self) -> None:
+        try:
+            closeStream(self.__lines)
+        finally:
+            closeStream(self.__upstream)
+
+
+class _LineReader(io.TextIOBase):
+    """
+    A text stream over lines of the previous command,
+    a line is made only when it's read
+
+    """
+
+    def __init__(self, lines: Iterator[str]) -> None:
+        super().__init__()
+        self.__lines = lines
+        self.__buffer: str = ''
+
+    def readable(self) -> bool:
+        return True
+
+    def readline(self, size: Optional[int] = -1) -> str:
+        if not self.__buffer:
+            self.__buffer = next(self.__lines, '')
+
+        end: int = self.__buffer.find('\n') + 1 or len(self.__buffer)
+        if size is not None and 0 <= size < end:
+            end = size
+
+        line, self.__buffer = self.__buffer[:end], self.__buffer[end:]
+
+        return line
+
+    def read(self, size: Optional[int] = -1) -> str:
+        if size is None or size < 0:
+            data = self.__buffer + ''.join(self.__lines)
+            self.__buffer = ''
+            return data
+
+        chunks: list[str] = []
+
+        while size > 0:
+            chunk = self.readline(size)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            size -= len(chunk)
+
+        return ''.join(chunks)
+
+
+def _started(stream: Iterator) -> Iterator:
+    """
+    Start a pipeline stage at once: an external command is spawned
+    and a builtin runs up to its first output, even if the next stage
+    never reads it, like `touch f | echo`. The first chunk is kept
+    for the next stage, closing the result closes the stage
+
+    """
+
+    try:
+        first = next(stream)
+    except StopIteration:
+        return _ClosingStream(iter(()), stream)
+
+    return _ClosingStream(itertools.chain([first], stream), stream)
+
+
+def _splitLines(chunks: Iterator[bytes]) -> Iterator[str]:
+    """
+    Decode the output of an external command and split it into lines
+
+    """
+
+    decoder = codecs.getincrementaldecoder('utf-8')(DECODE_ERRORS)
+    tail: str = ''
+
+    for chunk in chunks:
+        lines = (tail + decoder.decode(chunk)).split('\n')
+        tail = lines.pop()
+        for line in lines:
+            yield f'{line}\n'
+
+    tail += decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+def _encodeLines(lines: Iterator[str]) -> Iterator[bytes]:
+    for line in lines:
+        yield line.encode('utf-8', DECODE_ERRORS)
+
+
+def _byteBlocks(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """
+    Cut the chunks at their last newline, so a block holds
+    whole lines, only the last block may have no newline
+
+    """
+
+    tail: bytes = b''
+
+    for chunk in chunks:
+        data = tail + chunk
+        end: int = data.rfind(b'\n') + 1
+        tail = data[end:]
+        if end:
+            yield data[:end]
+
+    if tail:
+        yield tail
+
+
+def _textLines(chunks: Iterator[bytes]) -> Iterator[str]:
+    """
+    Decode the chunks by blocks of whole lines and split them into
+    lines, each one ends with a newline. An ASCII block is decoded
+    as latin-1: the result is the same, but it isn't validated
+
+    """
+
+    for block in _byteBlocks(chunks):
+        if block.isascii():
+            text = block.decode('latin-1')
+        else:
+            text = block.decode('utf-8', DECODE_ERRORS)
+
+        lines = text.split('\n')
+        last = lines.pop()
+
+        for line in lines:
+            yield f'{line}\n'
+
+        if last:
+            yield f'{last}\n'
 
 
 class CmdExecutor(object):
     """
     An abstract class for a command execution
 
-    Args:
-        cmd (CmdIR): the command which need to be executed
+    Args:
+        cmd (CmdIR): the command which need to be executed
+        session (Session): the session which runs the command, if any
+
+    Attributes:
+        name (str): the command name
+        args (list): the command args
+        keys (list[str, str]): the command keys
+        redirects (list[Redirect]): the command redirections
+        session (Session): the session which runs the command, if any
+        cancelled (threading.Event): set when the command must stop,
+            e.g. on timeout; a builtin which may wait long without
+            output, like `tail -f`, checks it
+        maxArgs (int): the maximal count of args the command accepts,
+            None if it's unlimited
+        binary (bool): the command works on raw bytes, `streamBytes`
+            is its own implementation, so the pipeline doesn't decode
+            the data passed to it
+
+    Raises:
+        RuntimeError: if there is some error
+
+        FileNotFoundError: for `cat` and `wc` command only,
+            if no such file in directory
+
+    """
+
+    maxArgs: Optional[int] = None
+    binary: bool = False
+
+    def __init__(self, cmd: CmdIR,
+                 session: Optional[Session] = None) -> None:
+        self.name = cmd.name
+        self.args = cmd.args
+        self.keys = cmd.keys
+        self.redirects = cmd.redirects
+        self.session = session
+        self.cancelled = threading.Event()
+
+    @classmethod
+    def compile(cls, cmd: CmdIR) -> Any:
+        """
+        Derive the settings of the executor from the command keys.
+        It's called once when the IR is built, the executors made
+        for the command, e.g. when a script runs it many times,
+        take the result from `cmd.compiled`
+
+        Args:
+            cmd (CmdIR): the command
+
+        Returns:
+            Any: the settings, None by default
+
+        Raises:
+            ValueError: if the keys are wrong
+
+        """
+
+        return None
+
+    @classmethod
+    def acceptsInputFile(cls, cmd: CmdIR) -> bool:
+        """
+        Can the input stream of the command be replaced with a file
+        appended to its args, so that the output is the same.
+        The optimizer folds `cat FILE | cmd` into `cmd FILE` then
+
+        Args:
+            cmd (CmdIR): the command which reads the input stream
+
+        Returns:
+            bool: False by default
+
+        """
+
+        return False
+
+    def execute(self, istream: Optional[IO[str]]) -> IO[str]:
+        """
+        Execute the command. A command implements `execute`
+        or `stream`, the other one is made from it
+
+        Args:
+            istream (IO[str]): input stream, it's read from
+                the current position; None if there is no input
+
+        Returns:
+            IO[str]: output stream with the result of execution
+
+        """
+
+        ostream = self._newBuffer()
+        lines = None if istream is None else (ln for ln in istream)
+        ostream.writelines(self.stream(lines))
+
+        return ostream
+
+    def stream(self, upstream: Optional[Iterator[str]]) -> Iterator[str]:
+        """
+        Execute the command lazily: the output is made only when
+        the next command reads it, and the input is read only
+        when the command needs it. So a command which stops reading,
+        like `head`, stops the commands before it
+
+        Args:
+            upstream (Iterator[str]): lines of the previous command,
+                only the last one may have no newline;
+                None if there is no input
+
+        Yields:
+            str: lines of the output
+
+        """
+
+        istream = None if upstream is None else _LineReader(upstream)
+        ostream = self.execute(istream)
+        ostream.seek(0)
+
+        yield from ostream
+
+    def streamBytes(self, upstream: Optional[Iterator[bytes]]
+                    ) -> Iterator[bytes]:
+        """
+        `stream` over bytes. A text command gets its input decoded
+        only when it reads it, and its output is encoded
+
+        Args:
+            upstream (Iterator[bytes]): chunks of the previous command,
+                they may be split anywhere; None if there is no input
+
+        Yields:
+            bytes: chunks of the output
+
+        """
+
+        lines = None if upstream is None else _splitLines(upstream)
+
+        yield from _encodeLines(self.stream(lines))
+
+    def executeRedirected(self, istream: Optional[IO[str]]) -> IO[str]:
+        """
+        Execute the command with its I/O redirections.
+        The input file is read through a buffered file object and
+        the output is copied to the file by blocks
+
+        Args:
+            istream (IO[str]): input stream from the previous command
+
+        Returns:
+            IO[str]: output stream, empty if the output is redirected
+
+        """
+
+        if not self.redirects:
+            return self.execute(istream)
+
+        stdinFd, stdoutFd = openRedirects(self.redirects, self._cwd())
+
+        with ExitStack() as stack:
+            if stdinFd is not None:
+                istream = stack.enter_context(
+                    open(stdinFd, 'r', buffering=_BUFFER_SIZE,
+                         encoding='utf-8', errors=DECODE_ERRORS,
+                         newline='\n'))
+
+            ofile = None
+            if stdoutFd is not None:
+                ofile = stack.enter_context(
+                    open(stdoutFd, 'w', buffering=_BUFFER_SIZE,
+                         encoding='utf-8', errors=DECODE_ERRORS,
+                         newline='\n'))
+
+            result = self.execute(istream)
+
+            if ofile is None:
+                return result
+
+            result.seek(0)
+            shutil.copyfileobj(result, ofile, _BUFFER_SIZE)
+
+        return io.StringIO()
+
+    def _cwd(self) -> Optional[str]:
+        """
+        The working directory of the session,
+        None for the current one of the process
+
+        """
+
+        return None if self.session is None else self.session.cwd
+
+    def _path(self, filename: str) -> str:
+        """
+        The file path relative to the working directory of the session
+
+        """
+
+        return os.path.join(self._cwd() or '', filename)
+
+    def _stdin(self) -> IO[str]:
+        """
+        The console input of the session
+
+        """
+
+        return sys.stdin if self.session is None else self.session.stdin
+
+    def _stdinChunks(self) -> Optional[Iterator[bytes]]:
+        """
+        The console input as raw blocks
+
+        Returns:
+            Iterator[bytes]: the blocks, None if the console
+                is read only as text, e.g. a terminal
+
+        """
+
+        stdin = self._stdin()
+
+        return stdin.chunks() if isinstance(stdin, StdinReader) else None
+
+    def _cachedFile(self, filename: str,
+                    load: bool = True) -> Optional[CachedFile]:
+        """
+        The file content from the session file cache
+
+        Args:
+            filename (str): the file path
+            load (bool): read the file if it isn't cached
+
+        Returns:
+            CachedFile: the file content, None if there is no session
+                or the file isn't cached
+
+        """
+
+        if self.session is None:
+            return None
+
+        if not load:
+            return self.session.fileCache.lookup(self._path(filename))
+
+        return self.session.fileCache.get(self._path(filename))
+
+    def _fileLines(self, filename: str) -> Iterator[str]:
+        """
+        Lines of the file, it's read through the session file cache
+
+        """
+
+        cached = self._cachedFile(filename)
+
+        if cached is not None:
+            yield from cached.lines
+            return
+
+        with open(self._path(filename), 'r', encoding='utf-8',
+                  errors=DECODE_ERRORS, newline='\n') as f:
+            yield from f
+
+    def _newBuffer(self) -> SpillBuffer:
+        """
+        A buffer for an output which may be large, it's moved
+        to a file past the session memory budget
+
+        """
+
+        return SpillBuffer(_sessionBudget(self.session))
+
+    def streamRedirected(self, upstream: Optional[Iterator[str]]
+                         ) -> Iterator[str]:
+        """
+        `stream` with the I/O redirections. A command with
+        the output redirected is run at once, so it's done
+        even if the next command doesn't read its input
+
+        Args:
+            upstream (Iterator[str]): lines of the previous command
+
+        Returns:
+            Iterator[str]: lines of the output, closing it
+                closes `upstream`
+
+        """
+
+        return self._redirected(self.stream, upstream, binary=False)
+
+    def streamBytesRedirected(self, upstream: Optional[Iterator[bytes]]
+                              ) -> Iterator[bytes]:
+        """
+        `streamRedirected` over bytes
+
+        """
+
+        return self._redirected(self.streamBytes, upstream, binary=True)
+
+    def _redirected(self, stream: Callable[[Optional[Iterator]], Iterator],
+                    upstream: Optional[Iterator], binary: bool) -> Iterator:
+        if not self.redirects:
+            return _ClosingStream(stream(upstream), upstream)
+
+        stdinFd, stdoutFd = openRedirects(self.redirects, self._cwd())
+
+        def openFd(fd: int, mode: str) -> IO:
+            if binary:
+                return open(fd, mode + 'b', buffering=_BUFFER_SIZE)
+
+            return open(fd, mode, buffering=_BUFFER_SIZE,
+                        encoding='utf-8', errors=DECODE_ERRORS, newline='\n')
+
+        source: Optional[Iterator] = upstream
+
+        if stdinFd is not None:
+            closeStream(upstream)
+            upstream = source = openFd(stdinFd, 'r')
+
+            if binary:
+                # a binary file is iterated by lines, the command
+                # takes blocks split anywhere
+                source = iter(functools.partial(upstream.read, _BUFFER_SIZE),
+                              b'')
+
+        output = _ClosingStream(stream(source), upstream)
+
+        if stdoutFd is None:
+            return output
+
+        try:
+            with openFd(stdoutFd, 'w') as ofile:
+                ofile.writelines(output)
+        finally:
+            output.close()
+
+        return iter(())
+
+
+class EchoExecutor(CmdExecutor):
+    """
+    `echo`: print given arguments
+
+    """
+
+    def __init__(self, cmd: CmdIR,
+                 session: Optional[Session] = None) -> None:
+        super().__init__(cmd, session)
+
+    def execute(self, istream: Optional[IO[str]]) -> io.StringIO:
+        ostream = io.StringIO()
+
+        try:
+            ostream.write(' '.join(self.args))
+        except Exception:
+            raise RuntimeError('echo: check your arguments')
+
+        return ostream
+
+
+class PwdExecutor(CmdExecutor):
+    """
+    `pwd`: print current directory
+    args isn't required
+
+    """
+
+    def __init__(self, cmd: CmdIR,
+                 session: Optional[Session] = None) -> None:
+        super().__init__(cmd, session)
+
+    def execute(self, istream: Optional[IO[str]]) -> io.StringIO:
+        ostream = io.StringIO()
+
+        try:
+            ostream.write(self._cwd() or os.getcwd())
+        except Exception:
+            raise RuntimeError('pwd: some bads with pwd')
+
+        return ostream
+
+
+class CdExecutor(CmdExecutor):
+    """
+    `cd [DIR]`: change the current directory of the session,
+    HOME by default. Other sessions and the process itself
+    keep their directories
+
+    """
+
+    def execute(self, istream: Optional[IO[str]]) -> io.StringIO:
+        if len(self.args) > 1:
+            raise ValueError('cd: too many arguments')
+
+        env = os.environ if self.session is None else self.session.env
+        target: Optional[str] = self.args[0] if self.args \
+            else env.get('HOME')
+
+        if not target:
+            raise ValueError('cd: HOME not set')
+
+        path: str = os.path.normpath(self._path(target))
+
+        if not os.path.exists(path):
+            raise FileNotFoundError(
+                f'cd: {target}: No such file or directory')
+
+        if not os.path.isdir(path):
+            raise NotADirectoryError(f'cd: {target}: Not a directory')
+
+        if self.session is None:
+            os.chdir(path)
+        else:
+            self.session.cwd = os.path.abspath(path)
+            self.session.env['PWD'] = self.session.cwd
+
+        return io.StringIO()
+
+
+class CatExecutor(CmdExecutor):
+    """
+    `cat [FILE...]`: print the content of the FILEs one after another,
+        if there is no FILE, cat prints
+        the content of the input stream
+
+    """
+
+    def __init__(self, cmd: CmdIR,
+                 session: Optional[Session] = None) -> None:
+        super().__init__(cmd, session)
+
+    @classmethod
+    def acceptsInputFile(cls, cmd: CmdIR) -> bool:
+        return not cmd.args
+
+    def stream(self, upstream: Optional[Iterator[str]]) -> Iterator[str]:
+        if not self.args:
+            yield from self._stdin() if upstream is None else upstream
+            return
+
+        # like bytes, the last line of a file without a newline
+        # is joined with the first line of the next file
+        partial: str = ''
+
+        for filename in self.args:
+            try:
+                lines = self._fileLines(filename)
+                line = next(lines, '')
+            except FileNotFoundError:
+                raise FileNotFoundError(f'cat: {filename}: no such file')
+
+            if partial:
+                line = partial + line
+                partial = ''
+
+            for line in itertools.chain([line], lines):
+                if line.endswith('\n'):
+                    yield line
+                else:
+                    partial = line
+
+        if partial:
+            yield partial
+
+
+class WcExecutor(CmdExecutor):
+    """
+    `wc [-lwc] [FILE...]`: print a count of line,
+    count of word, count of char in each FILE
+    or in the input stream, if there is no FILE.
+    Several files are followed by their total.
+    With keys only the chosen counts are printed
+
+    The input stream is counted as raw bytes, only blocks
+    which are not ASCII are decoded
+
+    Attributes:
+        columns (tuple[bool, bool, bool]): are lines, words
+            and chars printed
+
+    """
+
+    binary = True
+
+    # `str.split` splits by these ASCII chars too, `bytes.split` doesn't
+    _SEPARATORS: bytes = bytes.maketrans(b'\x1c\x1d\x1e\x1f', b'    ')
+
+    def __init__(self, cmd: CmdIR,
+                 session: Optional[Session] = None) -> None:
+        super().__init__(cmd, session)
+
+        self.columns: tuple[bool, bool, bool] = cmd.compiled
+
+    @classmethod
+    def compile(cls, cmd: CmdIR) -> tuple[bool, bool, bool]:
+        """
+        Returns:
+            tuple[bool, bool, bool]: are lines, words and chars printed,
+                all of them if there are no keys
+
+        """
+
+        columns = tuple(k in cmd.keys for k in ('-l', '-w', '-c'))
+
+        return columns if any(columns) else (True, True, True)
+
+    @classmethod
+    def _counts(cls, lines: Iterable[str]) -> tuple[int, int, int]:
+        lineCnt, wordCnt, charCnt = 0, 0, 0
+
+        for line in lines:
+            lineCnt += 1
+            wordCnt += len(line.split())
+            charCnt += len(line)
+
+        return lineCnt, wordCnt, charCnt
+
+    def _format(self, counts: tuple[int, int, int],
+                filename: str = '') -> str:
+        fields = [str(n) for n, shown in zip(counts, self.columns) if shown]
+
+        if filename:
+            fields.append(filename)
+
+        return ' '.join(fields)
+
+    def _fileCounts(self, filename: str) -> tuple[int, int, int]:
+        try:
+            cached = self._cachedFile(filename)
+
+            if cached is not None:
+                return cached.counts
+
+            with open(self._path(filename), 'r', encoding='utf-8',
+                      errors=DECODE_ERRORS, newline='\n') as f:
+                return WcExecutor._counts(f)
+        except FileNotFoundError:
+            raise FileNotFoundError(f'wc: {filename}: no such file')
+
+    def stream(self, upstream: Optional[Iterator[str]]) -> Iterator[str]:
+        if not self.args:
+            if upstream is not None:
+                # the last line is counted as if it ends with a newline
+                counts = WcExecutor._counts(
+                    ln if ln.endswith('\n') else f'{ln}\n' for ln in upstream)
+            else:
+                counts = WcExecutor._counts(self._stdin())
+
+            yield self._format(counts)
+            return
+
+        total: list[int] = [0, 0, 0]
+
+        for i, filename in enumerate(self.args):
+            counts = self._fileCounts(filename)
+            total = [t + n for t, n in zip(total, counts)]
+
+            yield f'\n{self._format(counts, filename)}' if i \
+                else self._format(counts, filename)
+
+        if len(self.args) > 1:
+            yield f'\n{self._format(tuple(total), "total")}'
+
+    def streamBytes(self, upstream: Optional[Iterator[bytes]]
+                    ) -> Iterator[bytes]:
+        if upstream is None and not self.args:
+            upstream = self._stdinChunks()
+
+        if self.args or upstream is None:
+            yield from super().streamBytes(upstream)
+            return
+
+        lineCnt, wordCnt, charCnt = 0, 0, 0
+
+        for block in _byteBlocks(upstream):
+            # the last line is counted as if it ends with a newline
+            if not block.endswith(b'\n'):
+                block += b'\n'
+
+            lineCnt += block.count(b'\n')
+
+            if block.isascii():
+                wordCnt += len(block.translate(self._SEPARATORS).split())
+                charCnt += len(block)
+            else:
+                text = block.decode('utf-8', DECODE_ERRORS)
+                wordCnt += len(text.split())
+                charCnt += len(text)
+
+        yield self._format((lineCnt, wordCnt, charCnt)).encode()
+
+
+class GrepExecutor(CmdExecutor):
+    """
+    `grep pattern FILE...`
+    `grep -r pattern [DIR...]`
+    `... | grep pattern`: prints all lines where pattern in
+
+    With several files or `-r` each line is prefixed with its file.
+    If a directory has the trigram index made by `index`,
+    `grep -r` reads only the files which may match.
+    The input stream is matched line by line as raw bytes,
+    a line is decoded only to match it and isn't encoded back
+
+    Attributes:
+        iKey (bool): is it need to match with case insensitive
+        wKey (bool): is it need to match a whole word
+        rKey (bool): is it need to search directories recursively
+        aKey (int): the count of strings need to print after match
+        regex (re.Pattern): the compiled pattern
+
+    """
+
+    binary = True
+
+    def __init__(self, cmd: CmdIR,
+                 session: Optional[Session] = None) -> None:
+        super().__init__(cmd, session)
+
+        self.iKey: bool
+        self.wKey: bool
+        self.rKey: bool
+        self.aKey: int
+        self.regex: re.Pattern
+
+        self.iKey, self.wKey, self.rKey, self.aKey, self.regex = cmd.compiled
+
+    @classmethod
+    def compile(cls, cmd: CmdIR) -> tuple[bool, bool, bool, int, re.Pattern]:
+        """
+        Returns:
+            bool: -i, match with case insensitive
+            bool: -w, match the whole word
+            bool: -r, search directories recursively
+            int: -A n, print n lines after match
+            re.Pattern: the pattern compiled with these keys
+
+        Raises:
+            ValueError: if the pattern isn't a valid regex
+
+        """
+
+        iKey: bool = '-i' in cmd.keys
+        wKey: bool = '-w' in cmd.keys
+        pattern: str = rf'\b{cmd.args[0]}\b' if wKey else cmd.args[0]
+
+        try:
+            regex = re.compile(pattern, re.IGNORECASE if iKey else 0)
+        except re.error as e:
+            raise ValueError(f'grep: {cmd.args[0]}: {e}')
+
+        return (iKey, wKey, '-r' in cmd.keys,
+                int(cmd.keys.get('-A', 0)), regex)
+
+    @classmethod
+    def acceptsInputFile(cls, cmd: CmdIR) -> bool:
+        # `grep -r pattern` searches the current directory
+        return len(cmd.args) == 1 and '-r' not in cmd.keys
+
+    def _getFileLines(self, filename: str) -> Iterator[str]:
+        try:
+            cached = self._cachedFile(filename)
+            f = None if cached is not None else open(
+                self._path(filename), 'r', encoding='utf-8',
+                errors=DECODE_ERRORS, newline='\n')
+        except FileNotFoundError:
+            raise FileNotFoundError(f'grep: {filename}: no such file')
+
+        if f is None:
+            yield from cached.lines
+            return
+
+        with f:
+            yield from f
+
+    def _getStreamLines(self, upstream: Optional[Iterator[str]]
+                        ) -> Iterator[str]:
+        if upstream is None:
+            upstream = self._stdin()
+
+        for s in upstream:
+            yield s if s.endswith('\n') else f'{s}\n'
+
+    def _treeFiles(self, root: str, pattern: str) -> Iterator[str]:
+        index = trigram.TrigramIndex.load(self._path(root))
+        candidates = None if index is None \
+            else index.candidates(pattern, self.iKey)
+
+        for rel, entry in trigram.walkFiles(self._path(root)):
+            if candidates is not None and rel not in candidates \
+                    and index.isFresh(rel, entry.stat()):
+                continue
+
+            yield rel if root == '.' else os.path.join(root, rel)
+
+    def _sources(self, upstream: Optional[Iterator[str]]
+                 ) -> Iterator[tuple[str, Iterator[str]]]:
+        """
+        Yields:
+            str: the file name, empty for the input stream
+            Iterator[str]: lines of the file
+
+        """
+
+        pattern, *paths = self.args
+
+        if not paths and not self.rKey:
+            yield '', self._getStreamLines(upstream)
+            return
+
+        for path in paths or ['.']:
+            if not self.rKey or not os.path.isdir(self._path(path)):
+                yield path, self._getFileLines(path)
+                continue
+
+            for filename in self._treeFiles(path, pattern):
+                # like GNU grep, skip files which are not text
+                with open(self._path(filename), 'rb') as f:
+                    if trigram.isBinary(f.read(trigram.BINARY_CHECK_SIZE)):
+                        continue
+
+                yield filename, self._getFileLines(filename)
+
+    def _selected(self, sources: Iterator[tuple[str, Iterator[AnyStr]]],
+                  toText: Callable[[AnyStr], str]
+                  ) -> Iterator[tuple[str, Optional[AnyStr], bool]]:
+        """
+        Select the matched lines and the lines after them
+
+        Args:
+            sources: file names and their lines, each ends with a newline
+            toText: makes the text of a line to match it
+
+        Yields:
+            str: the file name
+            AnyStr: the line, None for `--` which, like in GNU grep,
+                separates groups of lines which are not adjacent
+            bool: True if the line matches, False for a line after it
+
+        """
+
+        search = self.regex.search
+        printed = False
+        skipped = False
+
+        for filename, lines in sources:
+            after: int = 0
+
+            for line in lines:
+                if search(toText(line)):
+                    if self.aKey != 0 and printed and skipped:
+                        yield filename, None, False
+                    printed, skipped = True, False
+                    after = self.aKey
+                    yield filename, line, True
+                elif after > 0:
+                    after -= 1
+                    yield filename, line, False
+                else:
+                    skipped = True
+
+            skipped = True
+
+    def stream(self, upstream: Optional[Iterator[str]]) -> Iterator[str]:
+        withNames: bool = self.rKey or len(self.args) > 2
+        sources = ((filename, (ln if ln.endswith('\n') else f'{ln}\n'
+                               for ln in lines))
+                   for filename, lines in self._sources(upstream))
+
+        for filename, line, isMatch in self._selected(sources, str):
+            if line is None:
+                yield '--\n'
+            elif withNames:
+                yield f'{filename}{":" if isMatch else "-"}{line}'
+            else:
+                yield line
+
+    def streamBytes(self, upstream: Optional[Iterator[bytes]]
+                    ) -> Iterator[bytes]:
+        if upstream is None and len(self.args) == 1 and not self.rKey:
+            upstream = self._stdinChunks()
+
+        if upstream is None or len(self.args) > 1 or self.rKey:
+            yield from super().streamBytes(upstream)
+            return
+
+        for filename, line, _ in self._selected(
+                iter([('', _textLines(upstream))]), str):
+            yield b'--\n' if line is None \
+                else line.encode('utf-8', DECODE_ERRORS)
+
+
+class ExitExecutor(CmdExecutor):
+    """
+    Stops the session
+
+    """
+
+    def execute(self, istream: Optional[IO[str]]) -> io.StringIO:
+        raise EOFError
+
+
+class ExternalExecutor(CmdExecutor):
+    """
+    Run some external process
+
+    The process path is taken from the session hash table,
+    so PATH is searched only on the first run of the command.
+    The files of redirections are passed to the process
+    as its stdin and stdout directly. Its input and output
+    are raw bytes, they are decoded only for a text builtin
+
+    """
+
+    binary = True
+
+    def __init__(self, cmd: CmdIR,
+                 session: Optional[Session] = None) -> None:
+        super().__init__(cmd, session)
+
+    def _findPath(self) -> Optional[str]:
+        # a relative path like `./run.sh` is in the session directory
+        if '/' in self.name:
+            return self._path(self.name)
+
+        if self.session is None:
+            return shutil.which(self.name)
+
+        return self.session.hashTable.lookup(self.name)
+
+    def _spawn(self, stdin: Optional[int] = launcher.PIPE,
+               stdout: Optional[int] = launcher.PIPE) -> launcher.Process:
+        argv: list[str] = [self.name, *self.args]
+        fullPath = self._findPath()
+        env = None if self.session is None else self.session.env
+        cwd = self._cwd()
+
+        try:
+            return launcher.spawn(fullPath, argv, stdin, stdout, env, cwd)
+        except OSError as e:
+            newPath = self._rehash(fullPath, e)
+
+        return launcher.spawn(newPath, argv, stdin, stdout, env, cwd)
+
+    def _rehash(self, failedPath: Optional[str], error: OSError) -> str:
+        """
+        The hashed command was moved or removed, search it again
+
+        Args:
+            failedPath (str): the path which couldn't be executed
+            error (OSError): the error of executing it
+
+        Returns:
+            str: the new path of the command
+
+        Raises:
+            FileNotFoundError: if there is no such command anymore
+            OSError: `error`, if the file exists but can't be executed,
+                e.g. it isn't executable, or the command wasn't hashed
+                or is found at the same path
+
+        """
+
+        if error.errno != errno.ENOENT or failedPath is None \
+                or self.session is None:
+            raise error
+
+        hashTable = self.session.hashTable
+        hashTable.forget(self.name)
+        newPath = hashTable.lookup(self.name)
+
+        if newPath is None:
+            raise FileNotFoundError(2, 'No such file or directory', self.name)
+
+        if newPath == failedPath:
+            raise error
+
+        return newPath
+
+    def execute(self, istream: Optional[IO[str]]) -> io.StringIO:
+        ostream = io.StringIO()
+
+        stdinFd, stdoutFd = openRedirects(self.redirects, self._cwd())
+
+        try:
+            externalProcess = self._spawn(
+                launcher.PIPE if stdinFd is None else stdinFd,
+                launcher.PIPE if stdoutFd is None else stdoutFd)
+        finally:
+            for fd in (stdinFd, stdoutFd):
+                if fd is not None:
+                    os.close(fd)
+
+        encodedInput = b''
+        if istream is not None and stdinFd is None:
+            encodedInput = istream.read().encode('utf-8', DECODE_ERRORS)
+
+        result = externalProcess.communicate(encodedInput).decode(
+            'utf-8', DECODE_ERRORS)
+
+        ostream.write(result)
+
+        return ostream
+
+    def executeRedirected(self, istream: Optional[IO[str]]) -> io.StringIO:
+        return self.execute(istream)
+
+    def stream(self, upstream: Optional[Iterator[str]]) -> Iterator[str]:
+        chunks = None if upstream is None else _encodeLines(upstream)
+        output = self.streamBytes(chunks)
+
+        return _ClosingStream(_splitLines(output), output)
+
+    def streamBytes(self, upstream: Optional[Iterator[bytes]]
+                    ) -> Iterator[bytes]:
+        stdinFd, stdoutFd = openRedirects(self.redirects, self._cwd())
+
+        try:
+            externalProcess = self._spawn(
+                launcher.PIPE if stdinFd is None else stdinFd,
+                launcher.PIPE if stdoutFd is None else stdoutFd)
+        finally:
+            for fd in (stdinFd, stdoutFd):
+                if fd is not None:
+                    os.close(fd)
+
+        chunks = upstream if stdinFd is None else None
 
-    Attributes:
-        name (str): the command name
-        args (list): the command args
-        keys (list[str, str]): the command keys
+        try:
+            yield from externalProcess.iterate(chunks)
+            externalProcess.wait()
+        finally:
+            # if the next command stops reading, the process
+            # is terminated instead of running to the end
+            externalProcess.close()
 
-    Raises:
-        RuntimeError: if there is some error
+    def streamRedirected(self, upstream: Optional[Iterator[str]]
+                         ) -> Iterator[str]:
+        return _ClosingStream(self.stream(upstream), upstream)
+
+    def streamBytesRedirected(self, upstream: Optional[Iterator[bytes]]
+                              ) -> Iterator[bytes]:
+        return _ClosingStream(self.streamBytes(upstream), upstream)
 
-        FileNotFoundError: for `cat` and `wc` command only,
-            if no such file in directory
 
+class HashExecutor(CmdExecutor):
     """
+    `hash [-r] [-d|-t] [NAME...]`: show or change
+    the remembered paths of external commands
 
-    def __init__(self, cmd: CmdIR) -> None:
-        self.name = cmd.name
-        self.args = cmd.args
-        self.keys = cmd.keys
+    Without args prints all remembered commands
+    and how many times they were run
 
-    @abstractmethod
-    def execute(self, istream: io.StringIO) -> io.StringIO:
-        """
-        Execute the command
+    """
 
-        Args:
-            istream (io.StringIO): input stream
+    def execute(self, istream: Optional[IO[str]]) -> io.StringIO:
+        if self.session is None:
+            raise RuntimeError('hash: there is no session')
 
-        Returns:
-            io.StringIO: output stream with the result of execution
+        ostream = io.StringIO()
+        hashTable = self.session.hashTable
 
-        """
+        if '-r' in self.keys:
+            hashTable.clear()
 
-        pass
+        for name in self.args:
+            if '-d' in self.keys:
+                hashTable.forget(name)
+                continue
 
-    @classmethod
-    @abstractmethod
-    def _cmdImpl(cls, istream: IO, *args) -> io.StringIO:
-        """
-        The implementation of the concrete command
+            fullPath = hashTable.resolve(name)
 
-        """
+            if fullPath is None:
+                raise FileNotFoundError(f'hash: {name}: not found')
 
-        pass
+            if '-t' in self.keys:
+                ostream.write(f'{fullPath}\n')
 
-    @classmethod
-    def _readFromStream(cls, istream: io.StringIO) -> io.StringIO:
-        newStream = io.StringIO(istream.getvalue())
-        return cls._cmdImpl(newStream)
+        if self.args or '-r' in self.keys:
+            return ostream
 
-    @classmethod
-    def _readFromConsole(cls) -> io.StringIO:
-        return cls._cmdImpl(sys.stdin)
+        items = hashTable.items()
 
-    @classmethod
-    def _readFromFile(cls, filename: str) -> io.StringIO:
-        with open(filename, 'r') as f:
-            return cls._cmdImpl(f)
+        if not items:
+            ostream.write('hash: hash table empty')
+            return ostream
 
+        ostream.write('hits\tcommand\n')
+        for _, fullPath, hits in items:
+            ostream.write(f'{hits:4}\t{fullPath}\n')
 
-class EchoExecutor(CmdExecutor):
+        return ostream
+
+
+class JobsExecutor(CmdExecutor):
     """
-    `echo`: print given arguments
+    `jobs`: print the pipelines started in background
 
     """
 
-    def __init__(self, cmd: CmdIR) -> None:
-        super().__init__(cmd)
+    def execute(self, istream: Optional[IO[str]]) -> io.StringIO:
+        if self.session is None:
+            raise RuntimeError('jobs: there is no session')
 
-    def execute(self, istream: io.StringIO) -> io.StringIO:
         ostream = io.StringIO()
-
-        try:
-            ostream.write(' '.join(self.args))
-        except Exception:
-            raise RuntimeError('echo: check your arguments')
+        ostream.write('\n'.join(map(str, self.session.jobs.list())))
 
         return ostream
 
 
-class PwdExecutor(CmdExecutor):
+class WaitExecutor(CmdExecutor):
     """
-    `pwd`: print current directory
-    args isn't required
+    `wait [N...]`: wait for the background jobs with
+    numbers N (all jobs by default) and print their output
 
     """
 
-    def __init__(self, cmd: CmdIR) -> None:
-        super().__init__(cmd)
+    def execute(self, istream: Optional[IO[str]]) -> io.StringIO:
+        if self.session is None:
+            raise RuntimeError('wait: there is no session')
+
+        jobTable = self.session.jobs
+        nums: list[int] = []
+
+        for arg in self.args:
+            num = arg.lstrip('%')
+
+            if not num.isnumeric() or jobTable.get(int(num)) is None:
+                raise ValueError(f'wait: {arg}: no such job')
+
+            nums.append(int(num))
 
-    def execute(self, istream: io.StringIO) -> io.StringIO:
         ostream = io.StringIO()
+        output = ''.join(job.output() for job in jobTable.wait(nums or None))
 
-        try:
-            ostream.write(os.getcwd())
-        except Exception:
-            raise RuntimeError('pwd: some bads with pwd')
+        # each output ends with a newline, runCommand adds the last one
+        ostream.write(output.removesuffix('\n'))
 
         return ostream
 
 
-class CatExecutor(CmdExecutor):
+def _argMax(env: Optional[Mapping[str, str]] = None) -> int:
     """
-    `cat [FILE]`: print the FILE content
-        if there is no FILE, cat prints
-        the content of the input stream
+    The size in bytes which command args may take,
+    like in `xargs` the environment and some headroom are excluded
+
+    Args:
+        env (Mapping[str, str]): the environment of the command,
+            the process environment by default
+
+    """
+
+    try:
+        argMax: int = os.sysconf('SC_ARG_MAX')
+    except (AttributeError, ValueError, OSError):
+        argMax = 128 * 1024
+
+    pointerSize = 8
+    envSize = sum(len(k) + len(v) + 2 + pointerSize
+                  for k, v in (env or os.environ).items())
 
-    can be used only with one file
+    return max(argMax - envSize - 2048, 4096)
+
+
+class XargsExecutor(CmdExecutor):
+    """
+    `xargs [-n N] [-P N] [COMMAND [ARGS...]]`: run COMMAND with ARGS
+    and the whitespace separated items of the input
+
+    Items are packed into as few runs as ARG_MAX allows, or the command
+    args limit for builtins. Builtins are run in-process.
+    With `-P N` up to N runs go at the same time,
+    the output keeps the order of the runs
+
+    Attributes:
+        cmdArgs (list[str]): the command and its args, `echo` by default
+        maxItems (int): the maximal count of items per run
+        procs (int): the maximal count of runs at the same time
 
     """
 
-    def __init__(self, cmd: CmdIR) -> None:
-        super().__init__(cmd)
+    def __init__(self, cmd: CmdIR,
+                 session: Optional[Session] = None) -> None:
+        super().__init__(cmd, session)
+
+        self.cmdArgs: list[str]
+        self.maxItems: Optional[int]
+        self.procs: int
+
+        self.cmdArgs, self.maxItems, self.procs = cmd.compiled
 
     @classmethod
-    def _cmdImpl(cls, istream: IO) -> io.StringIO:
-        ostream: io.StringIO = io.StringIO()
+    def compile(cls, cmd: CmdIR) -> tuple[list[str], Optional[int], int]:
+        """
+        Returns:
+            list[str]: the command and its args
+            int: the maximal count of items per run
+            int: the maximal count of runs at the same time
 
-        for line in istream:
-            ostream.write(line)
+        Raises:
+            ValueError: if the args of the builtin leave no room for items
 
-        return ostream
+        """
+
+        cmdArgs: list[str] = cmd.args or ['echo']
+        maxItems: Optional[int] = int(cmd.keys.get('-n', 0)) or None
+        procs: int = max(int(cmd.keys.get('-P', 1)), 1)
+
+        pair = registry.lookup(cmdArgs[0])
+        limit = None if pair is None else pair[1].maxArgs
+
+        if limit is not None:
+            try:
+                # keys of the builtin are not its args
+                limit -= len(getCmdParser(
+                    ' '.join(map(escapeArg, cmdArgs))).args)
+            except SyntaxError:
+                limit -= len(cmdArgs) - 1
+
+            if limit < 1:
+                raise ValueError(
+                    f'xargs: {cmdArgs[0]}: too many args for builtin')
+
+            maxItems = min(maxItems or limit, limit)
+
+        return cmdArgs, maxItems, procs
+
+    def _batches(self, items: list[str]) -> list[list[str]]:
+        sizeLimit: int = _argMax(
+            None if self.session is None else self.session.env)
+        fixedSize: int = sum(len(a.encode()) + 9 for a in self.cmdArgs)
+
+        batches: list[list[str]] = []
+        batch: list[str] = []
+        size: int = fixedSize
+
+        for item in items:
+            itemSize = len(item.encode()) + 9
+
+            if fixedSize + itemSize > sizeLimit:
+                raise ValueError('xargs: argument line too long')
+
+            if batch and (size + itemSize > sizeLimit
+                          or len(batch) == self.maxItems):
+                batches.append(batch)
+                batch, size = [], fixedSize
+
+            batch.append(item)
+            size += itemSize
 
-    def execute(self, istream: io.StringIO) -> io.StringIO:
+        if batch:
+            batches.append(batch)
+
+        return batches
+
+    def _run(self, batch: list[str]) -> str:
+        line: str = ' '.join(map(escapeArg, [*self.cmdArgs, *batch]))
+        executor = processCmd(getCmdParser(line), self.session)
+        output = executor.execute(None).getvalue()
+
+        if output and not output.endswith('\n'):
+            output += '\n'
+
+        return output
+
+    def execute(self, istream: Optional[IO[str]]) -> io.StringIO:
         ostream = io.StringIO()
-        cntArgs: int = len(self.args)
-
-        if cntArgs == 1:
-            filename: str = self.args[0]
-            ostream = self._readFromFile(filename)
-        elif cntArgs == 0:
-            if istream.getvalue():
-                ostream = self._readFromStream(istream)
-            else:
-                ostream = self._readFromConsole()
-        else:
-            raise ValueError(
-                f'cat: cat supports only one file, but given {cntArgs}')
+
+        if istream is None:
+            istream = self._stdin()
+
+        batches = self._batches(istream.read().split())
+
+        if self.procs == 1 or len(batches) < 2:
+            outputs = map(self._run, batches)
+            ostream.write(''.join(outputs).removesuffix('\n'))
+            return ostream
+
+        with ThreadPoolExecutor(self.procs) as pool:
+            outputs = pool.map(self._run, batches)
+            ostream.write(''.join(outputs).removesuffix('\n'))
 
         return ostream
 
 
-class WcExecutor(CmdExecutor):
+class SortExecutor(CmdExecutor):
     """
-    `wc FILE`: print a count of line,
-    count of word, count of char in the FILE
-    or the input stream, if there is no FILE
+    `sort [-nru] [-k N[,M]] [-t SEP] [-S SIZE] [--parallel N] [FILE...]`:
+    print sorted lines of the FILEs or of the input stream
+
+    Up to SIZE bytes (64M by default) are sorted in memory, after that
+    sorted runs are spilled to temporary files and merged
+
+    Attributes:
+        key (SortKey): makes the sort key of a line
+        memoryLimit (int): the memory budget in bytes
+        parallel (int): the count of processes sorting spilled runs
+
     """
 
-    def __init__(self, cmd: CmdIR) -> None:
-        super().__init__(cmd)
+    def __init__(self, cmd: CmdIR,
+                 session: Optional[Session] = None) -> None:
+        super().__init__(cmd, session)
+
+        self.key: extsort.SortKey
+        self.memoryLimit: int
+        self.parallel: int
+
+        self.key, self.memoryLimit, self.parallel = cmd.compiled
 
     @classmethod
-    def _cmdImpl(cls, istream: IO) -> io.StringIO:
-        ostream: io.StringIO = io.StringIO()
+    def compile(cls, cmd: CmdIR) -> tuple[extsort.SortKey, int, int]:
+        """
+        Returns:
+            SortKey: makes the sort key of a line
+            int: the memory budget in bytes
+            int: the count of processes sorting spilled runs
 
-        lineCnt, wordCnt, charCnt = 0, 0, 0
+        Raises:
+            ValueError: if the field specification, the separator
+                or the size is wrong
 
-        for line in istream:
-            lineCnt += 1
-            wordCnt += len(line.split())
-            charCnt += len(line)
+        """
 
-        ostream.write(f'{lineCnt} {wordCnt} {charCnt}')
+        keys: dict[str, str] = cmd.keys
+        fields: Optional[tuple[int, int]] = None
 
-        return ostream
+        if '-k' in keys:
+            first, _, last = keys['-k'].partition(',')
+
+            if not first.isnumeric() or int(first) < 1 \
+                    or (last and not last.isnumeric()):
+                raise ValueError(
+                    f'sort: invalid field specification: {keys["-k"]}')
+
+            fields = (int(first), int(last or 0))
+
+        sep: Optional[str] = keys.get('-t')
+        if sep is not None and len(sep) != 1:
+            raise ValueError(f'sort: the separator must be one char: {sep}')
+
+        memoryLimit: int = extsort.DEFAULT_MEMORY_LIMIT
+        if '-S' in keys:
+            memoryLimit = extsort.parseSize(keys['-S'])
+
+        return (extsort.SortKey('-n' in keys, fields, sep), memoryLimit,
+                max(int(keys.get('--parallel', 1)), 1))
 
     @classmethod
-    def _readFromFile(cls, filename: str) -> io.StringIO:
-        ostream = super()._readFromFile(filename)
-        ostream.write(f' {filename}')
+    def acceptsInputFile(cls, cmd: CmdIR) -> bool:
+        return not cmd.args
+
+    def _inputLines(self, istream: Optional[IO[str]]) -> Iterator[str]:
+        if not self.args:
+            yield from self._stdin() if istream is None else istream
+            return
+
+        for filename in self.args:
+            yield from self._fileLines(filename)
+
+    def execute(self, istream: Optional[IO[str]]) -> IO[str]:
+        ostream = self._newBuffer()
+
+        ostream.writelines(extsort.sortLines(
+            self._inputLines(istream), self.key,
+            reverse='-r' in self.keys, unique='-u' in self.keys,
+            memoryLimit=self.memoryLimit, parallel=self.parallel))
+
         return ostream
 
+
+class HeadExecutor(CmdExecutor):
+    """
+    `head [-n N | -c N] [FILE]`: print the first N lines
+    (10 by default) or the first N bytes of the FILE
+    or of the input stream. With `-c` the command is binary,
+    so a char may be cut
+
+    Once it's done, the input isn't read anymore:
+    the commands before it are stopped
+
+    Attributes:
+        lines (int): the count of lines to print
+        chars (int): the count of bytes to print, None to count lines
+
+    """
+
+    maxArgs = 1
+
+    def __init__(self, cmd: CmdIR,
+                 session: Optional[Session] = None) -> None:
+        super().__init__(cmd, session)
+
+        self.lines: int
+        self.chars: Optional[int]
+
+        self.lines, self.chars = cmd.compiled
+        self.binary = self.chars is not None
+
     @classmethod
-    def _readFromStream(cls, istream: io.StringIO) -> io.StringIO:
-        text = istream.getvalue()
-        hasEndlInEnd: bool = (text[-1] == '\n')
+    def compile(cls, cmd: CmdIR) -> tuple[int, Optional[int]]:
+        """
+        Returns:
+            int: the count of lines to print
+            int: the count of bytes to print, None to count lines
+
+        Raises:
+            ValueError: if both -n and -c are given
 
-        if not hasEndlInEnd:
-            text = text + '\n'
+        """
 
-        newStream = io.StringIO(text)
-        return WcExecutor._cmdImpl(newStream)
+        if '-n' in cmd.keys and '-c' in cmd.keys:
+            raise ValueError('head: -n and -c can\'t be used together')
 
-    def execute(self, istream: io.StringIO) -> io.StringIO:
-        ostream = io.StringIO()
-        cntArgs: int = len(self.args)
-        filename: str = ''
-
-        if cntArgs == 1:
-            filename = self.args[0]
-            ostream = WcExecutor._readFromFile(filename)
-        elif cntArgs == 0:
-            if istream.getvalue():
-                ostream = WcExecutor._readFromStream(istream)
-            else:
-                ostream = WcExecutor._readFromConsole()
-        else:
+        chars: Optional[str] = cmd.keys.get('-c')
+
+        return (int(cmd.keys.get('-n', 10)),
+                None if chars is None else int(chars))
+
+    @classmethod
+    def acceptsInputFile(cls, cmd: CmdIR) -> bool:
+        return not cmd.args
+
+    def _firstLines(self, lines: Iterator[str]) -> Iterator[str]:
+        if self.lines > 0:
+            yield from itertools.islice(lines, self.lines)
+
+    def _firstBytes(self, chunks: Iterator[bytes]) -> Iterator[bytes]:
+        left: int = self.chars
+
+        for chunk in chunks:
+            if left <= 0:
+                return
+            yield chunk[:left]
+            left -= len(chunk)
+
+    def _checkArgs(self) -> None:
+        if len(self.args) > 1:
             raise ValueError(
-                f'wc: wc supports only one file, but given {cntArgs}')
+                f'head: head supports only one file, but given '
+                f'{len(self.args)}')
 
-        return ostream
+    def stream(self, upstream: Optional[Iterator[str]]) -> Iterator[str]:
+        if self.chars is not None:
+            yield from _splitLines(self.streamBytes(
+                None if upstream is None else _encodeLines(upstream)))
+            return
 
+        self._checkArgs()
 
-class GrepExecutor(CmdExecutor):
+        if self.args:
+            # a file is read only if it isn't cached
+            cached = self._cachedFile(self.args[0], load=False)
+
+            if cached is not None:
+                yield from self._firstLines(iter(cached.lines))
+                return
+
+            try:
+                f = open(self._path(self.args[0]), 'r', encoding='utf-8',
+                         errors=DECODE_ERRORS, newline='\n')
+            except FileNotFoundError:
+                raise FileNotFoundError(f'head: {self.args[0]}: no such file')
+
+            with f:
+                yield from self._firstLines(f)
+            return
+
+        yield from self._firstLines(
+            self._stdin() if upstream is None else upstream)
+
+    def streamBytes(self, upstream: Optional[Iterator[bytes]]
+                    ) -> Iterator[bytes]:
+        if self.chars is None:
+            yield from super().streamBytes(upstream)
+            return
+
+        self._checkArgs()
+
+        if self.args:
+            try:
+                f = open(self._path(self.args[0]), 'rb')
+            except FileNotFoundError:
+                raise FileNotFoundError(f'head: {self.args[0]}: no such file')
+
+            with f:
+                yield from self._firstBytes(
+                    iter(functools.partial(f.read, _BUFFER_SIZE), b''))
+            return
+
+        if upstream is None:
+            upstream = self._stdinChunks()
+
+        if upstream is None:
+            upstream = _encodeLines(self._stdin())
+
+        yield from self._firstBytes(upstream)
+
+
+class TailExecutor(CmdExecutor):
     """
-    `grep pattern FILE`
-    `... | grep pattern`: prints all lines where pattern in
+    `tail [-f] [-n N] [FILE]`: print the last N lines (10 by default)
+    of the FILE or of the input stream
+
+    The FILE is read by blocks backwards from its end, so only
+    the printed lines are read. With `-f` the data appended
+    to the FILE is printed until the next command stops reading
+    or the command is cancelled. The FILE is polled with `os.stat`,
+    the delay grows from `minDelay` to `maxDelay` while the FILE
+    doesn't change
 
     Attributes:
-        iKey (bool): is it need to match with case insensitive
-        wKey (bool): is it need to match a whole word
-        aKey (int): the count of strings need to print after match
+        lines (int): the count of lines to print
+        follow (bool): follow the appended data
 
     """
 
-    def __init__(self, cmd: CmdIR) -> None:
-        super().__init__(cmd)
+    maxArgs = 1
+    minDelay: float = 0.01
+    maxDelay: float = 1.0
+
+    def __init__(self, cmd: CmdIR,
+                 session: Optional[Session] = None) -> None:
+        super().__init__(cmd, session)
+
+        self.lines: int
+        self.follow: bool
+
+        self.lines, self.follow = cmd.compiled
+
+    @classmethod
+    def compile(cls, cmd: CmdIR) -> tuple[int, bool]:
+        """
+        Returns:
+            int: the count of lines to print
+            bool: follow data appended to the file
 
-        # -i: case insensitive
-        self.iKey: bool = '-i' in cmd.keys
+        """
 
-        # -w: match all word
-        self.wKey: bool = '-w' in cmd.keys
+        return int(cmd.keys.get('-n', 10)), '-f' in cmd.keys
 
-        # -A n: print n lines after match
-        self.aKey = int(cmd.keys['-A']) if '-A' in cmd.keys else 0
+    @classmethod
+    def acceptsInputFile(cls, cmd: CmdIR) -> bool:
+        # a followed file never ends, unlike the input stream
+        return not cmd.args and '-f' not in cmd.keys
 
-    def _matchLine(self, line: str, pattern: str) -> bool:
-        modified = line
+    @staticmethod
+    def _lastLinesOffset(f: IO[bytes], count: int) -> int:
+        """
+        Find where the last `count` lines of the file start
 
-        if self.iKey:
-            pattern = pattern.lower()
-            modified = modified.lower()
+        """
 
-        if self.wKey:
-            pattern = rf'\b{pattern}\b'
+        end: int = f.seek(0, os.SEEK_END)
+
+        if count <= 0:
+            return end
+
+        # the newline at the end doesn't start a line
+        f.seek(max(end - 1, 0))
+        pos: int = end - 1 if f.read(1) == b'\n' else end
+
+        while pos > 0:
+            size = min(_BUFFER_SIZE, pos)
+            pos -= size
+            f.seek(pos)
+            block = f.read(size)
+            found = block.count(b'\n')
+
+            if found >= count:
+                idx = len(block)
+                for _ in range(count):
+                    idx = block.rindex(b'\n', 0, idx)
+                return pos + idx + 1
+
+            count -= found
+
+        return 0
+
+    def _follow(self, f: IO[bytes], filename: str) -> Iterator[str]:
+        decoder = codecs.getincrementaldecoder('utf-8')(DECODE_ERRORS)
+        pos: int = f.tell()
+        mtime: int = os.stat(filename).st_mtime_ns
+        delay: float = self.minDelay
+        partial: str = ''
+
+        while not self.cancelled.is_set():
+            st = os.stat(filename)
+
+            if st.st_size < pos:
+                # the file is truncated, like in GNU tail
+                # it's read from the beginning, an incomplete line
+                # of the old content is dropped
+                pos = f.seek(0)
+                partial = ''
+                decoder.reset()
+
+            if st.st_size == pos and st.st_mtime_ns == mtime:
+                self.cancelled.wait(delay)
+                delay = min(delay * 2, self.maxDelay)
+                continue
+
+            mtime = st.st_mtime_ns
+            delay = self.minDelay
+            data = f.read()
+            pos += len(data)
+
+            # only whole lines are passed to the next command
+            lines = (partial + decoder.decode(data)).split('\n')
+            partial = lines.pop()
+
+            for line in lines:
+                yield f'{line}\n'
+
+    def stream(self, upstream: Optional[Iterator[str]]) -> Iterator[str]:
+        if len(self.args) > 1:
+            raise ValueError(
+                f'tail: tail supports only one file, but given '
+                f'{len(self.args)}')
 
-        regex = re.compile(rf'{pattern}')
+        if not self.args:
+            lines = self._stdin() if upstream is None else upstream
+            if self.lines > 0:
+                yield from collections.deque(lines, maxlen=self.lines)
+            return
 
-        return bool(regex.search(modified))
+        filename: str = self.args[0]
+        cached = None if self.follow \
+            else self._cachedFile(filename, load=False)
 
-    def _getFileLines(self, filename: str) -> list[str]:
-        result = []
+        if cached is not None:
+            if self.lines > 0:
+                yield from cached.lines[-self.lines:]
+            return
 
         try:
-            with open(filename, 'r') as f:
-                result = f.readlines()
+            f = open(self._path(filename), 'rb')
         except FileNotFoundError:
-            raise FileNotFoundError(f'grep: {filename}: no such file')
+            raise FileNotFoundError(f'tail: {filename}: no such file')
+
+        with f:
+            f.seek(self._lastLinesOffset(f, self.lines))
+
+            if self.follow:
+                try:
+                    yield from self._follow(f, self._path(filename))
+                except FileNotFoundError:
+                    # the followed file is removed
+                    raise FileNotFoundError(
+                        f'tail: {filename}: no such file')
+            else:
+                text = f.read().decode('utf-8', DECODE_ERRORS)
+                yield from io.StringIO(text, newline='\n')
+
 
-        return result
+class IndexExecutor(CmdExecutor):
+    """
+    `index [DIR...]`: build the trigram index of the DIR (the current
+    directory by default) for `grep -r`. Only files changed
+    since the last build are read
 
-    def _getStreamLines(self, istream: io.StringIO) -> list[str]:
-        splited = istream.getvalue().split('\n')
-        return [f'{s}\n' for s in splited]
+    """
 
-    def execute(self, istream: io.StringIO) -> io.StringIO:
+    def execute(self, istream: Optional[IO[str]]) -> io.StringIO:
         ostream = io.StringIO()
-        splitted: list[str] = self.args
-        pattern: str = splitted[0]
+        reports: list[str] = []
 
-        realInput: list[str] = []
+        for root in self.args or ['.']:
+            if not os.path.isdir(self._path(root)):
+                raise NotADirectoryError(f'index: {root}: not a directory')
 
-        if len(splitted) == 2:
-            filename: str = splitted[1]
-            realInput = self._getFileLines(filename)
-        else:
-            realInput = self._getStreamLines(istream)
+            index, updated = trigram.TrigramIndex.build(self._path(root))
+            reports.append(
+                f'{root}: {len(index.files)} files, {updated} updated')
 
-        result: str = ''
-        fstMatch = False
+        ostream.write('\n'.join(reports))
 
-        for num, line in enumerate(realInput):
-            if self._matchLine(line, pattern):
-                if self.aKey != 0 and fstMatch:
-                    result = f'{result}--\n'
-                fstMatch = True
-                finish = min(len(realInput), num + self.aKey)
-                matched = ''.join(realInput[num: finish + 1])
-                result = f'{result}{matched}'
+        return ostream
 
-        ostream.write(result)
 
-        return ostream
+class FindExecutor(CmdExecutor):
+    """
+    `find [PATH...] [TESTS]`: print the paths in the directory trees
+    of the PATHs (the current directory by default) which pass
+    the tests. Directories are scanned by a thread pool and the paths
+    are printed as soon as they are found
 
+    Attributes:
+        tests (FindTests): the tests of the paths
+        maxDepth (int): the depth to descend to, None if it's unlimited
 
-class ExitExecutor(CmdExecutor):
     """
-    Stops the session
 
+    def __init__(self, cmd: CmdIR,
+                 session: Optional[Session] = None) -> None:
+        super().__init__(cmd, session)
+
+        self.tests: findtree.FindTests
+        self.maxDepth: Optional[int]
+
+        self.tests, self.maxDepth = cmd.compiled
+
+    @classmethod
+    def compile(cls, cmd: CmdIR) -> tuple[findtree.FindTests, Optional[int]]:
+        """
+        Returns:
+            FindTests: the tests of the paths
+            int: the depth to descend to, None if it's unlimited
+
+        Raises:
+            ValueError: if some test is invalid
+
+        """
+
+        tests = findtree.FindTests(cmd.keys.get('-name'),
+                                   cmd.keys.get('-type'),
+                                   cmd.keys.get('-size'),
+                                   cmd.keys.get('-mtime'))
+        maxDepth: Optional[str] = cmd.keys.get('-maxdepth')
+
+        return tests, None if maxDepth is None else int(maxDepth)
+
+    def stream(self, upstream: Optional[Iterator[str]]) -> Iterator[str]:
+        # the ages of files are counted from the start, like in find
+        match = self.tests.matcher(time.time())
+
+        for root in self.args or ['.']:
+            try:
+                paths = findtree.walkTree(root, self._path(root), match,
+                                          self.maxDepth)
+                first = next(paths, None)
+            except FileNotFoundError:
+                raise FileNotFoundError(f'find: {root}: no such file')
+
+            if first is None:
+                continue
+
+            yield f'{first}\n'
+
+            for path in paths:
+                yield f'{path}\n'
+
+
+class TeeExecutor(CmdExecutor):
     """
+    `tee [-a] [FILE...]`: copy the input stream to each FILE
+    and to the output. The input is passed on as it comes, the files
+    get it by large blocks, each one by its own thread
+    if there are several files
 
-    def execute(self, istream: io.StringIO) -> io.StringIO:
-        raise EOFError
+    Attributes:
+        append (bool): append to the files instead of overwriting them
 
+    """
 
-class ExternalExecutor(CmdExecutor):
+    binary = True
+
+    def __init__(self, cmd: CmdIR,
+                 session: Optional[Session] = None) -> None:
+        super().__init__(cmd, session)
+
+        self.append: bool = '-a' in cmd.keys
+
+    def _open(self) -> fanout.FanOut:
+        paths = [self._path(f) for f in self.args]
+
+        try:
+            return fanout.FanOut(paths, self.append)
+        except FileNotFoundError as e:
+            filename = self.args[paths.index(e.filename)]
+            raise FileNotFoundError(f'tee: {filename}: no such file')
+
+    def stream(self, upstream: Optional[Iterator[str]]) -> Iterator[str]:
+        lines = self._stdin() if upstream is None else upstream
+
+        with self._open() as files:
+            for line in lines:
+                files.write(line.encode('utf-8', DECODE_ERRORS))
+                yield line
+
+    def streamBytes(self, upstream: Optional[Iterator[bytes]]
+                    ) -> Iterator[bytes]:
+        if upstream is None:
+            upstream = self._stdinChunks()
+
+        if upstream is None:
+            yield from super().streamBytes(upstream)
+            return
+
+        with self._open() as files:
+            # the chunks are passed on as they are, without a copy
+            for chunk in upstream:
+                files.write(chunk)
+                yield chunk
+
+
+class ChecksumExecutor(CmdExecutor):
     """
-    Run some external process
+    `sha256sum [FILE...]`, `md5sum` and `b2sum`: print the digest
+    of each FILE, or of the input stream if there is no FILE.
+    Files are read by large blocks and hashed in a thread pool,
+    the input stream is hashed as raw bytes. With `SHOWSTATS` set
+    the throughput is printed to the stderr of the session
+
+    Attributes:
+        algorithm (str): the `hashlib` algorithm, set by a subclass
 
     """
 
-    def __init__(self, cmd: CmdIR) -> None:
-        super().__init__(cmd)
+    binary = True
+    algorithm: str = ''
 
-    def execute(self, istream: io.StringIO) -> io.StringIO:
-        ostream = io.StringIO()
+    def _fileDigests(self, stats: checksum.Throughput) -> Iterator[str]:
+        paths = [self._path(f) for f in self.args]
+        results = checksum.hashFiles(paths, self.algorithm)
+
+        try:
+            for i, (digest, size) in enumerate(results):
+                stats.add(size)
+                yield f'\n{digest}  {self.args[i]}' if i \
+                    else f'{digest}  {self.args[i]}'
+        except FileNotFoundError as e:
+            filename = self.args[paths.index(e.filename)]
+            raise FileNotFoundError(f'{self.name}: {filename}: no such file')
+        finally:
+            results.close()
+
+    def _digests(self, chunks: Optional[Iterator[bytes]]) -> Iterator[str]:
+        stats = checksum.Throughput(self.name)
 
-        externalProcess = subprocess.Popen([self.name, *self.args],
-                                           stdin=subprocess.PIPE,
-                                           stdout=subprocess.PIPE,
-                                           stderr=subprocess.PIPE)
+        try:
+            if self.args:
+                yield from self._fileDigests(stats)
+                return
 
-        encodedInput = bytes(istream.getvalue().encode('utf-8'))
+            if chunks is None:
+                chunks = _encodeLines(self._stdin())
 
-        externalProcess.stdin.write(encodedInput)
-        result = externalProcess.communicate()[0].decode('utf-8')
-        externalProcess.stdin.close()
+            digest, size = checksum.hashStream(chunks, self.algorithm)
+            stats.add(size)
 
-        ostream.write(result)
+            yield f'{digest}  -'
+        finally:
+            # the files hashed before an error or a closed output count
+            if self.session is not None and self.session.isSet('SHOWSTATS'):
+                print(stats.report(), file=self.session.stderr)
 
-        return ostream
+    def stream(self, upstream: Optional[Iterator[str]]) -> Iterator[str]:
+        chunks = None if upstream is None else _encodeLines(upstream)
+
+        yield from self._digests(chunks)
+
+    def streamBytes(self, upstream: Optional[Iterator[bytes]]
+                    ) -> Iterator[bytes]:
+        if upstream is None and not self.args:
+            upstream = self._stdinChunks()
+
+        for line in self._digests(upstream):
+            yield line.encode()
+
+
+class Sha256sumExecutor(ChecksumExecutor):
+    algorithm = 'sha256'
+
+
+class Md5sumExecutor(ChecksumExecutor):
+    algorithm = 'md5'
+
+
+class B2sumExecutor(ChecksumExecutor):
+    algorithm = 'blake2b'
 
 
-def processCmd(cmd: CmdIR) -> CmdExecutor:
+def processCmd(cmd: CmdIR, session: Optional[Session] = None) -> CmdExecutor:
     """
     Map the command to its executor
 
     Args:
         cmd (CmdIR): the command
+        session (Session): the session which runs the command
 
     Returns:
         CmdExecutor: the executor for the command
 
     """
 
-    name: str = cmd.name
+    pair = registry.lookup(cmd.name)
 
-    if name == 'echo':
-        return EchoExecutor(cmd)
+    if pair is None:
+        return ExternalExecutor(cmd, session)
 
-    if name == 'pwd':
-        return PwdExecutor(cmd)
+    _, execCls = pair
+    return execCls(cmd, session)
 
-    if name == 'cat':
-        return CatExecutor(cmd)
 
-    if name == 'wc':
-        return WcExecutor(cmd)
+def streamCommand(cmds: list[CmdIR],
+                  session: Optional[Session] = None) -> Iterator[str]:
+    """
+    Connect the commands into a pipeline, which is pulled
+    by its last command. Each command is started at once, so its
+    side effects happen even if the next one doesn't read it, but
+    it goes on only while the next one reads its output.
+    Closing the output stops all commands
+
+    Binary commands, like external ones, pass raw bytes to each other,
+    the data is decoded only for a text builtin and at the end
+
+    Args:
+        cmds (list[CmdIR]): commands
+        session (Session): the session which runs the command
+
+    Returns:
+        Iterator[str]: lines of the pipeline output
+
+    """
+
+    output: Optional[Iterator] = None
+    isBytes: bool = False
+
+    try:
+        for cmd in cmds:
+            executor = processCmd(cmd, session)
+
+            # the data is decoded or encoded only between
+            # a text command and a binary one
+            if output is not None and isBytes != executor.binary:
+                convert = _encodeLines if executor.binary else _splitLines
+                output = _ClosingStream(convert(output), output)
 
-    if name == 'grep':
-        return GrepExecutor(cmd)
+            if executor.binary:
+                output = executor.streamBytesRedirected(output)
+            else:
+                output = executor.streamRedirected(output)
+
+            isBytes = executor.binary
 
-    if name == 'exit':
-        return ExitExecutor(cmd)
+            # the last command is started by the reader of the pipeline
+            if cmd is not cmds[-1]:
+                output = _started(output)
+    except BaseException:
+        closeStream(output)
+        raise
 
-    return ExternalExecutor(cmd)
+    if isBytes:
+        output = _ClosingStream(_splitLines(output), output)
 
+    return output
 
-def runCommand(cmds: list[CmdIR]) -> io.StringIO:
+
+def runCommand(cmds: list[CmdIR],
+               session: Optional[Session] = None) -> IO[str]:
     """
     Execute the command
 
     Args:
         cmds (list[CmdIR]): commands
+        session (Session): the session which runs the command
 
     Returns:
-        io.StringIO: the output stream with the result of the command
+        IO[str]: the output stream with the result of the command,
+            a large result is kept in a temporary file
 
     """
 
-    result = io.StringIO()
-    cmdsExec: list[CmdExecutor] = list(map(processCmd, cmds))
+    result = SpillBuffer(_sessionBudget(session))
+    output = streamCommand(cmds, session)
 
-    for cmd in cmdsExec:
-        try:
-            result = cmd.execute(result)
-        except Exception as e:
-            raise e
+    try:
+        result.writelines(output)
+    finally:
+        closeStream(output)
 
     result.write('\n')
 
@@ -1,11 +1,28 @@
-def expansion(cmd: str, state: dict[str, str]) -> str:
+from typing import Callable, Optional
+import re
+
+from .clparser import escapeArg, findSubstitutionEnd
+from .globbing import escape
+
+
+def expansion(cmd: str, state: dict[str, str],
+              substitute: Optional[Callable[[str], str]] = None,
+              glob: Optional[Callable[[str], list[str]]] = None) -> str:
     """
     Interpolates each variable by its value from state,
-    except variable in single quotes
+    except variable in single quotes.
+    A command substitution `$(CMD)` is replaced with the output
+    of CMD, it's left as it is if there is no `substitute`.
+    A word with unquoted `*`, `?` or `[` is replaced with the paths
+    it matches, it's left as it is if nothing matches
 
     Args:
         cmd (str): user input
         state (dict[str, str]): variable name -> value
+        substitute (Callable[[str], str]): runs CMD of `$(CMD)`
+            and returns its output without trailing newlines
+        glob (Callable[[str], list[str]]): finds the paths matched
+            by a pattern, words are not globbed without it
 
     Returns:
         str: command where each variable replaced with its value
@@ -24,6 +41,13 @@ def expansion(cmd: str, state: dict[str, str]) -> str:
         "$a"
         >>> expansion('echo $a', {})
         empty-string
+        >>> expansion('echo $(pwd)', {}, runCmd)
+        echo /home
+        >>> expansion('cat *.txt "*"', {}, glob=findPaths)
+        cat a.txt b.txt *
+
+    Raises:
+        SyntaxError: if a command substitution isn't closed
 
     """
 
@@ -34,8 +58,27 @@ def expansion(cmd: str, state: dict[str, str]) -> str:
 
     expansed: str = ''
     curVar: str = ''
+    # positions of unquoted glob chars in `expansed`
+    magic: list[int] = []
+
+    pos: int = 0
+
+    while pos < len(cmd):
+        sym = cmd[pos]
+        pos += 1
+
+        if sym == '$' and not inSingleQuote and cmd.startswith('(', pos):
+            if startVar:
+                expansed += state.setdefault(curVar, '')
+                curVar = ''
+                startVar = False
+
+            end: int = findSubstitutionEnd(cmd, pos - 1)
+            expansed += cmd[pos - 1:end] if substitute is None \
+                else substitute(cmd[pos + 1:end - 1])
+            pos = end
+            continue
 
-    for sym in cmd:
         if sym == "'" and not inDoubleQuote:
             inSingleQuote ^= True
             continue
@@ -73,6 +116,9 @@ def expansion(cmd: str, state: dict[str, str]) -> str:
 
             continue
 
+        if sym in '*?[' and not (inSingleQuote or inDoubleQuote):
+            magic.append(len(expansed))
+
         expansed += sym
 
     if startVar:
@@ -80,4 +126,37 @@ def expansion(cmd: str, state: dict[str, str]) -> str:
         curVar = ''
         startVar = False
 
+    if magic and glob is not None:
+        return _expandGlobs(expansed, set(magic), glob)
+
     return expansed
+
+
+def _expandGlobs(line: str, magic: set[int],
+                 glob: Callable[[str], list[str]]) -> str:
+    """
+    Replace the words with unquoted glob chars by their matches,
+    the quoted chars and the values of variables match only themselves.
+    The whitespace of a match is escaped, so it stays one arg
+
+    """
+
+    result: str = ''
+    end: int = 0
+
+    for word in re.finditer(r'\S+', line):
+        start: int = word.start()
+
+        if not any(start <= pos < word.end() for pos in magic):
+            continue
+
+        pattern: str = ''.join(
+            c if start + i in magic else escape(c)
+            for i, c in enumerate(word.group()))
+        matches: list[str] = glob(pattern)
+
+        if matches:
+            result += line[end:start] + ' '.join(map(escapeArg, matches))
+            end = word.end()
+
+    return result + line[end:]
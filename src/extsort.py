@@ -0,0 +1,218 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from typing import Iterable, Iterator, Optional
+import heapq
+import os
+import re
+import sys
+import tempfile
+
+# the default memory budget for `sort` in bytes
+DEFAULT_MEMORY_LIMIT: int = 64 * 1024 * 1024
+
+# runs keep undecodable bytes of the input as they are
+_ERRORS: str = 'surrogateescape'
+# and carriage returns, a line ends only with a newline
+_NEWLINE: str = '\n'
+
+# the most runs which are merged at once, each one is an open file
+_MERGE_FAN_IN: int = 16
+
+_NUMBER_RE = re.compile(r'\s*(-?(\d+(\.\d*)?|\.\d+))')
+_SIZE_SUFFIXES: dict[str, int] = {'b': 1, 'k': 1 << 10, 'm': 1 << 20,
+                                  'g': 1 << 30, 't': 1 << 40}
+
+
+def parseSize(size: str) -> int:
+    """
+    Parse a size like `sort -S`: a number of bytes,
+    a suffix K, M, G or T multiplies it by 1024 in a power
+
+    Raises:
+        ValueError: if the size is invalid
+
+    """
+
+    suffix: str = size[-1:].lower()
+    multiplier: int = _SIZE_SUFFIXES.get(suffix, 1)
+    number: str = size[:-1] if suffix in _SIZE_SUFFIXES else size
+
+    if not number.isnumeric():
+        raise ValueError(f'sort: invalid buffer size: {size}')
+
+    return int(number) * multiplier
+
+
+class SortKey:
+    """
+    Makes the sort key of a line, it's picklable
+    to be sent to worker processes
+
+    Args:
+        numeric (bool): compare by a leading number
+        fields (tuple[int, int]): the first and the last field
+            of the key counting from 1, the last may be 0 (up to the end)
+        sep (str): the field separator, blanks by default
+
+    """
+
+    def __init__(self, numeric: bool = False,
+                 fields: Optional[tuple[int, int]] = None,
+                 sep: Optional[str] = None) -> None:
+        self.numeric = numeric
+        self.fields = fields
+        self.sep = sep
+
+    def __call__(self, line: str) -> tuple:
+        text: str = line.rstrip('\n')
+
+        if self.fields is not None:
+            first, last = self.fields
+            splitted = text.split(self.sep)
+            text = (self.sep or ' ').join(
+                splitted[first - 1:last or len(splitted)])
+
+        if self.numeric:
+            match = _NUMBER_RE.match(text)
+            # like in GNU sort, a line without a number is zero
+            return (float(match.group(1)) if match else 0.0, line)
+
+        # the whole line breaks the ties
+        return (text, line)
+
+
+def _sortRun(path: str, key: SortKey, reverse: bool) -> None:
+    with open(path, 'r', encoding='utf-8', errors=_ERRORS,
+              newline=_NEWLINE) as f:
+        lines = f.readlines()
+
+    lines.sort(key=key, reverse=reverse)
+
+    with open(path, 'w', encoding='utf-8', errors=_ERRORS,
+              newline=_NEWLINE) as f:
+        f.writelines(lines)
+
+
+def _readRun(path: str) -> Iterator[str]:
+    with open(path, 'r', encoding='utf-8', errors=_ERRORS,
+              newline=_NEWLINE) as f:
+        yield from f
+
+
+def _mergeRuns(runs: list[str], tmpDir: str, key: SortKey,
+               reverse: bool) -> list[str]:
+    """
+    Merge the runs by groups of `_MERGE_FAN_IN` into new runs in `tmpDir`
+    until at most `_MERGE_FAN_IN` runs remain, merged runs are removed
+
+    Returns:
+        list[str]: paths of the remaining runs in the order of the input
+
+    """
+
+    mergePass: int = 0
+
+    while len(runs) > _MERGE_FAN_IN:
+        merged: list[str] = []
+
+        for i in range(0, len(runs), _MERGE_FAN_IN):
+            group = runs[i:i + _MERGE_FAN_IN]
+            if len(group) == 1:
+                merged.extend(group)
+                continue
+
+            path = os.path.join(tmpDir, f'merge{mergePass}-{len(merged)}')
+            with open(path, 'w', encoding='utf-8', errors=_ERRORS,
+                      newline=_NEWLINE) as f:
+                f.writelines(heapq.merge(*map(_readRun, group),
+                                         key=key, reverse=reverse))
+
+            for run in group:
+                os.remove(run)
+            merged.append(path)
+
+        runs = merged
+        mergePass += 1
+
+    return runs
+
+
+def sortLines(lines: Iterable[str], key: SortKey = SortKey(),
+              reverse: bool = False, unique: bool = False,
+              memoryLimit: int = DEFAULT_MEMORY_LIMIT,
+              parallel: int = 1) -> Iterator[str]:
+    """
+    Sort the lines. Up to `memoryLimit` bytes are sorted in memory,
+    after that sorted runs are spilled to temporary files
+    and merged with `heapq.merge`, at most `_MERGE_FAN_IN` runs at once,
+    so many runs are merged in several passes
+
+    Args:
+        lines (Iterable[str]): lines to sort
+        key (SortKey): makes the sort key of a line
+        reverse (bool): sort in descending order
+        unique (bool): output only the first of lines with equal keys
+        memoryLimit (int): the memory budget in bytes
+        parallel (int): the count of processes which sort
+            spilled runs, 1 means the runs are sorted in this process
+
+    Returns:
+        Iterator[str]: sorted lines, each ends with a newline
+
+    """
+
+    with tempfile.TemporaryDirectory(prefix='sort-') as tmpDir, \
+            ProcessPoolExecutor(parallel) if parallel > 1 else \
+            nullcontext() as pool:
+        runs: list[str] = []
+        futures = []
+        chunk: list[str] = []
+        chunkSize: int = 0
+
+        def spill() -> None:
+            path = os.path.join(tmpDir, f'run{len(runs)}')
+            runs.append(path)
+
+            if pool is None:
+                chunk.sort(key=key, reverse=reverse)
+
+            with open(path, 'w', encoding='utf-8', errors=_ERRORS,
+                      newline=_NEWLINE) as f:
+                f.writelines(chunk)
+
+            if pool is not None:
+                futures.append(pool.submit(_sortRun, path, key, reverse))
+
+        for line in lines:
+            if not line.endswith('\n'):
+                line += '\n'
+
+            chunk.append(line)
+            chunkSize += sys.getsizeof(line) + 8
+
+            if chunkSize > memoryLimit:
+                spill()
+                chunk, chunkSize = [], 0
+
+        chunk.sort(key=key, reverse=reverse)
+
+        for future in futures:
+            future.result()
+
+        merged: Iterator[str] = iter(chunk)
+        if runs:
+            runs = _mergeRuns(runs, tmpDir, key, reverse)
+            merged = heapq.merge(*map(_readRun, runs), chunk,
+                                 key=key, reverse=reverse)
+
+        if not unique:
+            yield from merged
+            return
+
+        prevKey = None
+        for line in merged:
+            lineKey = key(line)[:-1]
+            if lineKey != prevKey:
+                yield line
+            prevKey = lineKey
@@ -0,0 +1,223 @@
+"""
+Copying a stream to several files at once, for the `tee` builtin
+
+"""
+
+from __future__ import annotations
+from typing import IO, Optional
+import queue
+import threading
+import time
+
+# the size of a block handed to the files, small chunks
+# of the stream are joined up to it
+BLOCK_SIZE: int = 1 << 20
+
+# the blocks queued for one writer thread, so a slow file
+# holds the stream back instead of keeping all of it in memory
+_QUEUE_BLOCKS: int = 4
+
+# the seconds a partial block waits for the rest of it, so a stream
+# which stalls, like `tail -f`, still reaches the files
+FLUSH_DELAY: float = 0.1
+
+
+class _Writer(threading.Thread):
+    """
+    A thread writing the blocks of its queue to one file.
+    A write releases the GIL, so the files are written at once.
+    After an error the blocks are taken and dropped, so the stream
+    isn't stopped by one file. The file is flushed each time
+    the queue runs empty
+
+    """
+
+    def __init__(self, f: IO[bytes]) -> None:
+        super().__init__(name=f'tee-{f.name}', daemon=True)
+
+        self.file = f
+        self.blocks: queue.Queue[Optional[bytes]] = \
+            queue.Queue(_QUEUE_BLOCKS)
+        self.error: Optional[OSError] = None
+
+    def run(self) -> None:
+        while True:
+            block = self.blocks.get()
+
+            if block is None:
+                return
+
+            if self.error is None:
+                try:
+                    self.file.write(block)
+                    if self.blocks.empty():
+                        self.file.flush()
+                except OSError as e:
+                    self.error = e
+
+
+class FanOut:
+    """
+    Writes a stream to several files. The chunks of the stream are
+    joined into blocks of `BLOCK_SIZE`, one block object is shared
+    by all the files. With several files each one is written by its
+    own thread. A partial block is written after `FLUSH_DELAY`
+    seconds, by a thread waiting for it
+
+    Args:
+        paths (list[str]): the file paths
+        append (bool): append to the files instead of truncating them
+        parallel (bool): write the files in threads, by default
+            if there are several files
+
+    Raises:
+        OSError: if some file can't be opened, none of them is kept open
+
+    """
+
+    def __init__(self, paths: list[str], append: bool = False,
+                 parallel: Optional[bool] = None) -> None:
+        self.__files: list[IO[bytes]] = []
+        self.__pending: list[bytes] = []
+        self.__pendingSize: int = 0
+        self.__pendingSince: float = 0.0
+        self.__closed: bool = False
+        self.__error: Optional[OSError] = None
+        self.__lock = threading.Condition()
+
+        try:
+            for path in paths:
+                self.__files.append(
+                    open(path, 'ab' if append else 'wb',
+                         buffering=BLOCK_SIZE))
+        except OSError:
+            for f in self.__files:
+                f.close()
+            raise
+
+        if parallel is None:
+            parallel = len(self.__files) > 1
+
+        self.__writers: list[_Writer] = \
+            [_Writer(f) for f in self.__files] if parallel else []
+
+        for writer in self.__writers:
+            writer.start()
+
+        self.__flusher = threading.Thread(
+            target=self.__flushStalled, name='tee-flush', daemon=True)
+        self.__flusher.start()
+
+    def write(self, chunk: bytes) -> None:
+        """
+        Write a chunk of the stream
+
+        Args:
+            chunk (bytes): the chunk
+
+        Raises:
+            OSError: an error of writing some file without threads
+
+        """
+
+        with self.__lock:
+            if self.__error is not None:
+                raise self.__error
+
+            if not self.__pending:
+                self.__pendingSince = time.monotonic()
+                self.__lock.notify()
+
+            self.__pending.append(chunk)
+            self.__pendingSize += len(chunk)
+
+            if self.__pendingSize >= BLOCK_SIZE:
+                self.__flush()
+
+    def close(self) -> None:
+        """
+        Write the rest of the stream and close the files
+
+        Raises:
+            OSError: the first error of writing some file
+
+        """
+
+        errors: list[OSError] = []
+
+        with self.__lock:
+            self.__closed = True
+            self.__lock.notify()
+
+        self.__flusher.join()
+
+        if self.__error is not None:
+            errors.append(self.__error)
+        else:
+            try:
+                self.__flush()
+            except OSError as e:
+                errors.append(e)
+
+        for writer in self.__writers:
+            writer.blocks.put(None)
+
+        for writer in self.__writers:
+            writer.join()
+            if writer.error is not None:
+                errors.append(writer.error)
+
+        for f in self.__files:
+            try:
+                f.close()
+            except OSError as e:
+                errors.append(e)
+
+        self.__files = []
+        self.__writers = []
+
+        if errors:
+            raise errors[0]
+
+    def __flush(self) -> None:
+        if not self.__pending:
+            return
+
+        # a large chunk, e.g. a block of the console, isn't copied
+        block = self.__pending[0] if len(self.__pending) == 1 \
+            else b''.join(self.__pending)
+
+        self.__pending = []
+        self.__pendingSize = 0
+
+        if self.__writers:
+            for writer in self.__writers:
+                writer.blocks.put(block)
+        else:
+            for f in self.__files:
+                f.write(block)
+                f.flush()
+
+    def __flushStalled(self) -> None:
+        with self.__lock:
+            while not self.__closed and self.__error is None:
+                if not self.__pending:
+                    self.__lock.wait()
+                    continue
+
+                delay = self.__pendingSince + FLUSH_DELAY - time.monotonic()
+
+                if delay > 0:
+                    self.__lock.wait(delay)
+                    continue
+
+                try:
+                    self.__flush()
+                except OSError as e:
+                    self.__error = e
+
+    def __enter__(self) -> FanOut:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,230 @@
+from __future__ import annotations
+from collections import OrderedDict
+from functools import cached_property
+from typing import IO, Optional
+import os
+import sys
+import threading
+
+# the memory which cached files may take in bytes
+DEFAULT_CACHE_SIZE: int = 64 * 1024 * 1024
+
+# the memory a line takes besides its chars: an empty `str`
+# and the pointer to it in the list of lines
+_LINE_OVERHEAD: int = sys.getsizeof('') + 8
+
+# the files found too large are remembered, so they are streamed
+# without counting their lines again, up to this count
+_MAX_REJECTED: int = 1024
+
+_BLOCK_SIZE: int = 1 << 20
+
+
+class CachedFile:
+    """
+    The decoded content of a file
+
+    Args:
+        lines (list[str]): lines of the file
+        stat (os.stat_result): the file status when it was read
+
+    Attributes:
+        lines (list[str]): lines of the file
+        version (tuple[int, int, int, int]): device, inode, size and
+            modification time, the entry is valid while they are the same
+        cost (int): the memory taken by the lines in bytes
+
+    """
+
+    def __init__(self, lines: list[str], stat: os.stat_result) -> None:
+        self.lines = lines
+        self.version = _version(stat)
+        self.cost: int = sys.getsizeof(lines) + sum(map(sys.getsizeof, lines))
+
+    @cached_property
+    def counts(self) -> tuple[int, int, int]:
+        """
+        The count of lines, words and chars, like `wc` prints them
+
+        """
+
+        wordCnt = sum(len(line.split()) for line in self.lines)
+        charCnt = sum(map(len, self.lines))
+
+        return len(self.lines), wordCnt, charCnt
+
+
+def _version(stat: os.stat_result) -> tuple[int, int, int, int]:
+    return stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def _estimateCost(f: IO[bytes], size: int) -> int:
+    """
+    The memory the lines of an ASCII file would take, a file which
+    isn't ASCII takes more. Only newlines are counted, nothing
+    is decoded
+
+    """
+
+    lineCnt: int = 1
+
+    for block in iter(lambda: f.read(_BLOCK_SIZE), b''):
+        lineCnt += block.count(b'\n')
+
+    return sys.getsizeof([]) + lineCnt * _LINE_OVERHEAD + size
+
+
+class FileCache:
+    """
+    Keeps the content of files read by builtins, so the same file isn't
+    read and decoded again while it's not changed. An entry is checked
+    with `os.stat` on each use. The least recently used files are
+    evicted when the cache takes more than its budget. A file whose
+    lines would take more than a quarter of the budget is not cached,
+    it's streamed by the caller: many short lines take much more
+    memory than the file size. It's shared by the threads
+    of background jobs
+
+    Args:
+        maxSize (int): the budget in bytes
+
+    """
+
+    def __init__(self, maxSize: int = DEFAULT_CACHE_SIZE) -> None:
+        self.maxSize = maxSize
+        self.__entries: OrderedDict[str, CachedFile] = OrderedDict()
+        self.__size: int = 0
+        self.__lock = threading.Lock()
+        # path -> the version of a file which is too large
+        self.__rejected: dict[str, tuple[int, int, int, int]] = {}
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    @property
+    def maxEntry(self) -> int:
+        """
+        The memory one cached file may take
+
+        """
+
+        return self.maxSize // 4
+
+    def get(self, filename: str) -> Optional[CachedFile]:
+        """
+        Get the file content, the file is read if it isn't cached
+        or it's changed since it was read
+
+        Args:
+            filename (str): the file path
+
+        Returns:
+            CachedFile: the file content, None if the file is too large
+                to be cached, it must be read by the caller
+
+        Raises:
+            OSError: if the file can't be read
+
+        """
+
+        path: str = os.path.abspath(filename)
+        entry = self.lookup(path)
+
+        if entry is not None:
+            return entry
+
+        stat = os.stat(path)
+
+        with self.__lock:
+            if self.__rejected.get(path) == _version(stat):
+                return None
+
+        if stat.st_size > self.maxEntry:
+            self.__reject(path, stat)
+            return None
+
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            cost = _estimateCost(f, stat.st_size)
+
+        if cost > self.maxEntry:
+            self.__reject(path, stat)
+            return None
+
+        # undecodable bytes and carriage returns are kept like
+        # in the data passed between commands, see `executor.DECODE_ERRORS`
+        with open(path, 'r', encoding='utf-8', errors='surrogateescape',
+                  newline='\n') as f:
+            entry = CachedFile(f.readlines(), os.fstat(f.fileno()))
+
+        # e.g. a file which isn't ASCII
+        if entry.cost > self.maxEntry:
+            self.__reject(path, stat)
+            return entry
+
+        self.__put(path, entry)
+
+        return entry
+
+    def lookup(self, filename: str) -> Optional[CachedFile]:
+        """
+        Same as `get`, but the file is never read,
+        it's for commands which read only a part of a file
+
+        Returns:
+            CachedFile: the file content, None if it isn't cached
+
+        """
+
+        path: str = os.path.abspath(filename)
+
+        try:
+            version = _version(os.stat(path))
+        except OSError:
+            version = None
+
+        with self.__lock:
+            entry = self.__entries.get(path)
+
+            if entry is None:
+                return None
+
+            if entry.version != version:
+                self.__remove(path)
+                return None
+
+            self.__entries.move_to_end(path)
+
+            return entry
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__entries.clear()
+            self.__rejected.clear()
+            self.__size = 0
+
+    def __reject(self, path: str, stat: os.stat_result) -> None:
+        with self.__lock:
+            if len(self.__rejected) >= _MAX_REJECTED:
+                self.__rejected.clear()
+
+            self.__rejected[path] = _version(stat)
+
+    def __put(self, path: str, entry: CachedFile) -> None:
+        # other entries are never evicted for a too large one
+        if entry.cost > self.maxEntry:
+            return
+
+        with self.__lock:
+            if path in self.__entries:
+                self.__remove(path)
+
+            self.__entries[path] = entry
+            self.__size += entry.cost
+
+            while self.__size > self.maxSize:
+                self.__remove(next(iter(self.__entries)))
+
+    def __remove(self, path: str) -> None:
+        self.__size -= self.__entries.pop(path).cost
@@ -0,0 +1,260 @@
+"""
+The directory walk and the tests of the `find` builtin
+
+"""
+
+from __future__ import annotations
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterator, Optional, Union
+import fnmatch
+import os
+import queue
+import re
+import stat
+
+# the count of threads scanning directories at the same time,
+# `os.scandir` and `stat` release the GIL while they wait for the disk
+DEFAULT_WORKERS: int = min(32, (os.cpu_count() or 1) + 4)
+
+# -size N counts in units of the suffix, 512-byte blocks by default
+_SIZE_UNITS: dict[str, int] = {'b': 512, 'c': 1, 'w': 2, 'k': 1 << 10,
+                               'M': 1 << 20, 'G': 1 << 30}
+_TYPES: str = 'fdl'
+_DAY: int = 24 * 60 * 60
+
+# a numeric test: the sign of `+N` or `-N` (0 for exactly N) and N
+NumericTest = tuple[int, int]
+
+
+def _parseNumeric(spec: str, key: str) -> NumericTest:
+    """
+    Raises:
+        ValueError: if it's not `[+-]N`
+
+    """
+
+    sign: int = {'+': 1, '-': -1}.get(spec[:1], 0)
+    number: str = spec[1:] if sign else spec
+
+    if not number.isdigit():
+        raise ValueError(f'find: invalid argument `{spec}` to `{key}`')
+
+    return sign, int(number)
+
+
+def _compare(value: int, test: NumericTest) -> bool:
+    sign, number = test
+
+    if sign > 0:
+        return value > number
+
+    if sign < 0:
+        return value < number
+
+    return value == number
+
+
+class _RootEntry:
+    """
+    A start path of the walk with the interface of `os.DirEntry`
+
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.name = os.path.basename(path.rstrip('/')) or path
+        self.__stat = os.lstat(path)
+
+    def stat(self, follow_symlinks: bool = True) -> os.stat_result:
+        return self.__stat
+
+    def is_dir(self, follow_symlinks: bool = True) -> bool:
+        return stat.S_ISDIR(self.__stat.st_mode)
+
+    def is_file(self, follow_symlinks: bool = True) -> bool:
+        return stat.S_ISREG(self.__stat.st_mode)
+
+    def is_symlink(self) -> bool:
+        return stat.S_ISLNK(self.__stat.st_mode)
+
+
+Entry = Union[os.DirEntry, _RootEntry]
+
+
+class FindTests:
+    """
+    The tests of `find`, a path is printed if it passes all of them.
+    Symlinks are not followed, like in `find -P`
+
+    Args:
+        name (str): a pattern of the base name, `-name`
+        kind (str): `f`, `d` or `l` for files, directories or symlinks,
+            `-type`
+        size (str): `[+-]N[bcwkMG]`, the size rounded up to the units
+            is more than, less than or exactly N, `-size`
+        mtime (str): `[+-]N`, the days since the last modification
+            are more than, less than or exactly N, `-mtime`
+
+    Raises:
+        ValueError: if some test is invalid
+
+    """
+
+    def __init__(self, name: Optional[str] = None,
+                 kind: Optional[str] = None, size: Optional[str] = None,
+                 mtime: Optional[str] = None) -> None:
+        if kind is not None and (len(kind) != 1 or kind not in _TYPES):
+            raise ValueError(f'find: unknown argument to -type: {kind}')
+
+        self.name = name
+        self.kind = kind
+        self.unit: int = _SIZE_UNITS['b']
+        self.size: Optional[NumericTest] = None
+        self.mtime: Optional[NumericTest] = None
+
+        if size is not None:
+            if size[-1:] in _SIZE_UNITS:
+                self.unit, size = _SIZE_UNITS[size[-1]], size[:-1]
+            self.size = _parseNumeric(size, '-size')
+
+        if mtime is not None:
+            self.mtime = _parseNumeric(mtime, '-mtime')
+
+    def matcher(self, now: float) -> Callable[[Entry], bool]:
+        """
+        Args:
+            now (float): the time the ages of files are counted from,
+                the start of the command
+
+        Returns:
+            Callable[[Entry], bool]: is the entry printed
+
+        """
+
+        kind, unit = self.kind, self.unit
+        size, mtime = self.size, self.mtime
+        nameMatch = None if self.name is None \
+            else re.compile(fnmatch.translate(self.name)).match
+
+        def match(entry: Entry) -> bool:
+            if nameMatch is not None and not nameMatch(entry.name):
+                return False
+
+            if kind == 'f' and not entry.is_file(follow_symlinks=False) \
+                    or kind == 'd' \
+                    and not entry.is_dir(follow_symlinks=False) \
+                    or kind == 'l' and not entry.is_symlink():
+                return False
+
+            if size is None and mtime is None:
+                return True
+
+            try:
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                # the entry is removed during the walk
+                return False
+
+            if size is not None and \
+                    not _compare(-(-st.st_size // unit), size):
+                return False
+
+            return mtime is None or \
+                _compare(int(now - st.st_mtime) // _DAY, mtime)
+
+        return match
+
+
+def _scanDir(shown: str, path: str, depth: int,
+             match: Callable[[Entry], bool], maxDepth: Optional[int]
+             ) -> tuple[list[str], list[tuple[str, str, int]]]:
+    """
+    Returns:
+        list[str]: the matched entries as they are printed
+        list[tuple[str, str, int]]: the subdirectories to scan,
+            as they are printed, their paths and depths
+
+    """
+
+    with os.scandir(path) as it:
+        entries = sorted(it, key=lambda e: e.name)
+
+    found: list[str] = []
+    subdirs: list[tuple[str, str, int]] = []
+    descend: bool = maxDepth is None or depth < maxDepth
+    prefix: str = shown if shown.endswith('/') else f'{shown}/'
+
+    for entry in entries:
+        if match(entry):
+            found.append(prefix + entry.name)
+
+        if descend and entry.is_dir(follow_symlinks=False):
+            subdirs.append((prefix + entry.name, entry.path, depth + 1))
+
+    return found, subdirs
+
+
+def walkTree(root: str, path: str, match: Callable[[Entry], bool],
+             maxDepth: Optional[int] = None,
+             workers: int = DEFAULT_WORKERS) -> Iterator[str]:
+    """
+    Walk the directory tree and yield the entries which match.
+    Directories are scanned by a thread pool and the matches of each
+    one are yielded as soon as it's scanned, so the order is the one
+    of a directory within it, but not across directories.
+    Directories which can't be read are skipped
+
+    Args:
+        root (str): the start path as it's printed
+        path (str): the start path in the file system
+        match (Callable[[Entry], bool]): is the entry printed
+        maxDepth (int): the entries deeper than it are not walked,
+            the start path has the depth 0
+        workers (int): the count of threads
+
+    Yields:
+        str: the matched paths starting with `root`
+
+    Raises:
+        FileNotFoundError: if there is no start path
+
+    """
+
+    rootEntry = _RootEntry(path)
+
+    if match(rootEntry):
+        yield root
+
+    if not rootEntry.is_dir() or maxDepth == 0:
+        return
+
+    pool = ThreadPoolExecutor(workers, thread_name_prefix='find')
+    done: queue.SimpleQueue[Future] = queue.SimpleQueue()
+    pending: int = 0
+
+    def scan(shown: str, dirPath: str, depth: int) -> None:
+        nonlocal pending
+        future = pool.submit(_scanDir, shown, dirPath, depth, match, maxDepth)
+        future.add_done_callback(done.put)
+        pending += 1
+
+    try:
+        scan(root, path, 1)
+
+        while pending:
+            future = done.get()
+            pending -= 1
+
+            try:
+                found, subdirs = future.result()
+            except OSError:
+                continue
+
+            # the pool is kept busy while the matches are consumed
+            for subdir in subdirs:
+                scan(*subdir)
+
+            yield from found
+    finally:
+        # a closed stream, e.g. by `head`, stops the walk
+        pool.shutdown(wait=False, cancel_futures=True)
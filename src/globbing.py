@@ -0,0 +1,213 @@
+"""
+Pathname expansion of `*`, `?` and `[...]` in command words
+
+"""
+
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Optional
+import fnmatch
+import os
+import threading
+import time
+
+# a listing of a directory changed less than this ago isn't cached:
+# an entry added in the same tick of the clock keeps the mtime
+_RACY_NS: int = 2 * 10 ** 9
+
+
+def hasMagic(word: str) -> bool:
+    return '*' in word or '?' in word or '[' in word
+
+
+def escape(text: str) -> str:
+    """
+    The text as a pattern which matches only itself
+
+    """
+
+    return ''.join(f'[{c}]' if c in '*?[' else c for c in text)
+
+
+class DirListing:
+    """
+    Entries of a directory. The names matched by a pattern are kept,
+    so a repeated glob doesn't match all the entries again
+
+    Args:
+        names (list[str]): sorted names of the entries
+        dirs (frozenset[str]): the names of subdirectories
+        mtime (int): the directory modification time in ns,
+            the listing is valid while it's the same
+
+    """
+
+    # the count of patterns whose matches are kept
+    maxPatterns: int = 64
+
+    def __init__(self, names: list[str], dirs: frozenset[str],
+                 mtime: int) -> None:
+        self.names = names
+        self.dirs = dirs
+        self.mtime = mtime
+        self.__matches: dict[tuple[str, bool], list[str]] = {}
+
+    def match(self, pattern: str, dirsOnly: bool = False) -> list[str]:
+        """
+        Args:
+            pattern (str): a pattern of one path component
+            dirsOnly (bool): match only subdirectories
+
+        Returns:
+            list[str]: sorted names, hidden ones only if the pattern
+                starts with `.`
+
+        """
+
+        key = (pattern, dirsOnly)
+        names = self.__matches.get(key)
+
+        if names is not None:
+            return names
+
+        names = [n for n in self.names if n in self.dirs] \
+            if dirsOnly else self.names
+        names = fnmatch.filter(names, pattern)
+
+        if not pattern.startswith('.'):
+            names = [n for n in names if not n.startswith('.')]
+
+        if len(self.__matches) >= self.maxPatterns:
+            self.__matches.clear()
+
+        self.__matches[key] = names
+
+        return names
+
+
+class DirCache:
+    """
+    Keeps listings of directories read by globs, so a glob over
+    a large directory doesn't list it again while it's not changed.
+    A listing is checked with `os.stat` of the directory on each use,
+    the least recently used ones are evicted past `maxSize` listings.
+    It's shared by the threads of background jobs
+
+    Args:
+        maxSize (int): the maximal count of listings
+
+    """
+
+    def __init__(self, maxSize: int = 256) -> None:
+        self.maxSize = maxSize
+        self.__entries: OrderedDict[str, DirListing] = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def listdir(self, path: str) -> DirListing:
+        """
+        Args:
+            path (str): the absolute directory path
+
+        Raises:
+            OSError: if the directory can't be listed
+
+        """
+
+        mtime: int = os.stat(path).st_mtime_ns
+
+        with self.__lock:
+            listing = self.__entries.get(path)
+
+            if listing is not None and listing.mtime == mtime:
+                self.__entries.move_to_end(path)
+                return listing
+
+        names: list[str] = []
+        dirs: list[str] = []
+
+        with os.scandir(path) as it:
+            for entry in it:
+                names.append(entry.name)
+                if entry.is_dir():
+                    dirs.append(entry.name)
+
+        names.sort()
+        listing = DirListing(names, frozenset(dirs), mtime)
+
+        if time.time_ns() - mtime > _RACY_NS:
+            with self.__lock:
+                self.__entries[path] = listing
+                self.__entries.move_to_end(path)
+
+                while len(self.__entries) > self.maxSize:
+                    self.__entries.popitem(last=False)
+
+        return listing
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__entries.clear()
+
+
+def expandGlob(pattern: str, cwd: str,
+               cache: Optional[DirCache] = None) -> list[str]:
+    """
+    Find the paths matched by the pattern, like Bash does:
+    a component is matched against the entries of the directory,
+    names starting with `.` are matched only by a leading `.`
+
+    Args:
+        pattern (str): the pattern, relative to `cwd` or absolute
+        cwd (str): the directory of relative patterns
+        cache (DirCache): the listings cache, no cache by default
+
+    Returns:
+        list[str]: sorted paths as they are written in the pattern,
+            empty if nothing matches
+
+    """
+
+    if cache is None:
+        cache = DirCache(0)
+
+    parts: list[str] = pattern.split('/')
+
+    # (the path as it's written, the path in the file system)
+    found: list[tuple[str, str]] = \
+        [('/', '/')] if pattern.startswith('/') else [('', cwd)]
+
+    if not parts[0]:
+        parts = parts[1:]
+
+    for i, part in enumerate(parts):
+        isLast: bool = i == len(parts) - 1
+
+        if not hasMagic(part):
+            # `a//b` and a trailing `/` are kept as they are written
+            found = [(f'{shown}{part}' if isLast else f'{shown}{part}/',
+                      os.path.join(path, part)) for shown, path in found]
+            if isLast or not part:
+                found = [(s, p) for s, p in found if os.path.lexists(p)]
+            continue
+
+        matched: list[tuple[str, str]] = []
+
+        for shown, path in found:
+            try:
+                listing = cache.listdir(path)
+            except OSError:
+                continue
+
+            matched += [(f'{shown}{n}' if isLast else f'{shown}{n}/',
+                         os.path.join(path, n))
+                        for n in listing.match(part, not isLast)]
+
+        found = matched
+
+        if not found:
+            return []
+
+    return [shown for shown, _ in found]
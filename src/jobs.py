@@ -0,0 +1,112 @@
+from __future__ import annotations
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import IO, Callable, Optional
+
+
+class Job:
+    """
+    A pipeline running in background
+
+    Attributes:
+        num (int): the job number
+        line (str): the command line without `&`
+        future (Future): the result of the pipeline
+
+    """
+
+    def __init__(self, num: int, line: str, future: Future) -> None:
+        self.num = num
+        self.line = line
+        self.future = future
+
+    def status(self) -> str:
+        if not self.future.done():
+            return 'Running'
+
+        return 'Failed' if self.future.exception() else 'Done'
+
+    def output(self) -> str:
+        """
+        Wait for the job
+
+        Returns:
+            str: the job output, or an error message if it's failed
+
+        """
+
+        err = self.future.exception()
+
+        if err is not None:
+            return f'[{self.num}] {str(err) or type(err).__name__}\n'
+
+        return self.future.result().getvalue()
+
+    def __str__(self) -> str:
+        return f'[{self.num}]  {self.status():<10}{self.line} &'
+
+
+class JobTable:
+    """
+    Runs pipelines in background threads and
+    keeps them until they are collected by `wait`
+
+    """
+
+    def __init__(self) -> None:
+        self.__pool = ThreadPoolExecutor(thread_name_prefix='job')
+        self.__jobs: dict[int, Job] = {}
+
+    def start(self, line: str, run: Callable[[], IO[str]]) -> Job:
+        """
+        Start the pipeline in background
+
+        Args:
+            line (str): the command line, for `jobs`
+            run (Callable[[], IO[str]]): runs the pipeline
+
+        Returns:
+            Job: the started job
+
+        """
+
+        num: int = max(self.__jobs, default=0) + 1
+        job = Job(num, line, self.__pool.submit(run))
+        self.__jobs[num] = job
+
+        return job
+
+    def list(self) -> list[Job]:
+        return list(self.__jobs.values())
+
+    def get(self, num: int) -> Optional[Job]:
+        return self.__jobs.get(num)
+
+    def wait(self, nums: Optional[list[int]] = None) -> list[Job]:
+        """
+        Wait for the jobs and forget them
+
+        Args:
+            nums (list[int]): job numbers, all jobs by default
+
+        Returns:
+            list[Job]: the finished jobs
+
+        """
+
+        if nums is None:
+            nums = sorted(self.__jobs)
+
+        jobs: list[Job] = [self.__jobs.pop(n) for n in nums]
+        wait([job.future for job in jobs])
+
+        return jobs
+
+    def clear(self) -> None:
+        """
+        Forget all jobs, running pipelines are not waited
+
+        """
+
+        self.__jobs.clear()
+        self.__pool.shutdown(wait=False, cancel_futures=True)
+        self.__pool = ThreadPoolExecutor(thread_name_prefix='job')
@@ -0,0 +1,367 @@
+from __future__ import annotations
+from abc import ABC, abstractmethod
+from typing import Iterator, Mapping, Optional
+import os
+import selectors
+import signal
+import subprocess
+
+# the same as in subprocess
+PIPE = subprocess.PIPE
+
+HAS_POSIX_SPAWN: bool = hasattr(os, 'posix_spawn')
+
+_READ_SIZE: int = 64 * 1024
+
+# signals ignored by the interpreter, but a child must get them
+_DEFAULT_SIGNALS = tuple(
+    getattr(signal, s) for s in ('SIGPIPE', 'SIGXFSZ') if hasattr(signal, s))
+
+
+def _highFd(fd: int) -> int:
+    """
+    Move the pipe end above 0, 1 and 2. Otherwise
+    `dup2(fd, fd)` in the child keeps the close-on-exec flag
+
+    """
+
+    if fd > 2:
+        return fd
+
+    import fcntl
+    newFd = fcntl.fcntl(fd, fcntl.F_DUPFD_CLOEXEC, 3)
+    os.close(fd)
+
+    return newFd
+
+
+class Process(ABC):
+    """
+    A child process with stdin and stdout connected to the shell,
+    stderr is inherited from the shell. Subclasses start and
+    wait the child in their own way
+
+    Args:
+        path (str): the full path of the executable
+        argv (list[str]): the arguments, including the command name
+        stdin (int): PIPE, a file descriptor or None to inherit it
+        stdout (int): PIPE, a file descriptor or None to inherit it
+        env (Mapping[str, str]): the environment, os.environ by default
+        cwd (str): the working directory, the shell's one by default
+
+    Attributes:
+        pid (int): the child pid
+        stdin (int): the write end of the stdin pipe, if any
+        stdout (int): the read end of the stdout pipe, if any
+
+    Raises:
+        OSError: if the file can't be executed
+
+    """
+
+    def __init__(self, path: str, argv: list[str],
+                 stdin: Optional[int] = PIPE, stdout: Optional[int] = PIPE,
+                 env: Optional[Mapping[str, str]] = None,
+                 cwd: Optional[str] = None) -> None:
+        self.stdin: Optional[int] = None
+        self.stdout: Optional[int] = None
+
+        childFds: list[int] = []
+
+        try:
+            if stdin == PIPE:
+                readEnd, self.stdin = map(_highFd, os.pipe())
+                childFds.append(readEnd)
+                stdin = readEnd
+
+            if stdout == PIPE:
+                self.stdout, writeEnd = map(_highFd, os.pipe())
+                childFds.append(writeEnd)
+                stdout = writeEnd
+
+            self.pid: int = self._start(path, argv, stdin, stdout, env, cwd)
+        except OSError:
+            self._closeStdin()
+            self._closeStdout()
+            raise
+        finally:
+            for fd in childFds:
+                os.close(fd)
+
+    @abstractmethod
+    def _start(self, path: str, argv: list[str], stdin: Optional[int],
+               stdout: Optional[int], env: Optional[Mapping[str, str]],
+               cwd: Optional[str]) -> int:
+        """
+        Start the child with the given stdin and stdout
+
+        Returns:
+            int: the child pid
+
+        """
+
+    @property
+    @abstractmethod
+    def returncode(self) -> Optional[int]:
+        """
+        The exit code, None while the child is running
+
+        """
+
+    @abstractmethod
+    def poll(self) -> Optional[int]:
+        """
+        Returns:
+            int: the exit code, None if the child is still running
+
+        """
+
+    @abstractmethod
+    def wait(self) -> int:
+        """
+        Wait for the child to exit
+
+        Returns:
+            int: the exit code
+
+        """
+
+    @abstractmethod
+    def terminate(self) -> None:
+        """
+        Send SIGTERM to the child if it's still running
+
+        """
+
+    def iterate(self, chunks: Optional[Iterator[bytes]] = None
+                ) -> Iterator[bytes]:
+        """
+        Feed stdin from `chunks` and yield the output as soon as
+        it's read. A chunk is taken only when the pipe has room,
+        so the producer goes no faster than the child reads
+
+        Args:
+            chunks (Iterator[bytes]): the input,
+                None to close stdin at once
+
+        Yields:
+            bytes: pieces of the output, nothing if stdout isn't a pipe
+
+        """
+
+        with selectors.DefaultSelector() as sel:
+            if self.stdin is not None:
+                if chunks is None:
+                    self._closeStdin()
+                else:
+                    os.set_blocking(self.stdin, False)
+                    sel.register(self.stdin, selectors.EVENT_WRITE)
+
+            if self.stdout is not None:
+                sel.register(self.stdout, selectors.EVENT_READ)
+
+            pending: Optional[memoryview] = memoryview(b'')
+
+            while sel.get_map():
+                for key, _ in sel.select():
+                    if key.fd == self.stdout:
+                        chunk = os.read(self.stdout, _READ_SIZE)
+                        if chunk:
+                            yield chunk
+                            continue
+                        sel.unregister(self.stdout)
+                        self._closeStdout()
+                        continue
+
+                    pending = self.__write(pending, chunks)
+
+                    if pending is None:
+                        sel.unregister(self.stdin)
+                        self._closeStdin()
+
+    def communicate(self, data: bytes = b'') -> bytes:
+        """
+        Write `data` to stdin, read stdout until EOF
+        and wait for the child
+
+        Returns:
+            bytes: the child output, empty if stdout isn't a pipe
+
+        """
+
+        output = b''.join(self.iterate(iter((data,))))
+        self.wait()
+
+        return output
+
+    def close(self) -> None:
+        """
+        Close the pipes and wait for the child. The child is
+        terminated if it's still running: nobody reads its output
+
+        """
+
+        self._closeStdin()
+        self._closeStdout()
+
+        if self.poll() is None:
+            self.terminate()
+
+        self.wait()
+
+    def __write(self, pending: memoryview, chunks: Iterator[bytes]
+                ) -> Optional[memoryview]:
+        """
+        Write to the non-blocking stdin as much as the pipe takes,
+        but not much more than a read, to keep reading the output
+
+        Returns:
+            memoryview: the data which wasn't written,
+                None if the input is over
+
+        """
+
+        written: int = 0
+
+        while written < _READ_SIZE:
+            if not pending:
+                data = next(chunks, None)
+                if data is None:
+                    return None
+                pending = memoryview(data)
+                continue
+
+            try:
+                count = os.write(self.stdin, pending)
+            except BlockingIOError:
+                break
+            except BrokenPipeError:
+                # the child doesn't read its input
+                return None
+
+            pending = pending[count:]
+            written += count
+
+        return pending
+
+    def _closeStdin(self) -> None:
+        if self.stdin is not None:
+            os.close(self.stdin)
+            self.stdin = None
+
+    def _closeStdout(self) -> None:
+        if self.stdout is not None:
+            os.close(self.stdout)
+            self.stdout = None
+
+
+class _SpawnProcess(Process):
+    """
+    A child process started with `os.posix_spawn`, which doesn't
+    copy the page tables of the interpreter, so its cost doesn't grow
+    with the interpreter's memory. It can't change the directory
+    of the child, the child runs in the shell's one
+
+    """
+
+    def _start(self, path: str, argv: list[str], stdin: Optional[int],
+               stdout: Optional[int], env: Optional[Mapping[str, str]],
+               cwd: Optional[str]) -> int:
+        self.__returncode: Optional[int] = None
+        fileActions: list[tuple] = []
+
+        if stdin is not None:
+            fileActions.append((os.POSIX_SPAWN_DUP2, stdin, 0))
+
+        if stdout is not None:
+            fileActions.append((os.POSIX_SPAWN_DUP2, stdout, 1))
+
+        return os.posix_spawn(
+            path, argv, os.environ if env is None else env,
+            file_actions=fileActions, setsigdef=_DEFAULT_SIGNALS)
+
+    @property
+    def returncode(self) -> Optional[int]:
+        return self.__returncode
+
+    def poll(self) -> Optional[int]:
+        if self.__returncode is None:
+            pid, status = os.waitpid(self.pid, os.WNOHANG)
+            if pid != 0:
+                self.__returncode = os.waitstatus_to_exitcode(status)
+
+        return self.__returncode
+
+    def wait(self) -> int:
+        if self.__returncode is None:
+            _, status = os.waitpid(self.pid, 0)
+            self.__returncode = os.waitstatus_to_exitcode(status)
+
+        return self.__returncode
+
+    def terminate(self) -> None:
+        if self.__returncode is None:
+            try:
+                os.kill(self.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+
+class _PopenProcess(Process):
+    """
+    `Process` over `subprocess.Popen`, for platforms without
+    `os.posix_spawn` and for children in another directory
+
+    """
+
+    def _start(self, path: str, argv: list[str], stdin: Optional[int],
+               stdout: Optional[int], env: Optional[Mapping[str, str]],
+               cwd: Optional[str]) -> int:
+        self.__popen = subprocess.Popen(argv, executable=path, env=env,
+                                        cwd=cwd, stdin=stdin, stdout=stdout)
+        return self.__popen.pid
+
+    @property
+    def returncode(self) -> Optional[int]:
+        return self.__popen.returncode
+
+    def poll(self) -> Optional[int]:
+        return self.__popen.poll()
+
+    def wait(self) -> int:
+        return self.__popen.wait()
+
+    def terminate(self) -> None:
+        self.__popen.terminate()
+
+
+def spawn(path: Optional[str], argv: list[str],
+          stdin: Optional[int] = PIPE, stdout: Optional[int] = PIPE,
+          env: Optional[Mapping[str, str]] = None,
+          cwd: Optional[str] = None) -> Process:
+    """
+    Start the command
+
+    Args:
+        path (str): the full path of the executable, if it's None
+            the command isn't found
+
+    The rest args are the same as for `Process`
+
+    Raises:
+        FileNotFoundError: if the command isn't found
+        OSError: if the command can't be executed
+
+    """
+
+    if path is None:
+        raise FileNotFoundError(2, 'No such file or directory', argv[0])
+
+    if cwd is not None and cwd == os.getcwd():
+        cwd = None
+
+    # `os.posix_spawn` has no file action to change the directory
+    if not HAS_POSIX_SPAWN or cwd is not None:
+        return _PopenProcess(path, argv, stdin, stdout, env, cwd)
+
+    return _SpawnProcess(path, argv, stdin, stdout, env, cwd)
@@ -0,0 +1,258 @@
+"""
+Loops of the session: `for VAR in WORDS; do BODY; done`
+and `while read VAR...; do BODY; done`.
+
+A loop is compiled once when it starts: statements are split
+into pipelines, commands and redirections, and the commands without
+variables and globs are parsed to their IR. Each iteration only binds
+the loop variables and expands the statements which use variables
+or globs, so globs see the files made by earlier iterations;
+their commands are parsed by the session command cache.
+
+"""
+
+from __future__ import annotations
+from typing import (IO, Callable, Iterator, Optional, TYPE_CHECKING,
+                    Union)
+import os
+
+from .clparser import CmdIR, LoopIR, Redirect, VarDecl
+from .clparser import parsePipes, parseRedirects, splitArgs, splitWords
+from .executor import DECODE_ERRORS
+from .expansion import expansion
+
+if TYPE_CHECKING:
+    from .session import Session
+
+# sets a variable: `Session.setVar` or a local state of a background loop
+Setter = Callable[[str, str], None]
+
+
+def _isConstant(text: str) -> bool:
+    # the expansion of a text without `$` doesn't depend on variables,
+    # and without glob chars it doesn't depend on files,
+    # a quoted glob char only makes the text expanded each time
+    return not any(c in text for c in '$*?[')
+
+
+class _Pipeline:
+    """
+    A compiled pipeline statement
+
+    Args:
+        statement (str): the pipeline, not expanded
+        session (Session): the session which parses the commands
+
+    Attributes:
+        stages (list[tuple[str, list[Redirect]]]): the commands
+            and their redirections, not expanded
+        cmds (list[CmdIR]): the parsed commands if the pipeline
+            has no variables, None otherwise
+
+    """
+
+    def __init__(self, statement: str, session: Session) -> None:
+        self.stages: list[tuple[str, list[Redirect]]] = []
+
+        for stage in parsePipes(statement):
+            cmd, redirects = parseRedirects(stage)
+
+            if not cmd:
+                raise SyntaxError('syntax error: a command is expected')
+
+            self.stages.append((cmd, redirects))
+
+        isConstant: bool = all(
+            _isConstant(cmd) and all(_isConstant(r.target) for r in rs)
+            for cmd, rs in self.stages)
+
+        self.cmds: Optional[list[CmdIR]] = None
+
+        if isConstant:
+            self.cmds = self.commands(session, {})
+
+    def commands(self, session: Session,
+                 state: dict[str, str]) -> list[CmdIR]:
+        if self.cmds is not None:
+            return self.cmds
+
+        return [session.cmdCache.parse(
+            expansion(cmd, state, session.substitute, session.glob),
+            [r.replace(target=expansion(r.target, state, session.substitute))
+             for r in rs])
+            for cmd, rs in self.stages]
+
+
+Statement = Union[str, _Pipeline, 'LoopPlan']
+
+
+class LoopPlan:
+    """
+    A compiled loop
+
+    Args:
+        loop (LoopIR): the parsed loop
+        session (Session): the session which runs the loop
+
+    Attributes:
+        loop (LoopIR): the parsed loop
+        body (list[Statement]): the compiled statements, a declaration
+            is kept as its text
+        source (_Pipeline): the pipeline which `while read` reads,
+            None if there is none
+
+    Raises:
+        SyntaxError: if a statement of the body is wrong
+
+    """
+
+    def __init__(self, loop: LoopIR, session: Session) -> None:
+        self.loop = loop
+        self.body: list[Statement] = [
+            self.__compile(s, session) for s in loop.body]
+        self.source: Optional[_Pipeline] = \
+            _Pipeline(loop.source, session) if loop.source else None
+
+    @staticmethod
+    def __compile(statement: Union[str, LoopIR],
+                  session: Session) -> Statement:
+        if isinstance(statement, LoopIR):
+            return LoopPlan(statement, session)
+
+        if VarDecl.checkDecl(statement):
+            return statement
+
+        return _Pipeline(statement, session)
+
+    def run(self, session: Session, state: dict[str, str],
+            setVar: Setter) -> Iterator[str]:
+        """
+        Run the loop
+
+        Args:
+            session (Session): the session which runs the loop
+            state (dict[str, str]): the variables which are expanded
+            setVar (Setter): sets a variable of `state`
+
+        Yields:
+            str: pieces of the output of the body statements, each
+                statement output ends with a newline like the output
+                of a command line
+
+        """
+
+        values: Iterator[list[str]] = self.__forValues(session, state) \
+            if self.loop.kind == 'for' else self.__readValues(session, state)
+
+        try:
+            for vals in values:
+                for var, value in zip(self.loop.vars, vals):
+                    setVar(var, value)
+
+                yield from self.__runBody(session, state, setVar)
+        finally:
+            values.close()
+
+    def __runBody(self, session: Session, state: dict[str, str],
+                  setVar: Setter) -> Iterator[str]:
+        for statement in self.body:
+            if isinstance(statement, str):
+                decl = VarDecl.parseDecl(
+                    expansion(statement, state, session.substitute))
+                setVar(decl.var, decl.value)
+            elif isinstance(statement, LoopPlan):
+                yield from statement.run(session, state, setVar)
+            else:
+                output = session.streamPipeline(
+                    statement.commands(session, state))
+
+                try:
+                    yield from output
+                finally:
+                    output.close()
+
+    def __forValues(self, session: Session,
+                    state: dict[str, str]) -> Iterator[list[str]]:
+        """
+        The words are expanded once when the loop starts,
+        an unquoted word is split by whitespace after it
+
+        """
+
+        words: list[str] = []
+
+        for word in splitWords(self.loop.words):
+            value = expansion(word, state, session.substitute, session.glob)
+            isQuoted: bool = '"' in word or "'" in word
+            words += [value] if isQuoted else splitArgs(value)
+
+        for word in words:
+            yield [word]
+
+    def __readValues(self, session: Session,
+                     state: dict[str, str]) -> Iterator[list[str]]:
+        """
+        Like `read` in Bash, the last variable gets the rest
+        of the line, missing fields are empty
+
+        """
+
+        count: int = len(self.loop.vars)
+
+        with self.__openInput(session, state) as lines:
+            for line in lines:
+                fields = [f.rstrip() for f in line.split(None, count - 1)]
+                yield fields + [''] * (count - len(fields))
+
+    def __openInput(self, session: Session,
+                    state: dict[str, str]) -> _Lines:
+        if self.loop.inputFile:
+            path: str = os.path.join(
+                session.cwd,
+                expansion(self.loop.inputFile, state, session.substitute))
+
+            try:
+                f = open(path, 'r', encoding='utf-8', errors=DECODE_ERRORS,
+                         newline='\n')
+            except FileNotFoundError:
+                raise FileNotFoundError(
+                    f'while: {self.loop.inputFile}: No such file')
+
+            return _Lines(f, f)
+
+        if self.source is not None:
+            output = session.streamPipeline(
+                self.source.commands(session, state), newline=False)
+            return _Lines(output, output)
+
+        return _Lines(session.stdin, None)
+
+
+class _Lines:
+    """
+    Lines of a text stream or of pieces of a pipeline output,
+    the stream is closed on exit
+
+    """
+
+    def __init__(self, chunks: Iterator[str], closing: Optional[IO]) -> None:
+        self.__chunks = chunks
+        self.__closing = closing
+
+    def __enter__(self) -> Iterator[str]:
+        return self.__lines()
+
+    def __exit__(self, *exc) -> None:
+        if self.__closing is not None:
+            self.__closing.close()
+
+    def __lines(self) -> Iterator[str]:
+        partial: str = ''
+
+        for chunk in self.__chunks:
+            lines = (partial + chunk).split('\n')
+            partial = lines.pop()
+            yield from lines
+
+        if partial:
+            yield partial
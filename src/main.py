@@ -1,8 +1,15 @@
+from .console import openConsole
+from .executor import DECODE_ERRORS
 from .session import Session
+import sys
 
 
 def main():
-    session = Session()
+    # a script or data piped into the shell is read by blocks
+    session = Session(stdin=openConsole(sys.stdin))
+
+    # binary output of commands is printed as it is
+    sys.stdout.reconfigure(errors=DECODE_ERRORS)
 
     while True:
         try:
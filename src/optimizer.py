@@ -0,0 +1,92 @@
+from __future__ import annotations
+from typing import Optional
+import os
+
+from .clparser import CmdIR, Redirect
+from .registry import registry
+
+
+def _isPlain(cmd: CmdIR, name: str, argCnt: int) -> bool:
+    return cmd.name == name and len(cmd.args) == argCnt \
+        and not cmd.keys and not cmd.redirects
+
+
+def _isIdentity(cmd: CmdIR) -> bool:
+    """
+    `cat` without args copies its input to its output
+
+    """
+
+    return _isPlain(cmd, 'cat', 0)
+
+
+def _readsInput(cmd: CmdIR) -> bool:
+    return not any(r.op == '<' for r in cmd.redirects)
+
+
+def _withInputFile(cmd: CmdIR, filename: str) -> CmdIR:
+    """
+    The command which reads the file instead of its input stream:
+    the file is appended to its args if the builtin supports it,
+    otherwise it's redirected to the input
+
+    """
+
+    pair = registry.lookup(cmd.name)
+
+    if pair is not None and pair[1].acceptsInputFile(cmd):
+        return cmd.replace(args=[*cmd.args, filename])
+
+    return cmd.replace(redirects=[Redirect('<', filename), *cmd.redirects])
+
+
+def optimizePipeline(cmds: list[CmdIR],
+                     cwd: Optional[str] = None) -> list[CmdIR]:
+    """
+    Rewrite the pipeline into a cheaper one with the same output.
+    Each stage copies all the data through the stage before it,
+    so stages which only pass the data on are removed:
+
+        `cmd | cat` -> `cmd`
+        `cat FILE | grep pat` -> `grep pat FILE`
+        `cat FILE | wc` -> `wc < FILE`
+
+    `cat FILE` is folded only if the file exists, so a missing file
+    is reported by `cat` as before. The commands are immutable,
+    rewritten stages are copies
+
+    Args:
+        cmds (list[CmdIR]): the parsed pipeline
+        cwd (str): the directory which relative files are found in,
+            the current directory of the process by default
+
+    Returns:
+        list[CmdIR]: the rewritten pipeline
+
+    """
+
+    # the first `cat` reads the console, it isn't the identity
+    stages: list[CmdIR] = cmds[:1] + \
+        [cmd for cmd in cmds[1:] if not _isIdentity(cmd)]
+    plan: list[CmdIR] = []
+
+    for cmd in stages:
+        prev = plan[-1] if plan else None
+
+        if prev is not None and _isPlain(prev, 'cat', 1) \
+                and _readsInput(cmd) \
+                and os.path.isfile(os.path.join(cwd or '', prev.args[0])):
+            plan[-1] = _withInputFile(cmd, prev.args[0])
+        else:
+            plan.append(cmd)
+
+    return plan
+
+
+def formatPlan(cmds: list[CmdIR]) -> str:
+    """
+    The pipeline as a command line, e.g. to show the rewritten plan
+
+    """
+
+    return ' | '.join(' '.join(str(cmd).split()) for cmd in cmds)
@@ -0,0 +1,95 @@
+from typing import Mapping, Optional
+import os
+import shutil
+
+
+class CmdHashTable:
+    """
+    Remembers the full path of external commands,
+    like `hash` in Bash. A name is searched in PATH
+    only once, then the cached path is used.
+
+    The whole table is dropped when PATH changes.
+    Names with a slash are never hashed.
+
+    Args:
+        env (Mapping[str, str]): the environment with PATH,
+            os.environ by default
+
+    """
+
+    def __init__(self, env: Optional[Mapping[str, str]] = None) -> None:
+        # name -> [full path, hits]
+        self.__table: dict[str, list] = {}
+        self.__path: Optional[str] = None
+        self.__env: Mapping[str, str] = os.environ if env is None else env
+
+    def resolve(self, name: str) -> Optional[str]:
+        """
+        Find the command and remember its path
+
+        Args:
+            name (str): the command name
+
+        Returns:
+            str: the full path of the command,
+                None if there is no such command in PATH
+
+        """
+
+        if '/' in name:
+            return name
+
+        path: str = self.__checkPath()
+        entry = self.__table.get(name)
+
+        if entry is None:
+            found = shutil.which(name, path=path)
+
+            if found is None:
+                return None
+
+            entry = [os.path.abspath(found), 0]
+            self.__table[name] = entry
+
+        return entry[0]
+
+    def lookup(self, name: str) -> Optional[str]:
+        """
+        Same as `resolve`, but counts a hit, it's used before exec
+
+        """
+
+        fullPath = self.resolve(name)
+        entry = self.__table.get(name)
+
+        if entry is not None:
+            entry[1] += 1
+
+        return fullPath
+
+    def forget(self, name: str) -> None:
+        self.__table.pop(name, None)
+
+    def clear(self) -> None:
+        self.__table.clear()
+
+    def items(self) -> list[tuple[str, str, int]]:
+        """
+        Returns:
+            list[tuple[str, str, int]]: name, full path and hits
+                for each hashed command
+
+        """
+
+        self.__checkPath()
+        return [(name, p, hits) for name, (p, hits) in self.__table.items()]
+
+    def __checkPath(self) -> str:
+        path: str = self.__env.get('PATH', os.defpath)
+
+        if path != self.__path:
+            self.__table.clear()
+            self.__path = path
+
+        return path
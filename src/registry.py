@@ -0,0 +1,155 @@
+from __future__ import annotations
+from importlib import import_module
+from importlib import metadata
+from typing import Any, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .clparser import CmdIR
+    from .executor import CmdExecutor
+
+    CmdPair = tuple[type[CmdIR], type[CmdExecutor]]
+
+
+ENTRY_POINT_GROUP = 'softwaredesign.builtins'
+
+# name -> (IR class, executor class), as "module:attr" references
+# relative to this package. They are imported on first use only.
+BUILTINS: dict[str, tuple[str, str]] = {
+    'echo': ('.clparser:CmdIR', '.executor:EchoExecutor'),
+    'pwd': ('.clparser:CmdIR', '.executor:PwdExecutor'),
+    'cd': ('.clparser:CmdIR', '.executor:CdExecutor'),
+    'cat': ('.clparser:CmdIR', '.executor:CatExecutor'),
+    'wc': ('.clparser:WcIR', '.executor:WcExecutor'),
+    'grep': ('.clparser:GrepIR', '.executor:GrepExecutor'),
+    'exit': ('.clparser:CmdIR', '.executor:ExitExecutor'),
+    'hash': ('.clparser:HashIR', '.executor:HashExecutor'),
+    'jobs': ('.clparser:CmdIR', '.executor:JobsExecutor'),
+    'wait': ('.clparser:CmdIR', '.executor:WaitExecutor'),
+    'xargs': ('.clparser:XargsIR', '.executor:XargsExecutor'),
+    'sort': ('.clparser:SortIR', '.executor:SortExecutor'),
+    'head': ('.clparser:HeadIR', '.executor:HeadExecutor'),
+    'tail': ('.clparser:TailIR', '.executor:TailExecutor'),
+    'index': ('.clparser:CmdIR', '.executor:IndexExecutor'),
+    'find': ('.clparser:FindIR', '.executor:FindExecutor'),
+    'tee': ('.clparser:TeeIR', '.executor:TeeExecutor'),
+    'sha256sum': ('.clparser:ChecksumIR', '.executor:Sha256sumExecutor'),
+    'md5sum': ('.clparser:ChecksumIR', '.executor:Md5sumExecutor'),
+    'b2sum': ('.clparser:ChecksumIR', '.executor:B2sumExecutor'),
+}
+
+
+def _resolve(ref: str) -> Any:
+    module, _, attr = ref.partition(':')
+    return getattr(import_module(module, __package__), attr)
+
+
+def _pairFromPlugin(obj: Any) -> CmdPair:
+    """
+    An entry point may refer either to a `(CmdIR, CmdExecutor)` pair
+    or to a bare executor class. In the latter case the IR class
+    is taken from its `irClass` attribute, `CmdIR` by default
+
+    """
+
+    if isinstance(obj, tuple):
+        irCls, execCls = obj
+        return irCls, execCls
+
+    return getattr(obj, 'irClass', None) or _resolve('.clparser:CmdIR'), obj
+
+
+class CmdRegistry:
+    """
+    Maps a command name to its IR and executor classes
+
+    Builtins are declared as string references and imported lazily.
+    Third-party builtins are discovered through the
+    `softwaredesign.builtins` entry point group the first time
+    an unknown name is looked up, and loaded on their first use.
+    Builtins always win over plugins with the same name.
+
+    Attributes:
+        loaded (dict[str, CmdPair]): already resolved commands
+        generation (int): it's changed when a command is registered
+            or unregistered, so parsed commands may be dropped
+
+    """
+
+    def __init__(self, builtins: Optional[dict[str, tuple[str, str]]] = None,
+                 group: str = ENTRY_POINT_GROUP) -> None:
+        self.loaded: dict[str, CmdPair] = {}
+        self.generation: int = 0
+        self.__declared: dict[str, tuple[str, str]] = \
+            dict(BUILTINS if builtins is None else builtins)
+        self.__group = group
+        self.__plugins: Optional[dict[str, metadata.EntryPoint]] = None
+
+    def register(self, name: str,
+                 irCls: type[CmdIR], execCls: type[CmdExecutor]) -> None:
+        """
+        Register (or override) the command `name`
+
+        """
+
+        self.loaded[name] = (irCls, execCls)
+        self.generation += 1
+
+    def unregister(self, name: str) -> None:
+        self.loaded.pop(name, None)
+        self.__declared.pop(name, None)
+        self.generation += 1
+
+    def lookup(self, name: str) -> Optional[CmdPair]:
+        """
+        Find the command
+
+        Args:
+            name (str): the command name
+
+        Returns:
+            CmdPair: IR and executor classes for the command,
+                None if there is no such builtin (external command)
+
+        """
+
+        pair = self.loaded.get(name)
+        if pair is not None:
+            return pair
+
+        ref = self.__declared.get(name)
+        if ref is not None:
+            pair = (_resolve(ref[0]), _resolve(ref[1]))
+        else:
+            entryPoint = self.__entryPoints().get(name)
+            if entryPoint is None:
+                return None
+            pair = _pairFromPlugin(entryPoint.load())
+
+        self.loaded[name] = pair
+
+        return pair
+
+    def names(self) -> list[str]:
+        """
+        All known command names, including not loaded plugins
+
+        """
+
+        return sorted({*self.loaded, *self.__declared, *self.__entryPoints()})
+
+    def __entryPoints(self) -> dict[str, metadata.EntryPoint]:
+        if self.__plugins is None:
+            eps = metadata.entry_points()
+
+            if hasattr(eps, 'select'):
+                group = eps.select(group=self.__group)
+            else:
+                # python 3.9 returns a dict: group -> entry points
+                group = eps.get(self.__group, [])
+
+            self.__plugins = {ep.name: ep for ep in group}
+
+        return self.__plugins
+
+
+registry = CmdRegistry()
@@ -1,7 +1,19 @@
-from io import StringIO
-from .executor import runCommand
+from typing import IO, Generator, Optional, TextIO
+from .aioengine import runCommandAsync, streamCommandAsync
+from .executor import closeStream, runCommand, streamCommand
 from .expansion import expansion
-from .clparser import VarDecl, parsePipes, getCmdParser
+from .extsort import parseSize
+from .filecache import FileCache
+from .globbing import DirCache, expandGlob
+from .clparser import CmdCache, CmdIR, LoopIR, VarDecl
+from .clparser import parseBackground, parseLoop, parsePipes, parseRedirects
+from .jobs import JobTable
+from .loops import LoopPlan
+from .optimizer import formatPlan, optimizePipeline
+from .pathcache import CmdHashTable
+from .spillbuffer import DEFAULT_MEMORY_LIMIT, MemoryBudget, SpillBuffer
+import os
+import sys
 
 
 class Session():
@@ -9,16 +21,85 @@ class Session():
     This class is responsible for current session.
     It holds an environment (map the variable name to its value)
 
+    A session owns everything its commands depend on: the current
+    directory, the environment of external commands, the input
+    of the console and the caches. So many sessions may run at once
+    in threads of one process, e.g. in the daemon, and `cd`
+    or a variable of one session isn't seen by others
+
+    Args:
+        fileCache (FileCache): the file cache shared with other
+            sessions, e.g. by the daemon; a session has its own
+            cache by default
+        stdin (TextIO): the console input of the session and
+            of commands which have no other input, sys.stdin by default;
+            a piped input is read faster by `console.StdinReader`
+        cwd (str): the current directory, the one of the process
+            by default
+        env (dict[str, str]): the environment of external commands,
+            a copy of the process environment by default
+        stderr (TextIO): gets the diagnostics of the session,
+            like the plans printed with `SHOWPLAN`, sys.stderr by default
+
+    Some variables change the way commands are run:
+        TIMEOUT -- the time limit for each command in seconds
+        PIPETIMEOUT -- the time limit for a whole pipeline in seconds
+        ENGINE -- `async` to run pipelines in an event loop,
+            it's always used if some time limit is set
+        MEMLIMIT -- the memory which outputs of commands may take
+            together, e.g. 512M; past it they are moved to temporary files
+        SHOWPLAN -- print the pipeline rewritten by the optimizer
+            to `stderr` before it's run, like `set -x` in Bash
+        SHOWSTATS -- print the throughput of checksum builtins
+            to `stderr` after they end
+
     Attributes:
         state (dict[str, str]): map the variable name to its value
+        cwd (str): the current directory, changed by `cd`
+        env (dict[str, str]): the environment of external commands,
+            a declaration of a variable which is in it updates it,
+            like for exported variables in Bash
+        stdin (TextIO): the console input
+        stderr (TextIO): the diagnostics output
+        hashTable (CmdHashTable): remembered paths of external commands
+        jobs (JobTable): pipelines started in background with `&`
+        memory (MemoryBudget): the memory budget for outputs of commands
+        fileCache (FileCache): the content of files read by builtins
+        cmdCache (CmdCache): parsed commands, so a repeated command
+            isn't parsed and compiled again
+        dirCache (DirCache): listings of directories read by globs
 
     """
 
-    def __init__(self) -> None:
+    def __init__(self, fileCache: Optional[FileCache] = None,
+                 stdin: Optional[TextIO] = None, cwd: Optional[str] = None,
+                 env: Optional[dict[str, str]] = None,
+                 stderr: Optional[TextIO] = None) -> None:
         self.state: dict[str, str]
         self.state = dict()
+        self.cwd: str = os.path.abspath(cwd or os.getcwd())
+        self.env: dict[str, str] = dict(os.environ if env is None else env)
+        self.env['PWD'] = self.cwd
+        self.stdin: TextIO = stdin or sys.stdin
+        self.__stderr: Optional[TextIO] = stderr
+        self.hashTable = CmdHashTable(self.env)
+        self.jobs = JobTable()
+        self.memory = MemoryBudget()
+        self.fileCache = fileCache or FileCache()
+        self.__ownsCache: bool = fileCache is None
+        self.cmdCache = CmdCache()
+        self.dirCache = DirCache()
 
-    def getCmdResult(self, line: str) -> StringIO:
+    @property
+    def stderr(self) -> TextIO:
+        """
+        The diagnostics output, sys.stderr if the session has no other
+
+        """
+
+        return self.__stderr or sys.stderr
+
+    def getCmdResult(self, line: str) -> IO[str]:
         """
         Run command and return stream with the result
 
@@ -26,34 +107,156 @@ class Session():
             line (str): the user entered command
 
         Returns:
-            StringIO: the stream with the result of cmd execution
+            IO[str]: the stream with the result of cmd execution
 
         """
 
-        splitByPipes: list[str] = parsePipes(line)
+        result = SpillBuffer(self.memory)
+        output = self.streamCmdResult(line)
+
+        try:
+            result.writelines(output)
+        finally:
+            output.close()
 
-        expansed: list[str] = [expansion(c, self.state) for c in splitByPipes]
+        return result
 
-        isDecl: bool = (len(expansed) == 1 and VarDecl.checkDecl(expansed[0]))
+    def streamCmdResult(self, line: str) -> Generator[str, None, None]:
+        """
+        Run command, its output is yielded as soon as it's made.
+        It's needed for commands which never end, like `tail -f`
+
+        Args:
+            line (str): the user entered command
+
+        Yields:
+            str: pieces of the result of cmd execution
+
+        """
+
+        line, isBackground = parseBackground(line)
+
+        loop = parseLoop(line)
+
+        if loop is not None:
+            yield from self.__runLoop(loop, line, isBackground)
+            return
+
+        splitByPipes: list[str] = parsePipes(line)
+
+        isDecl: bool = (len(splitByPipes) == 1
+                        and VarDecl.checkDecl(splitByPipes[0]))
 
         if isDecl:
-            varDecl = VarDecl.parseDecl(expansed[0])
-            self.__updateState(varDecl)
+            # like in Bash, a declaration in background has no effect
+            if not isBackground:
+                varDecl = VarDecl.parseDecl(expansion(
+                    splitByPipes[0], self.state, self.substitute))
+                self.setVar(varDecl.var, varDecl.value)
+
+            return
 
-            return StringIO('')
+        cmds = [self.__parseCmd(c) for c in splitByPipes]
 
-        cmds = [getCmdParser(c) for c in expansed]
+        if isBackground:
+            cmds = self.__plan(cmds)
+            limits = self.__asyncLimits()
+            job = self.jobs.start(
+                line, (lambda: runCommand(cmds, self)) if limits is None
+                else (lambda: runCommandAsync(cmds, self, *limits)))
+            yield f'[{job.num}]\n'
+            return
+
+        yield from self.streamPipeline(cmds)
+
+    def streamPipeline(self, cmds: list[CmdIR], newline: bool = True
+                       ) -> Generator[str, None, None]:
+        """
+        Run the parsed pipeline in foreground,
+        e.g. a statement of a loop body
+
+        Args:
+            cmds (list[CmdIR]): the commands of the pipeline
+            newline (bool): end the output with a newline,
+                like the output of a command line
+
+        Yields:
+            str: pieces of the pipeline output
+
+        """
+
+        cmds = self.__plan(cmds)
+        limits = self.__asyncLimits()
+
+        output = streamCommand(cmds, self) if limits is None \
+            else streamCommandAsync(cmds, self, *limits)
+
+        try:
+            yield from output
+        finally:
+            closeStream(output)
+
+        if newline:
+            yield '\n'
+
+    def substitute(self, line: str) -> str:
+        """
+        Run the pipeline of the command substitution `$(...)`.
+        Builtins run in-process, only external commands are spawned
+
+        Args:
+            line (str): the pipeline inside `$(...)`
+
+        Returns:
+            str: its output without trailing newlines, like in Bash
+
+        """
+
+        if not line.strip():
+            return ''
+
+        cmds = self.__plan([self.__parseCmd(c) for c in parsePipes(line)])
+        result = runCommand(cmds, self)
 
         try:
-            ostr = runCommand(cmds)
-        except Exception as e:
-            raise e
+            return result.getvalue().rstrip('\n')
+        finally:
+            result.close()
+
+    def glob(self, pattern: str) -> list[str]:
+        """
+        Find the paths matched by the pattern in the current directory,
+        the directory listings are taken from the session cache
+
+        """
+
+        return expandGlob(pattern, self.cwd, self.dirCache)
 
-        return ostr
+    def setVar(self, var: str, value: str) -> None:
+        """
+        Set the variable, the environment of external commands
+        is changed too if the variable is in it
+
+        """
+
+        self.state[var] = value
+
+        if var in self.env:
+            self.env[var] = value
+
+    def isSet(self, var: str) -> bool:
+        """
+        Is a switch variable, like `SHOWPLAN`, on: set and not `0`
+
+        """
+
+        return self.state.get(var, '') not in ('', '0')
 
     def work(self) -> bool:
         """
-        Like as eventloop
+        Like as eventloop. A terminal gets a prompt and the output
+        as soon as it's made; a script or data piped into the shell
+        is read without prompts and the output is written by blocks
 
         Args:
             No arguments
@@ -62,25 +265,139 @@ class Session():
             bool: False if it's impossible to continue this session
                   True otherwise
 
+        Raises:
+            EOFError: at the end of the input
+
         """
 
-        print('> ', end='')
+        if self.stdin.isatty():
+            print('> ', end='')
+            line: str = input()
+        else:
+            line = self.stdin.readline()
+
+            if not line:
+                raise EOFError
 
-        line: str = input()
+            line = line.rstrip('\n')
 
         if line == '' or line.isspace():
             return True
 
-        ostr = self.getCmdResult(line)
+        output = self.streamCmdResult(line)
 
-        print(ostr.getvalue(), end='')
-
-        ostr.close()
+        try:
+            # like stdio, the output is flushed by lines only to a terminal
+            if sys.stdout.isatty():
+                for chunk in output:
+                    print(chunk, end='', flush=True)
+            else:
+                sys.stdout.writelines(output)
+        except KeyboardInterrupt:
+            # like in Bash, Ctrl-C stops the command, not the shell
+            print()
+        finally:
+            output.close()
+            sys.stdout.flush()
 
         return True
 
-    def __updateState(self, decl: VarDecl):
-        self.state[decl.var] = decl.value
+    def __parseCmd(self, cmd: str) -> CmdIR:
+        cmd, redirects = parseRedirects(cmd)
+
+        if not cmd:
+            raise SyntaxError('syntax error: a command is expected')
+
+        redirects = [r.replace(
+            target=expansion(r.target, self.state, self.substitute))
+            for r in redirects]
+
+        return self.cmdCache.parse(
+            expansion(cmd, self.state, self.substitute, self.glob), redirects)
+
+    def __plan(self, cmds: list[CmdIR]) -> list[CmdIR]:
+        cmds = optimizePipeline(cmds, self.cwd)
+
+        if self.isSet('SHOWPLAN'):
+            print(f'+ {formatPlan(cmds)}', file=self.stderr)
+
+        self.memory.limit = self.__getMemoryLimit()
+
+        return cmds
+
+    def __runLoop(self, loop: LoopIR, line: str,
+                  isBackground: bool) -> Generator[str, None, None]:
+        plan = LoopPlan(loop, self)
+
+        if not isBackground:
+            output = plan.run(self, self.state, self.setVar)
+
+            try:
+                yield from output
+            finally:
+                output.close()
+            return
+
+        # like in Bash, the loop variables don't leave the background
+        state: dict[str, str] = dict(self.state)
+
+        def run() -> IO[str]:
+            result = SpillBuffer(self.memory)
+            result.writelines(plan.run(self, state, state.__setitem__))
+            return result
+
+        job = self.jobs.start(line, run)
+        yield f'[{job.num}]\n'
+
+    def __asyncLimits(
+            self) -> Optional[tuple[Optional[float], Optional[float]]]:
+        """
+        Returns:
+            tuple[float, float]: the command and the pipeline time limits,
+                None if the pipeline doesn't run in the event loop
+
+        """
+
+        cmdTimeout = self.__getTimeout('TIMEOUT')
+        pipeTimeout = self.__getTimeout('PIPETIMEOUT')
+        isAsync: bool = self.state.get('ENGINE') == 'async' \
+            or cmdTimeout is not None or pipeTimeout is not None
+
+        if not isAsync:
+            return None
+
+        return cmdTimeout, pipeTimeout
+
+    def __getTimeout(self, var: str) -> Optional[float]:
+        value: str = self.state.get(var, '')
+
+        if not value:
+            return None
+
+        try:
+            timeout = float(value)
+        except ValueError:
+            raise ValueError(f'{var}: a number must be, but found {value}')
+
+        return timeout if timeout > 0 else None
+
+    def __getMemoryLimit(self) -> int:
+        value: str = self.state.get('MEMLIMIT', '')
+
+        if not value:
+            return DEFAULT_MEMORY_LIMIT
+
+        try:
+            return parseSize(value)
+        except ValueError:
+            raise ValueError(f'MEMLIMIT: a size must be, but found {value}')
 
     def endSession(self) -> None:
         self.state.clear()
+        self.hashTable.clear()
+        self.jobs.clear()
+        self.cmdCache.clear()
+
+        # a shared cache stays warm for other sessions
+        if self.__ownsCache:
+            self.fileCache.clear()
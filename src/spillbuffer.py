@@ -0,0 +1,160 @@
+from __future__ import annotations
+from typing import IO, Optional
+import io
+import tempfile
+import threading
+
+# the size of one buffer in chars after which it's moved to a file
+DEFAULT_SPILL_SIZE: int = 16 * 1024 * 1024
+
+# the size in chars which all buffers of a session may take in memory
+DEFAULT_MEMORY_LIMIT: int = 256 * 1024 * 1024
+
+
+class MemoryBudget:
+    """
+    The memory which in-memory buffers of a session take together.
+    It's shared by threads of background jobs
+
+    Args:
+        limit (int): the ceiling in chars
+
+    """
+
+    def __init__(self, limit: int = DEFAULT_MEMORY_LIMIT) -> None:
+        self.limit = limit
+        self.__used: int = 0
+        self.__lock = threading.Lock()
+
+    @property
+    def used(self) -> int:
+        return self.__used
+
+    def reserve(self, size: int) -> bool:
+        """
+        Take `size` chars of the budget
+
+        Returns:
+            bool: False if the ceiling would be exceeded,
+                then nothing is taken
+
+        """
+
+        with self.__lock:
+            if self.__used + size > self.limit:
+                return False
+
+            self.__used += size
+            return True
+
+    def release(self, size: int) -> None:
+        with self.__lock:
+            self.__used -= size
+
+
+class SpillBuffer(io.TextIOBase):
+    """
+    A text buffer which is kept in memory like `io.StringIO` while it's
+    small, then it's moved to a temporary file, like
+    `tempfile.SpooledTemporaryFile`. It's moved earlier if the session
+    memory budget is exhausted, so a huge output doesn't take
+    all the memory of the interpreter
+
+    Args:
+        budget (MemoryBudget): the session budget, None if
+            only `spillSize` limits the buffer
+        spillSize (int): the size in chars after which
+            the buffer is moved to a file
+
+    """
+
+    def __init__(self, budget: Optional[MemoryBudget] = None,
+                 spillSize: int = DEFAULT_SPILL_SIZE) -> None:
+        super().__init__()
+        self.__file: IO[str] = io.StringIO()
+        self.__budget = budget
+        self.__spillSize = spillSize
+        self.__reserved: int = 0
+        self.__spilled: bool = False
+
+    @property
+    def spilled(self) -> bool:
+        return self.__spilled
+
+    def readable(self) -> bool:
+        return True
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def write(self, s: str) -> int:
+        if not self.__spilled and not self.__reserve(len(s)):
+            self.__spill()
+
+        return self.__file.write(s)
+
+    def read(self, size: Optional[int] = -1) -> str:
+        return self.__file.read(size)
+
+    def readline(self, size: Optional[int] = -1) -> str:
+        return self.__file.readline(size)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self.__file.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self.__file.tell()
+
+    def getvalue(self) -> str:
+        if not self.__spilled:
+            return self.__file.getvalue()
+
+        pos = self.__file.tell()
+        self.__file.seek(0)
+        value = self.__file.read()
+        self.__file.seek(pos)
+
+        return value
+
+    def close(self) -> None:
+        if not self.closed:
+            self.__file.close()
+            self.__release()
+
+        super().close()
+
+    def __reserve(self, size: int) -> bool:
+        if self.__reserved + size > self.__spillSize:
+            return False
+
+        if self.__budget is not None and not self.__budget.reserve(size):
+            return False
+
+        self.__reserved += size
+        return True
+
+    def __release(self) -> None:
+        if self.__budget is not None:
+            self.__budget.release(self.__reserved)
+
+        self.__reserved = 0
+
+    def __spill(self) -> None:
+        memory = self.__file
+        pos = memory.tell()
+
+        self.__file = tempfile.TemporaryFile(
+            'w+', encoding='utf-8', errors='surrogatepass', newline='')
+        self.__file.write(memory.getvalue())
+
+        # text file positions are not char offsets
+        if pos != memory.seek(0, io.SEEK_END):
+            self.__file.seek(0)
+            self.__file.read(pos)
+
+        memory.close()
+        self.__spilled = True
+        self.__release()
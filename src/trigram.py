@@ -0,0 +1,393 @@
+from __future__ import annotations
+from array import array
+from bisect import bisect_left
+from typing import IO, Iterator, Optional
+import json
+import mmap
+import os
+import re
+import struct
+
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    # before Python 3.11
+    import sre_parse
+
+# the index of a directory is kept in this file of the directory
+INDEX_NAME: str = '.sdindex'
+
+# like GNU grep, a file with a zero byte in this prefix is binary
+BINARY_CHECK_SIZE: int = 8192
+
+_MAGIC: bytes = b'SDTRI\x02'
+_LENGTH = struct.Struct('<Q')
+
+
+def isBinary(data: bytes) -> bool:
+    return b'\0' in data[:BINARY_CHECK_SIZE]
+
+
+def walkFiles(root: str) -> Iterator[tuple[str, os.DirEntry]]:
+    """
+    Walk the directory tree in sorted order,
+    symlinks are not followed like in `grep -r`
+
+    Yields:
+        str: the file path relative to `root`
+        os.DirEntry: the file entry
+
+    """
+
+    def walk(path: str, prefix: str) -> Iterator[tuple[str, os.DirEntry]]:
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda e: e.name)
+
+        for entry in entries:
+            rel = prefix + entry.name
+
+            if entry.is_dir(follow_symlinks=False):
+                yield from walk(entry.path, rel + os.sep)
+            elif entry.is_file(follow_symlinks=False) \
+                    and rel != INDEX_NAME:
+                yield rel, entry
+
+    yield from walk(root, '')
+
+
+def fileTrigrams(data: bytes) -> array:
+    """
+    Trigrams of lines of the file, ASCII letters are lowercased.
+    A pattern matches within a line, so trigrams across
+    newlines are not needed
+
+    Returns:
+        array: sorted trigrams, each one is packed into an int
+
+    """
+
+    triples: set[tuple[int, int, int]] = set()
+
+    for line in set(data.lower().splitlines()):
+        triples.update(zip(line, line[1:], line[2:]))
+
+    return array('I', sorted(a << 16 | b << 8 | c for a, b, c in triples))
+
+
+def _literals(parsed) -> Iterator[str]:
+    """
+    Literal strings which each match of the parsed pattern contains,
+    only the top-level sequence and plain groups are looked at
+
+    """
+
+    run: list[str] = []
+
+    for op, av in parsed:
+        if op is sre_parse.LITERAL:
+            run.append(chr(av))
+            continue
+
+        yield ''.join(run)
+        run = []
+
+        # (group, add flags, del flags, pattern)
+        if op is sre_parse.SUBPATTERN and not av[1] and not av[2]:
+            yield from _literals(av[-1])
+
+    yield ''.join(run)
+
+
+def patternTrigrams(pattern: str, ignoreCase: bool = False) -> set[int]:
+    """
+    Trigrams which a line must contain to match the pattern
+
+    Returns:
+        set[int]: the trigrams, empty if the pattern has no literal
+            of 3 bytes, then any line may match
+
+    """
+
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error:
+        return set()
+
+    if parsed.state.flags & re.IGNORECASE:
+        ignoreCase = True
+
+    trigrams: set[int] = set()
+
+    for literal in _literals(parsed):
+        data = literal.encode('utf-8').lower()
+
+        for a, b, c in zip(data, data[1:], data[2:]):
+            # other letters are not lowercased in the index
+            if ignoreCase and max(a, b, c) >= 0x80:
+                continue
+            trigrams.add(a << 16 | b << 8 | c)
+
+    return trigrams
+
+
+class TrigramIndex:
+    """
+    The trigram index of a directory tree. For each trigram it keeps
+    the files which contain it in some line, so `grep -r` reads
+    only files which contain all trigrams of the pattern literals.
+    Binary files are never matched, like in `grep -r`
+
+    The index is built by the `index` builtin and saved in the
+    `INDEX_NAME` file of the directory. A file changed after
+    it was indexed is always searched
+
+    Args:
+        root (str): the directory
+
+    Attributes:
+        root (str): the directory
+        files (dict[str, tuple[int, int]]): the modification time
+            and size of each indexed file by its relative path
+
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        self.files: dict[str, tuple[int, int]] = {}
+        self.__names: list[str] = []
+        # None for a binary file, it's loaded only to rebuild the index
+        self.__fileTrigrams: dict[str, Optional[array]] = {}
+        self.__keys = array('I')
+        self.__offsets = array('Q')
+        self.__postings: Optional[mmap.mmap] = None
+        self.__postingsStart: int = 0
+
+    @classmethod
+    def load(cls, root: str, full: bool = False) -> Optional[TrigramIndex]:
+        """
+        Load the index of the directory. Postings are mapped
+        into memory and read only for trigrams of a query
+
+        Args:
+            root (str): the directory
+            full (bool): load the trigrams of each file,
+                they are needed to update the index
+
+        Returns:
+            TrigramIndex: the index, None if the directory isn't indexed
+                or its index is broken
+
+        """
+
+        index = cls(root)
+
+        try:
+            with open(os.path.join(root, INDEX_NAME), 'rb') as f:
+                if f.read(len(_MAGIC)) != _MAGIC:
+                    return None
+
+                header = json.loads(_readBlock(f))
+                index.__keys.frombytes(_readBlock(f))
+                index.__offsets.frombytes(_readBlock(f))
+
+                index.__postingsStart = f.tell() + _LENGTH.size
+                _readBlock(f, skip=True)
+
+                fileOffsets = array('Q')
+                fileData = array('I')
+                if full:
+                    fileOffsets.frombytes(_readBlock(f))
+                    fileData.frombytes(_readBlock(f))
+
+                # the mapping stays valid when the index is replaced
+                index.__postings = mmap.mmap(
+                    f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError, struct.error):
+            return None
+
+        for num, (name, mtime, size, binary) in enumerate(header['files']):
+            index.__names.append(name)
+            index.files[name] = (mtime, size)
+
+            if binary:
+                index.__fileTrigrams[name] = None
+            elif full:
+                index.__fileTrigrams[name] = \
+                    fileData[fileOffsets[num]:fileOffsets[num + 1]]
+
+        return index
+
+    @classmethod
+    def build(cls, root: str) -> tuple[TrigramIndex, int]:
+        """
+        Build the index of the directory and save it.
+        Only files changed since the last build are read
+
+        Returns:
+            TrigramIndex: the index
+            int: the count of files which were read
+
+        """
+
+        old = cls.load(root, full=True) or cls(root)
+        index = cls(root)
+        updated: int = 0
+
+        for rel, entry in walkFiles(root):
+            stat = entry.stat(follow_symlinks=False)
+            version = (stat.st_mtime_ns, stat.st_size)
+
+            if old.files.get(rel) == version:
+                trigrams = old.__fileTrigrams[rel]
+            else:
+                try:
+                    trigrams = _readTrigrams(entry.path)
+                except OSError:
+                    continue
+                updated += 1
+
+            index.__names.append(rel)
+            index.files[rel] = version
+            index.__fileTrigrams[rel] = trigrams
+
+        index.save()
+
+        return cls.load(root) or index, updated
+
+    def isFresh(self, rel: str, stat: os.stat_result) -> bool:
+        """
+        Is the file unchanged since it was indexed
+
+        """
+
+        return self.files.get(rel) == (stat.st_mtime_ns, stat.st_size)
+
+    def candidates(self, pattern: str,
+                   ignoreCase: bool = False) -> set[str]:
+        """
+        Indexed files which may contain a match of the pattern
+
+        Returns:
+            set[str]: relative paths of the files
+
+        """
+
+        trigrams = patternTrigrams(pattern, ignoreCase)
+
+        if not trigrams:
+            return {name for name in self.__names
+                    if self.__fileTrigrams.get(name, ()) is not None}
+
+        found: Optional[set[int]] = None
+
+        # the rarest trigrams first, to keep the sets small
+        for postings in sorted(map(self.__postingsOf, trigrams), key=len):
+            found = set(postings) if found is None \
+                else found.intersection(postings)
+            if not found:
+                break
+
+        return {self.__names[num] for num in found}
+
+    def save(self) -> None:
+        postings: dict[int, list[int]] = {}
+        fileOffsets = array('Q', [0])
+        fileData = array('I')
+
+        for num, name in enumerate(self.__names):
+            trigrams = self.__fileTrigrams[name]
+            if trigrams is None:
+                continue
+
+            fileData.extend(trigrams)
+            fileOffsets.append(len(fileData))
+
+            for trigram in trigrams:
+                postings.setdefault(trigram, []).append(num)
+
+        # the offsets are counted for text files only
+        fileOffsets = self.__spreadOffsets(fileOffsets)
+
+        keys = array('I', sorted(postings))
+        offsets = array('Q', [0])
+        data = array('I')
+
+        for key in keys:
+            data.extend(postings[key])
+            offsets.append(len(data))
+
+        header = {'files': [[name, *self.files[name],
+                             self.__fileTrigrams[name] is None]
+                            for name in self.__names]}
+        path = os.path.join(self.root, INDEX_NAME)
+
+        # a concurrent `grep -r` never sees a half-written index
+        with open(f'{path}.tmp', 'wb') as f:
+            f.write(_MAGIC)
+            for block in (json.dumps(header).encode('utf-8'),
+                          keys.tobytes(), offsets.tobytes(), data.tobytes(),
+                          fileOffsets.tobytes(), fileData.tobytes()):
+                f.write(_LENGTH.pack(len(block)))
+                f.write(block)
+
+        os.replace(f'{path}.tmp', path)
+
+    def __spreadOffsets(self, textOffsets: array) -> array:
+        """
+        Make offsets of the trigrams for all files,
+        a binary file has no trigrams
+
+        """
+
+        offsets = array('Q', [0])
+        textNum: int = 0
+
+        for name in self.__names:
+            if self.__fileTrigrams[name] is not None:
+                textNum += 1
+            offsets.append(textOffsets[textNum])
+
+        return offsets
+
+    def __postingsOf(self, trigram: int) -> array:
+        pos = bisect_left(self.__keys, trigram)
+
+        if pos == len(self.__keys) or self.__keys[pos] != trigram:
+            return array('I')
+
+        itemSize: int = array('I').itemsize
+        start = self.__postingsStart + self.__offsets[pos] * itemSize
+        end = self.__postingsStart + self.__offsets[pos + 1] * itemSize
+
+        return array('I', self.__postings[start:end])
+
+
+def _readTrigrams(path: str) -> Optional[array]:
+    """
+    Returns:
+        array: trigrams of the file, None if it's binary
+
+    """
+
+    with open(path, 'rb') as f:
+        data = f.read(BINARY_CHECK_SIZE)
+
+        if isBinary(data):
+            return None
+
+        return fileTrigrams(data + f.read())
+
+
+def _readBlock(f: IO[bytes], skip: bool = False) -> bytes:
+    size, = _LENGTH.unpack(f.read(_LENGTH.size))
+
+    if skip:
+        f.seek(size, os.SEEK_CUR)
+        return b''
+
+    block = f.read(size)
+
+    if len(block) != size:
+        raise ValueError('the index is truncated')
+
+    return block
@@ -0,0 +1,73 @@
+import hashlib
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from src import checksum
+from src.checksum import Throughput, hashFile, hashFiles, hashStream
+
+
+class ChecksumTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        tmpDir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpDir.cleanup)
+        self.tmp = tmpDir.name
+
+        self.paths: list[str] = []
+        self.data: list[bytes] = []
+
+        for i in range(6):
+            data = os.urandom(1000 * i + 7)
+            path = os.path.join(self.tmp, f'f{i}')
+
+            with open(path, 'wb') as f:
+                f.write(data)
+
+            self.paths.append(path)
+            self.data.append(data)
+
+    def test_file(self):
+        # the file is read by several blocks
+        with mock.patch.object(checksum, 'BLOCK_SIZE', 1024):
+            digest, size = hashFile(self.paths[5], 'sha256')
+
+        self.assertEqual(digest, hashlib.sha256(self.data[5]).hexdigest())
+        self.assertEqual(size, len(self.data[5]))
+
+    def test_files_order(self):
+        results = list(hashFiles(self.paths, 'md5', workers=2))
+
+        self.assertEqual(results, [(hashlib.md5(d).hexdigest(), len(d))
+                                   for d in self.data])
+
+    def test_files_error(self):
+        paths = [*self.paths[:2], os.path.join(self.tmp, 'nonexist')]
+        results = hashFiles(paths, 'blake2b', workers=2)
+
+        self.assertEqual(next(results)[0],
+                         hashlib.blake2b(self.data[0]).hexdigest())
+        self.assertEqual(next(results)[0],
+                         hashlib.blake2b(self.data[1]).hexdigest())
+
+        with self.assertRaises(FileNotFoundError):
+            next(results)
+
+    def test_stream(self):
+        digest, size = hashStream([b'ab', b'', b'c'], 'sha256')
+
+        self.assertEqual(digest, hashlib.sha256(b'abc').hexdigest())
+        self.assertEqual(size, 3)
+
+    def test_throughput(self):
+        stats = Throughput('md5sum')
+        stats.add(1 << 20)
+        stats.add(1 << 20)
+
+        self.assertRegex(stats.report(),
+                         r'^md5sum: 2 files, 2\.0 MB in [\d.]+ s, '
+                         r'[\d.]+ MB/s$')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,15 @@
 import unittest
+import hashlib
 import os
+import shutil
 import subprocess
+import tempfile
+import threading
+import time
 
 from io import StringIO
+from unittest import mock
+from src import aioengine, extsort
 from src.session import Session
 
 
@@ -128,6 +135,70 @@ class PwdTestCase(CmdTestCase):
         self.assertCmdResult(cmd, gold)
 
 
+class CdTestCase(CmdTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        tmpDir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpDir.cleanup)
+        self.tmp = os.path.realpath(tmpDir.name)
+        os.mkdir(os.path.join(self.tmp, 'sub'))
+
+        with open(os.path.join(self.tmp, 'sub', 'f.txt'), 'w') as f:
+            f.write('in sub\n')
+
+    def test_cd(self):
+        cmd = [f'cd {self.tmp}', 'cd sub', 'pwd']
+        self.assertCmdResult(cmd, os.path.join(self.tmp, 'sub'))
+        self.assertNotEqual(os.getcwd(), self.session.cwd)
+
+    def test_parent(self):
+        cmd = [f'cd {self.tmp}/sub', 'cd ..', 'pwd']
+        self.assertCmdResult(cmd, self.tmp)
+
+    def test_home(self):
+        cmd = [f'HOME={self.tmp}', 'cd', 'pwd']
+        self.session.env['HOME'] = ''
+        self.assertCmdResult(cmd, self.tmp)
+
+    def test_relative_files(self):
+        cmd = [f'cd {self.tmp}/sub', 'cat f.txt | wc', 'grep sub < f.txt']
+        self.assertCmdResult(cmd[:2], '1 2 7')
+        self.assertCmdResult(cmd[2:], 'in sub')
+
+    def test_redirect(self):
+        cmd = [f'cd {self.tmp}', 'echo 42 > out.txt', 'cat out.txt']
+        self.assertCmdResult(cmd, '42')
+        self.assertTrue(os.path.isfile(os.path.join(self.tmp, 'out.txt')))
+
+    def test_external(self):
+        cmd = [f'cd {self.tmp}/sub', 'ls']
+        self.assertCmdResult(cmd, 'f.txt')
+
+    def test_relative_command(self):
+        script = os.path.join(self.tmp, 'sub', 'run.sh')
+        with open(script, 'w') as f:
+            f.write('#!/bin/sh\npwd\n')
+        os.chmod(script, 0o755)
+
+        cmd = [f'cd {self.tmp}', 'sub/run.sh']
+        self.assertCmdResult(cmd, self.tmp)
+
+    def test_external_env(self):
+        cmd = ['SD_VAR=42', 'env']
+        self.session.env['SD_VAR'] = ''
+        self.assertIn('SD_VAR=42', self._execCommands(cmd).split('\n'))
+        self.assertNotIn('SD_VAR', os.environ)
+
+    def test_missing(self):
+        with self.assertRaises(FileNotFoundError):
+            self._execCommands(['cd nonexistent'])
+
+        with self.assertRaises(NotADirectoryError):
+            self._execCommands([f'cd {self.tmp}/sub/f.txt'])
+
+        self.assertEqual(self.session.cwd, os.getcwd())
+
+
 class CatTestCase(CmdTestCase):
     def test_empty(self):
         p = self._getCorrectPath('/files/empty')
@@ -177,6 +248,14 @@ class WcTestCase(CmdTestCase):
         cmd = ['echo 123 | wc']
         self.assertCmdResult(cmd, '1 1 4')
 
+    def test_keys(self):
+        p = self._getCorrectPath('/files/random')
+
+        self.assertCmdResult([f'wc -l {p}'], f'5 {p}')
+        self.assertCmdResult([f'wc -c -w {p}'], f'40 253 {p}')
+        self.assertCmdResult([f'wc -l < {p}'], '5')
+        self.assertCmdResult(['echo 1 2 | wc -w'], '2')
+
 
 class GrepTestCase(CmdTestCase):
     def _runGrepFile(self, pattern: str, filename: str,
@@ -286,6 +365,928 @@ class GrepTestCase(CmdTestCase):
         self.assertCmdResult(cmd, gold)
 
 
+class HashTestCase(CmdTestCase):
+    def test_empty(self):
+        self.assertCmdResult(['hash'], 'hash: hash table empty')
+
+    def test_hits(self):
+        gold = shutil.which('true')
+        cmd = ['true', 'true', 'hash']
+        self.assertCmdResult(cmd, f'hits\tcommand\n   2\t{gold}')
+
+    def test_path_key(self):
+        cmd = ['hash -t true']
+        self.assertCmdResult(cmd, shutil.which('true'))
+
+    def test_clear(self):
+        cmd = ['true', 'hash -r', 'hash']
+        self.assertCmdResult(cmd, 'hash: hash table empty')
+
+    def test_path_changed(self):
+        self._execCommands(['true', f'PATH={os.defpath}'])
+
+        table = self.session.hashTable
+        self.assertEqual(table.items(), [])
+        self.assertIsNotNone(table.resolve('true'))
+
+    def test_failed_exec(self):
+        table = self.session.hashTable
+        table.resolve('true')
+        table._CmdHashTable__table['true'][0] = '/nonexistent/true'
+
+        self.assertCmdResult(['true', 'hash -t true'], shutil.which('true'))
+
+    def test_not_executable(self):
+        # the hashed file exists, so another `true` isn't searched
+        for engine in ('sync', 'async'):
+            with tempfile.NamedTemporaryFile() as f:
+                table = self.session.hashTable
+                table.resolve('true')
+                table._CmdHashTable__table['true'][0] = f.name
+
+                with self.assertRaises(PermissionError):
+                    self._execCommands([f'ENGINE={engine}', 'true'])
+
+                self.assertEqual(table.resolve('true'), f.name)
+
+
+class AsyncEngineTestCase(CmdTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self._execCommands(['ENGINE=async'])
+
+    def test_builtins(self):
+        p = self._getCorrectPath('/files/random')
+        cmd = [f'cat {p} | wc']
+
+        self.assertCmdResult(cmd, '5 40 253')
+
+    def test_externals(self):
+        p = self._getCorrectPath('/files/random')
+        cmd = [f'cat {p} | tr a-z A-Z | tr -d A-Z | wc']
+
+        self.assertCmdResult(cmd, '5 7 47')
+
+    def test_mixed(self):
+        cmd = ['echo 42 | tr 4 5 | cat']
+        self.assertCmdResult(cmd, '52')
+
+    def test_timeout(self):
+        cmd = ['TIMEOUT=0.2', 'sleep 5']
+
+        with self.assertRaisesRegex(TimeoutError, 'sleep: timed out'):
+            self._execCommands(cmd)
+
+    def test_pipe_timeout(self):
+        cmd = ['PIPETIMEOUT=0.2', 'sleep 5 | cat']
+
+        with self.assertRaisesRegex(TimeoutError, 'pipeline timed out'):
+            self._execCommands(cmd)
+
+    def test_in_time(self):
+        cmd = ['TIMEOUT=5', 'echo 42 | cat']
+        self.assertCmdResult(cmd, '42')
+
+    @mock.patch('src.executor.TailExecutor.maxDelay', 0.05)
+    def test_streamed(self):
+        # `tail -f` never ends, its output comes before the time limit
+        with tempfile.NamedTemporaryFile('w') as f:
+            f.write('x1\nno\n')
+            f.flush()
+
+            self._execCommands(['TIMEOUT=5'])
+            start = time.monotonic()
+            output = self.session.streamCmdResult(
+                f'tail -f -n 2 {f.name} | grep x')
+
+            self.assertEqual(next(output), 'x1\n')
+
+            f.write('x2\n')
+            f.flush()
+
+            self.assertEqual(next(output), 'x2\n')
+            output.close()
+
+            self.assertLess(time.monotonic() - start, 4)
+
+    def test_builtin_cancelled(self):
+        # `tail -f` never ends, it's stopped on timeout
+        ended = threading.Event()
+        run = aioengine._runStopping
+
+        def runStopping(*args):
+            try:
+                return run(*args)
+            finally:
+                ended.set()
+
+        with tempfile.NamedTemporaryFile() as f, \
+                mock.patch.object(aioengine, '_runStopping', runStopping):
+            for var in ['TIMEOUT', 'PIPETIMEOUT']:
+                ended.clear()
+                cmd = [f'{var}=0.2', f'tail -f {f.name}']
+
+                with self.assertRaises(TimeoutError):
+                    self._execCommands(cmd)
+
+                self.assertTrue(ended.wait(5))
+                self._execCommands([f'{var}=0'])
+
+
+class JobsTestCase(CmdTestCase):
+    def test_start(self):
+        self.assertCmdResult(['echo 42 &'], '[1]')
+
+    def test_wait(self):
+        cmd = ['echo 42 &', 'echo 43 | cat &', 'wait']
+        self.assertCmdResult(cmd, '42\n43')
+
+    def test_wait_num(self):
+        cmd = ['echo 42 &', 'echo 43 &', 'wait %2']
+        self.assertCmdResult(cmd, '43')
+        self.assertCmdResult(['wait 1', 'jobs'], '')
+
+    def test_running(self):
+        cmd = ['sleep 1 &', 'jobs']
+        self.assertCmdResult(cmd, '[1]  Running   sleep 1 &')
+
+    def test_overlap(self):
+        start = time.monotonic()
+        self._execCommands(['sleep 0.5 &', 'sleep 0.5 &', 'wait'])
+
+        self.assertLess(time.monotonic() - start, 0.9)
+
+    def test_quoted(self):
+        self.assertCmdResult(['echo "a &"'], 'a &')
+
+    def test_decl(self):
+        cmd = ['a=1 &', 'echo $a']
+        self.assertCmdResult(cmd, '')
+
+
+class XargsTestCase(CmdTestCase):
+    def test_default(self):
+        self.assertCmdResult(['echo a b c | xargs'], 'a b c')
+
+    def test_max_items(self):
+        cmd = ['echo a b c | xargs -n 2 echo x']
+        self.assertCmdResult(cmd, 'x a b\nx c')
+
+    def test_builtin_files(self):
+        p1 = self._getCorrectPath('/files/random')
+        p2 = self._getCorrectPath('/files/lines')
+        cmd = [f'echo {p1} {p2} | xargs wc']
+
+        self.assertCmdResult(
+            cmd, f'5 40 253 {p1}\n6 0 6 {p2}\n11 40 259 total')
+
+    def test_builtin_keys(self):
+        p = self._getCorrectPath('/files/random')
+        cmd = [f'echo {p} | xargs grep -i ut | wc']
+
+        self.assertCmdResult(cmd, '3 24 147')
+
+    def test_external_packing(self):
+        cmd = ['seq 1 10000 | xargs /bin/echo | wc']
+        self.assertCmdResult(cmd, '1 10000 48894')
+
+    def test_parallel(self):
+        start = time.monotonic()
+        cmd = ['echo 0.3 0.3 0.3 | xargs -P 3 -n 1 sleep']
+
+        self.assertCmdResult(cmd, '')
+        self.assertLess(time.monotonic() - start, 0.8)
+
+    def test_parallel_order(self):
+        cmd = ['seq 1 6 | xargs -P 3 -n 1 echo | wc']
+        self.assertCmdResult(cmd, '6 6 12')
+
+
+class SortTestCase(CmdTestCase):
+    def _sortedFile(self, relPath: str, **kwargs) -> str:
+        with open(self._getCorrectPath(relPath)) as f:
+            lines = f.read().splitlines()
+
+        return '\n'.join(sorted(lines, **kwargs)).rstrip()
+
+    def test_simple(self):
+        p = self._getCorrectPath('/files/kafka.txt')
+        gold = self._sortedFile('/files/kafka.txt')
+
+        self.assertCmdResult([f'sort {p}'], gold)
+
+    def test_pipe_reverse(self):
+        p = self._getCorrectPath('/files/random')
+        gold = self._sortedFile('/files/random', reverse=True)
+
+        self.assertCmdResult([f'cat {p} | sort -r'], gold)
+
+    def test_numeric(self):
+        cmd = ['seq 10 -3 1 | sort -n | xargs']
+        self.assertCmdResult(cmd, '1 4 7 10')
+
+    def test_fields(self):
+        cmd = ['echo b:2 a:3 c:1 | xargs -n 1 | sort -t : -k 2 -n | xargs']
+        self.assertCmdResult(cmd, 'c:1 b:2 a:3')
+
+    def test_unique(self):
+        cmd = ['echo b a b a | xargs -n 1 | sort -u | xargs']
+        self.assertCmdResult(cmd, 'a b')
+
+    def test_spill(self):
+        p = self._getCorrectPath('/files/kafka.txt')
+        gold = self._sortedFile('/files/kafka.txt')
+
+        self.assertCmdResult([f'sort -S 1K {p}'], gold)
+
+    def test_spill_parallel(self):
+        p = self._getCorrectPath('/files/kafka.txt')
+        gold = self._sortedFile('/files/kafka.txt', reverse=True)
+
+        self.assertCmdResult([f'sort -r -S 1K --parallel 2 {p}'], gold)
+
+    def test_spill_carriage_returns(self):
+        lines = [f'{i % 7}\r{i}\n' for i in range(200)]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            p = os.path.join(tmp, 'cr')
+            with open(p, 'w', newline='') as f:
+                f.writelines(lines)
+
+            gold = ''.join(sorted(lines)).rstrip()
+
+            for cmd in [f'sort {p}', f'sort -S 1K {p}',
+                        f'sort -S 1K --parallel 2 {p}']:
+                self.assertEqual(self._execCommands([cmd]), gold, cmd)
+
+    def test_merge_passes(self):
+        p = self._getCorrectPath('/files/kafka.txt')
+        gold = self._sortedFile('/files/kafka.txt')
+        readRun = extsort._readRun
+        opened = [0, 0]
+
+        def countingRun(path):
+            opened[0] += 1
+            opened[1] = max(opened)
+            try:
+                yield from readRun(path)
+            finally:
+                opened[0] -= 1
+
+        with mock.patch.object(extsort, '_MERGE_FAN_IN', 2), \
+                mock.patch.object(extsort, '_readRun', countingRun):
+            self.assertCmdResult([f'sort -S 512 {p}'], gold)
+
+        self.assertLessEqual(opened[1], 2)
+
+
+class GrepTreeTestCase(CmdTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        tmpDir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpDir.cleanup)
+        self.tmp = os.path.join(tmpDir.name, 'files')
+        shutil.copytree(self._getCorrectPath('/files'), self.tmp)
+
+    def _gnuGrep(self, *args: str) -> str:
+        lines = self.getExternalResult('grep', list(args)).splitlines()
+        return '\n'.join(ln for ln in lines if not ln.startswith('Binary'))
+
+    def assertSameLines(self, lines: list[str], gold: str) -> None:
+        result = self._execCommands(lines)
+        # GNU grep walks a directory in the disk order
+        self.assertEqual(sorted(result.splitlines()),
+                         sorted(gold.splitlines()))
+
+    def test_many_files(self):
+        kafka = f'{self.tmp}/kafka.txt'
+        random = f'{self.tmp}/random'
+        gold = self._gnuGrep('-A', '1', 'the', kafka, random)
+
+        self.assertCmdResult([f'grep -A 1 the {kafka} {random}'], gold)
+
+    def test_recursive(self):
+        gold = self._gnuGrep('-r', '-i', 'it', self.tmp)
+        self.assertSameLines([f'grep -r -i it {self.tmp}'], gold)
+
+    def test_index(self):
+        gold = self._gnuGrep('-r', 'Gregor', self.tmp)
+        cmd = [f'index {self.tmp}', f'grep -r Gregor {self.tmp}']
+
+        self.assertSameLines(cmd, gold)
+
+    def test_index_changed_file(self):
+        cmd = [f'index {self.tmp}', f'echo Gregor > {self.tmp}/empty',
+               f'grep -r Gregor {self.tmp}']
+        self._execCommands(cmd[:2])
+        gold = self._gnuGrep('-r', 'Gregor', self.tmp)
+
+        self.assertIn(f'{self.tmp}/empty:Gregor', gold)
+        self.assertSameLines(cmd[2:], gold)
+
+    def test_index_report(self):
+        cmd = [f'index {self.tmp}', f'index {self.tmp}']
+        self.assertCmdResult(cmd, f'{self.tmp}: 5 files, 0 updated')
+
+
+class HeadTestCase(CmdTestCase):
+    def test_lines(self):
+        p = self._getCorrectPath('/files/kafka.txt')
+        gold = self.getExternalResult('head', ['-n', '3', p])
+
+        self.assertCmdResult([f'head -n 3 {p}'], gold)
+
+    def test_default(self):
+        p = self._getCorrectPath('/files/kafka.txt')
+        gold = self.getExternalResult('head', [p])
+
+        self.assertCmdResult([f'cat {p} | head'], gold)
+
+    def test_chars(self):
+        cmd = ['echo 123456 | head -c 4']
+        self.assertCmdResult(cmd, '1234')
+
+    def test_bytes(self):
+        # a Cyrillic letter takes two bytes
+        self.assertCmdResult(['echo привет | head -c 4'], 'пр')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            p = os.path.join(tmp, 'in')
+            out = os.path.join(tmp, 'out')
+
+            with open(p, 'wb') as f:
+                f.write('привет\n'.encode())
+
+            self._execCommands([f'head -c 3 {p} > {out}',
+                                f'cat {p} | head -c 5 >> {out}'])
+
+            with open(out, 'rb') as f:
+                self.assertEqual(f.read(), 'пр'.encode()[:3]
+                                 + 'прив'.encode()[:5])
+
+    def test_stops_external(self):
+        # `yes` never ends by itself
+        cmd = ['yes | head -n 2 | xargs']
+        self.assertCmdResult(cmd, 'y y')
+
+    def test_stops_builtins(self):
+        cmd = ['yes | cat | grep y | head -n 3 | wc']
+        self.assertCmdResult(cmd, '3 3 6')
+
+    def test_unread_stage_runs(self):
+        # a stage is started even if the next one doesn't read it
+        with tempfile.TemporaryDirectory() as tmp:
+            cmd = [f'touch {tmp}/a.txt | echo hi']
+            self.assertCmdResult(cmd, 'hi')
+            self.assertTrue(os.path.exists(f'{tmp}/a.txt'))
+
+            cmd = [f'echo a | tee {tmp}/b.txt | echo hi', f'cat {tmp}/b.txt']
+            self.assertCmdResult(cmd, 'a')
+
+    def test_redirect(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cmd = [f'yes | head -n 2 > {tmp}/out', f'wc {tmp}/out']
+            self.assertCmdResult(cmd, f'2 2 4 {tmp}/out')
+
+
+class TailTestCase(CmdTestCase):
+    def test_lines(self):
+        p = self._getCorrectPath('/files/kafka.txt')
+        gold = self.getExternalResult('tail', ['-n', '3', p])
+
+        self.assertCmdResult([f'tail -n 3 {p}'], gold)
+
+    def test_long_file(self):
+        # more than one block is read backwards
+        cmd = ['seq 100000 | cat > {tmp}/seq',
+               'tail -n 20000 {tmp}/seq | head -n 1']
+
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertCmdResult([c.format(tmp=tmp) for c in cmd], '80001')
+
+    def test_pipe(self):
+        cmd = ['seq 10 | tail -n 2 | xargs']
+        self.assertCmdResult(cmd, '9 10')
+
+    @mock.patch('src.executor.TailExecutor.maxDelay', 0.05)
+    def test_follow(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = f'{tmp}/log'
+            with open(path, 'w') as f:
+                f.write('old\n')
+
+            cmd = [f'tail -f -n 1 {path} | grep new | head -n 2 &']
+            self.assertCmdResult(cmd, '[1]')
+            time.sleep(0.2)
+
+            with open(path, 'a') as f:
+                f.write('new 1\nskip\nnew')
+                f.flush()
+                time.sleep(0.2)
+                f.write(' 2\nnew 3\n')
+
+            self.assertCmdResult(['wait 1'], 'new 1\nnew 2')
+
+    @mock.patch('src.executor.TailExecutor.maxDelay', 0.05)
+    def test_follow_truncated(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = f'{tmp}/log'
+            with open(path, 'w') as f:
+                f.write('old\n')
+
+            cmd = [f'tail -f -n 0 {path} | head -n 1 &']
+            self.assertCmdResult(cmd, '[1]')
+            time.sleep(0.2)
+
+            # an incomplete line which ends inside a character
+            with open(path, 'ab') as f:
+                f.write(b'stale \xd0')
+            time.sleep(0.2)
+
+            with open(path, 'w') as f:
+                f.write('fresh\n')
+
+            self.assertCmdResult(['wait 1'], 'fresh')
+
+
+class MemLimitTestCase(CmdTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self._execCommands(['MEMLIMIT=1K'])
+
+    def test_limit(self):
+        self._execCommands(['echo'])
+        self.assertEqual(self.session.memory.limit, 1024)
+
+    def test_spilled_result(self):
+        p = self._getCorrectPath('/files/kafka.txt')
+
+        with open(p) as f:
+            gold = f.read().rstrip()
+
+        result = self.session.getCmdResult(f'cat {p}')
+
+        self.assertTrue(result.spilled)
+        self.assertEqual(result.getvalue().rstrip(), gold)
+
+    def test_async(self):
+        p = self._getCorrectPath('/files/kafka.txt')
+        cmd = ['ENGINE=async', f'cat {p} | tr a-z A-Z | sort | wc']
+        gold = self.getExternalResult('wc', [p]).split()[:3]
+
+        self.assertCmdResult(cmd, ' '.join(gold))
+
+
+class RedirectTestCase(CmdTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        tmpDir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpDir.cleanup)
+        self.tmp = tmpDir.name
+
+    def test_output(self):
+        cmd = [f'echo 42 > {self.tmp}/out', f'cat {self.tmp}/out']
+        self.assertCmdResult(cmd, '42')
+
+    def test_cached_file_changed(self):
+        cmd = [f'echo 42 > {self.tmp}/out', f'wc {self.tmp}/out',
+               f'echo 4343 > {self.tmp}/out', f'cat {self.tmp}/out']
+        self.assertCmdResult(cmd, '4343')
+
+    def test_append(self):
+        cmd = [f'echo 42 > {self.tmp}/out', f'echo 43 >> {self.tmp}/out',
+               f'cat {self.tmp}/out']
+        self.assertCmdResult(cmd, '4243')
+
+    def test_input(self):
+        p = self._getCorrectPath('/files/random')
+        self.assertCmdResult([f'wc < {p}'], '5 40 253')
+
+    def test_empty_input(self):
+        p = self._getCorrectPath('/files/empty')
+        self.assertCmdResult([f'cat < {p}'], '')
+
+    def test_external(self):
+        p = self._getCorrectPath('/files/random')
+        cmd = [f'tr a-z A-Z < {p} > {self.tmp}/out', f'cat {self.tmp}/out']
+
+        with open(p) as f:
+            gold = f.read().upper().rstrip()
+
+        self.assertCmdResult(cmd, gold)
+
+    def test_pipe_output(self):
+        cmd = [f'echo 42 > {self.tmp}/out | cat']
+        self.assertCmdResult(cmd, '')
+
+    def test_quoted_name(self):
+        cmd = [f'echo 42 > "{self.tmp}/a b"', f'cat < "{self.tmp}/a b"']
+        self.assertCmdResult(cmd, '42')
+
+    def test_variable_name(self):
+        cmd = [f'f={self.tmp}/out', 'echo 42 > $f', 'cat $f']
+        self.assertCmdResult(cmd, '42')
+
+
+class OptimizerTestCase(CmdTestCase):
+    def test_fused(self):
+        p = self._getCorrectPath('/files/random')
+        cmd = [f'cat {p} | cat | grep -i ad', f'cat {p} | wc']
+        gold = [self.getExternalResult('grep', ['-i', 'ad', p]), '5 40 253']
+
+        for line, result in zip(cmd, gold):
+            self.assertCmdResult([line], result)
+
+    def test_show_plan(self):
+        p = self._getCorrectPath('/files/random')
+        cmd = ['SHOWPLAN=1', f'cat {p} | wc']
+
+        with mock.patch('sys.stderr', new_callable=StringIO) as stderr:
+            self.assertCmdResult(cmd, '5 40 253')
+
+        self.assertEqual(stderr.getvalue(), f'+ wc < {p}\n')
+
+
+class BinaryTestCase(CmdTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        tmpDir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpDir.cleanup)
+        self.tmp = tmpDir.name
+
+    def _write(self, name: str, data: bytes) -> str:
+        path = os.path.join(self.tmp, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_passthrough(self):
+        data = bytes(range(256)) * 64
+        p = self._write('data', data)
+        out = f'{self.tmp}/out'
+
+        self._execCommands([f'tr a a < {p} | cat | head -c 100000 > {out}'])
+
+        with open(out, 'rb') as f:
+            self.assertEqual(f.read(), data)
+
+        result = self.session.getCmdResult(f'tr a a < {p} | tr b b')
+        self.assertEqual(
+            result.getvalue()[:-1].encode('utf-8', 'surrogateescape'), data)
+
+    def test_carriage_returns(self):
+        data = b'a\r\nb\rc\n\r\n' + bytes(range(256)) * 4
+        p = self._write('crlf', data)
+
+        for i, cmd in enumerate([f'cat < {p}', f'head -n 1000 {p}',
+                                 f'tr a a < {p} | cat']):
+            out = f'{self.tmp}/out{i}'
+            self._execCommands([f'{cmd} > {out}'])
+
+            with open(out, 'rb') as f:
+                self.assertEqual(f.read(), data, cmd)
+
+        result = self.session.getCmdResult(f'cat < {p} | head -n 2')
+        self.assertEqual(result.getvalue(), 'a\r\nb\rc\n\n')
+
+    def test_cached_carriage_returns(self):
+        data = b'a\r\nb\rc\n' + bytes(range(256)) * 4 + b'\n'
+        p = self._write('crlf', data)
+        out = f'{self.tmp}/out'
+
+        # the file is read through the cache, then from the input stream
+        for cmd in [f'wc {p}', f'head -n 1 {p}', f'tail -n 1 {p}',
+                    f'grep b {p}']:
+            cached = self._execCommands([f'cat {p} > {out}', cmd])
+            piped = self._execCommands([f'tr a a < {p} | {cmd[:-len(p)]}'])
+
+            self.assertEqual(cached.replace(f' {p}', ''), piped, cmd)
+
+        with open(out, 'rb') as f:
+            self.assertEqual(f.read(), data)
+
+    def test_not_utf8(self):
+        p = self._write('latin1', 'café\nnaïve x\nok\n'.encode('latin-1'))
+
+        result = self.session.getCmdResult(f'tr a a < {p} | grep -A 1 caf')
+
+        self.assertEqual(result.getvalue().encode('utf-8', 'surrogateescape'),
+                         'café\nnaïve x\n\n'.encode('latin-1'))
+        self.assertCmdResult([f'tr a a < {p} | wc'], '3 4 16')
+
+    def test_wc(self):
+        p = self._getCorrectPath('/files/random')
+        self.assertCmdResult([f'tr a a < {p} | wc'], '5 40 253')
+
+        p = self._write('seps', 'a\x1cb c\nя ю'.encode())
+        self.assertCmdResult([f'tr a a < {p} | wc'], '2 5 10')
+
+
+class LoopTestCase(CmdTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        tmpDir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpDir.cleanup)
+        self.path = os.path.join(tmpDir.name, 'lines.txt')
+
+        with open(self.path, 'w') as f:
+            f.write('a 1\nb 2 3\n\nc\n')
+
+    def test_for(self):
+        cmd = ['for i in 1 2 3; do echo $i; done']
+        self.assertCmdResult(cmd, '1\n2\n3')
+
+    def test_for_words(self):
+        cmd = ['w="x y"', 'for i in $w "$w" \'$w\'; do echo $i | wc; done']
+        self.assertCmdResult(cmd, '1 1 2\n1 1 2\n1 2 4\n1 1 3')
+
+    def test_variable(self):
+        cmd = ['for i in 1 2; do s=$i; done', 'echo $i $s']
+        self.assertCmdResult(cmd, '2 2')
+
+    def test_nested(self):
+        cmd = ['for a in 1 2; do for b in x y; do echo $a $b; done; done']
+        self.assertCmdResult(cmd, '1 x\n1 y\n2 x\n2 y')
+
+    def test_glob_each_iteration(self):
+        tmp = os.path.dirname(self.path)
+        cmd = [f'cd {tmp}', 'for i in 1 2; do echo > q$i; echo q*; done']
+        self.assertCmdResult(cmd, '\nq1\n\nq1 q2')
+
+    def test_while_file(self):
+        cmd = [f'while read a b; do echo $b $a; done < {self.path}']
+        self.assertCmdResult(cmd, '1 a\n2 3 b\n\nc')
+
+    def test_while_pipeline(self):
+        cmd = [f'cat {self.path} | while read a b; do echo $a; done']
+        self.assertCmdResult(cmd, 'a\nb\n\nc')
+
+        cmd = [f'cat {self.path} | sort | while read a; do echo $a; done']
+        self.assertCmdResult(cmd, '\na 1\nb 2 3\nc')
+
+    def test_while_builtin(self):
+        cmd = ['echo 1 2 | while read a; do echo $a | wc; done']
+        self.assertCmdResult(cmd, '1 2 4')
+
+    def test_while_console(self):
+        self.session.stdin = StringIO('x\ny\n')
+        cmd = ['while read l; do echo got $l; done']
+        self.assertCmdResult(cmd, 'got x\ngot y')
+
+    def test_async(self):
+        cmd = ['ENGINE=async', 'echo 1 | while read a; do echo $a; done',
+               'for i in 1 2; do echo $i; done']
+        self.assertCmdResult(cmd[:2], '1')
+        self.assertCmdResult(cmd[2:], '1\n2')
+
+    def test_background(self):
+        cmd = ['i=0', 'for i in 1 2; do echo $i; done &', 'wait']
+        self.assertCmdResult(cmd, '1\n2')
+        self.assertCmdResult(['echo $i'], '0')
+
+    def test_stopped(self):
+        cmd = ['for i in 1 2 3; do echo $i; done | head -n 1']
+        with self.assertRaises(SyntaxError):
+            self._execCommands(cmd)
+
+        output = self.session.streamCmdResult(
+            'for i in 1 2 3; do echo $i; done')
+        self.assertEqual(next(output), '1')
+        output.close()
+
+        self.assertEqual(self._execCommands(['echo $i']), '1')
+
+    def test_errors(self):
+        with self.assertRaises(FileNotFoundError):
+            self._execCommands(['while read a; do echo; done < nonexist'])
+
+        with self.assertRaises(SyntaxError):
+            self._execCommands(['for i in 1; do echo >; done'])
+
+
+class GlobTestCase(CmdTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        tmpDir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpDir.cleanup)
+        self.tmp = tmpDir.name
+
+        for name, text in [('a.txt', 'a 1\n'), ('b.txt', 'b 2\nb 3'),
+                           ('c.log', 'c\n')]:
+            with open(os.path.join(self.tmp, name), 'w') as f:
+                f.write(text)
+
+        self.session.getCmdResult(f'cd {self.tmp}')
+
+    def test_cat(self):
+        self.assertCmdResult(['cat *.txt c.log'], 'a 1\nb 2\nb 3c')
+
+    def test_wc(self):
+        self.assertCmdResult(['wc -l *.txt'], '1 a.txt\n2 b.txt\n3 total')
+
+    def test_grep(self):
+        self.assertCmdResult(['grep 3 *'], 'b.txt:b 3')
+
+    def test_quoted(self):
+        self.assertCmdResult(['echo "*.txt" \'?.log\''], '*.txt ?.log')
+
+    def test_no_match(self):
+        self.assertCmdResult(['echo *.py'], '*.py')
+
+    def test_for(self):
+        cmd = ['for f in *.txt; do echo $f; done']
+        self.assertCmdResult(cmd, 'a.txt\nb.txt')
+
+    def test_decl(self):
+        self.assertCmdResult(['x=*', 'echo $x'], '*')
+
+    def test_space(self):
+        with open(os.path.join(self.tmp, 'd e.txt'), 'w') as f:
+            f.write('d 4\n')
+
+        self.assertCmdResult(['wc -l *.txt'],
+                             '1 a.txt\n2 b.txt\n1 d e.txt\n4 total')
+        self.assertCmdResult(['ls d*'], 'd e.txt')
+        self.assertCmdResult(['cat d\\ e.txt'], 'd 4')
+
+
+class FindTestCase(CmdTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        tmpDir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpDir.cleanup)
+        self.tmp = tmpDir.name
+
+        for name in ['a.txt', 'd/b.txt', 'd/c.log']:
+            path = os.path.join(self.tmp, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write(name)
+
+        self.session.getCmdResult(f'cd {self.tmp}')
+
+    def test_find(self):
+        cmd = ['find | sort']
+        self.assertCmdResult(cmd, '.\n./a.txt\n./d\n./d/b.txt\n./d/c.log')
+
+    def test_tests(self):
+        cmd = ['find d -name "*.txt" -type f']
+        self.assertCmdResult(cmd, 'd/b.txt')
+
+        cmd = ['find . -maxdepth 1 -type d | sort']
+        self.assertCmdResult(cmd, '.\n./d')
+
+    def test_pipeline(self):
+        cmd = ['find . -type f | grep log | xargs cat']
+        self.assertCmdResult(cmd, 'd/c.log')
+
+        self.assertCmdResult(['find / | head -n 1'], '/')
+
+    def test_errors(self):
+        with self.assertRaises(FileNotFoundError):
+            self._execCommands(['find nonexist'])
+
+        with self.assertRaises(ValueError):
+            self._execCommands(['find -type q'])
+
+        with self.assertRaises(SyntaxError):
+            self._execCommands(['find -maxdepth x'])
+
+
+class TeeTestCase(CmdTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        tmpDir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpDir.cleanup)
+        self.tmp = tmpDir.name
+
+        self.session.getCmdResult(f'cd {self.tmp}')
+
+    def test_files(self):
+        cmd = ['echo 42 43 | tee a.txt b.txt']
+        self.assertCmdResult(cmd, '42 43')
+
+        self.assertCmdResult(['cat a.txt'], '42 43')
+        self.assertCmdResult(['cat b.txt'], '42 43')
+
+    def test_append(self):
+        cmd = ['echo 1 | tee a.txt', 'echo 2 | tee -a a.txt', 'cat a.txt']
+        self.assertCmdResult(cmd, '12')
+
+    def test_pipeline(self):
+        lines = '\n'.join(str(i) for i in range(1000))
+
+        with open(os.path.join(self.tmp, 'in.txt'), 'w') as f:
+            f.write(f'{lines}\n')
+
+        cmd = ['cat in.txt | tee a.txt b.txt | wc -l']
+        self.assertCmdResult(cmd, '1000')
+
+        self.assertCmdResult(['cat b.txt'], lines)
+        self.assertCmdResult(['tee c.txt < a.txt | head -n 2'], '0\n1')
+
+    def test_errors(self):
+        with self.assertRaises(FileNotFoundError):
+            self._execCommands(['echo 1 | tee nodir/a.txt'])
+
+        with self.assertRaises(SyntaxError):
+            self._execCommands(['tee -x a.txt'])
+
+
+class ChecksumTestCase(CmdTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        tmpDir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpDir.cleanup)
+        self.tmp = tmpDir.name
+
+        for name, data in [('a.bin', b'\x00\xff' * 1000), ('b.txt', b'42\n')]:
+            with open(os.path.join(self.tmp, name), 'wb') as f:
+                f.write(data)
+
+        self.session.getCmdResult(f'cd {self.tmp}')
+
+    def test_files(self):
+        data = [b'\x00\xff' * 1000, b'42\n']
+
+        for name, algorithm in [('sha256sum', 'sha256'), ('md5sum', 'md5'),
+                                ('b2sum', 'blake2b')]:
+            with self.subTest(name=name):
+                a, b = (hashlib.new(algorithm, d).hexdigest() for d in data)
+                self.assertCmdResult([f'{name} a.bin b.txt'],
+                                     f'{a}  a.bin\n{b}  b.txt')
+
+    def test_input(self):
+        digest = hashlib.sha256(b'\x00\xff' * 1000).hexdigest()
+
+        self.assertCmdResult(['cat a.bin | sha256sum'], f'{digest}  -')
+        self.assertCmdResult(['sha256sum < a.bin'], f'{digest}  -')
+
+    def test_stats(self):
+        self.session.getCmdResult('SHOWSTATS=1')
+
+        with mock.patch('sys.stderr', new_callable=StringIO) as stderr:
+            self.session.getCmdResult('md5sum a.bin b.txt')
+
+        self.assertRegex(stderr.getvalue(), r'^md5sum: 2 files, 0\.0 MB')
+
+    def test_errors(self):
+        with self.assertRaises(FileNotFoundError):
+            self._execCommands(['sha256sum b.txt nonexist'])
+
+        with self.assertRaises(SyntaxError):
+            self._execCommands(['md5sum -c sums.txt'])
+
+
+class SubstitutionTestCase(CmdTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        tmpDir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpDir.cleanup)
+        self.path = os.path.join(tmpDir.name, 'lines.txt')
+
+        with open(self.path, 'w') as f:
+            f.write('a 1\nb 2\nc\n')
+
+    def test_decl(self):
+        cmd = [f'n=$(wc -l < {self.path})', 'echo lines: $n']
+        self.assertCmdResult(cmd, 'lines: 3')
+
+    def test_args(self):
+        cmd = [f'grep $(echo b) {self.path}']
+        self.assertCmdResult(cmd, 'b 2')
+
+        cmd = ['echo "$(echo 1   2)" $(echo 3)']
+        self.assertCmdResult(cmd, '1 2 3')
+
+    def test_pipeline(self):
+        cmd = [f'echo $(cat {self.path} | grep a | wc -w) | wc']
+        self.assertCmdResult(cmd, '1 1 2')
+
+    def test_nested(self):
+        cmd = ['a=x', 'echo $(echo $(echo $a) y)']
+        self.assertCmdResult(cmd, 'x y')
+
+    def test_redirect(self):
+        name = os.path.join(os.path.dirname(self.path), 'out.txt')
+        cmd = [f'f={name}', 'echo 42 > $(echo $f)', f'cat {name}']
+        self.assertCmdResult(cmd, '42')
+
+    def test_for(self):
+        cmd = [f'for w in $(cat {self.path}); do echo -$w; done']
+        self.assertCmdResult(cmd, '-a\n-1\n-b\n-2\n-c')
+
+    def test_quoted(self):
+        self.assertCmdResult(['echo \'$(pwd)\''], '$(pwd)')
+
+    def test_errors(self):
+        with self.assertRaises(SyntaxError):
+            self._execCommands(['echo $(pwd'])
+
+        with self.assertRaises(FileNotFoundError):
+            self._execCommands(['echo $(cat nonexist)'])
+
+
 class ExternalTestCase(CmdTestCase):
     def test_cowsay(self):
         cmd = ['cowsay privetiki']
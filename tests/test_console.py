@@ -0,0 +1,100 @@
+import io
+import os
+import tempfile
+import unittest
+
+from src.console import StdinReader, openConsole
+from src.session import Session
+
+
+class StdinReaderTestCase(unittest.TestCase):
+    def _reader(self, data: bytes, blockSize: int = 4) -> StdinReader:
+        f = tempfile.TemporaryFile()
+        self.addCleanup(f.close)
+        f.write(data)
+        f.seek(0)
+
+        return StdinReader(f.fileno(), blockSize)
+
+    def test_readline(self):
+        reader = self._reader(b'first line\nsecond\nlast')
+
+        self.assertEqual(reader.readline(), 'first line\n')
+        self.assertEqual(reader.readline(), 'second\n')
+        self.assertEqual(reader.readline(), 'last')
+        self.assertEqual(reader.readline(), '')
+
+    def test_iter(self):
+        reader = self._reader(b'a\nbb\nccc\nno newline')
+
+        self.assertEqual(list(reader), ['a\n', 'bb\n', 'ccc\n', 'no newline'])
+        self.assertEqual(reader.readline(), '')
+
+    def test_iter_put_back(self):
+        reader = self._reader(b'cmd1\ndata1\ndata2\ncmd2\n', blockSize=64)
+
+        self.assertEqual(reader.readline(), 'cmd1\n')
+
+        lines = iter(reader)
+        self.assertEqual(next(lines), 'data1\n')
+        self.assertEqual(next(lines), 'data2\n')
+        lines.close()
+
+        self.assertEqual(reader.readline(), 'cmd2\n')
+        self.assertEqual(reader.readline(), '')
+
+    def test_chunks(self):
+        reader = self._reader(b'head\n' + b'x' * 100, blockSize=16)
+
+        self.assertEqual(reader.readline(), 'head\n')
+        self.assertEqual(b''.join(reader.chunks()), b'x' * 100)
+        self.assertEqual(reader.read(), '')
+
+    def test_read_undecodable(self):
+        reader = self._reader(b'ok\n\xff\xfe\n')
+
+        self.assertEqual(reader.read().encode('utf-8', 'surrogateescape'),
+                         b'ok\n\xff\xfe\n')
+
+    def test_open_console(self):
+        stream = io.StringIO('echo 1\n')
+        self.assertIs(openConsole(stream), stream)
+
+        with tempfile.TemporaryFile('w+') as f:
+            self.assertIsInstance(openConsole(f), StdinReader)
+
+
+class PipedSessionTestCase(unittest.TestCase):
+    def _session(self, data: str) -> Session:
+        read, write = os.pipe()
+        self.addCleanup(os.close, read)
+
+        with os.fdopen(write, 'w') as f:
+            f.write(data)
+
+        session = Session(stdin=StdinReader(read, 8))
+        self.addCleanup(session.endSession)
+
+        return session
+
+    def test_wc(self):
+        session = self._session('one two\nthree\n')
+        result = session.getCmdResult('wc').getvalue().split()
+
+        self.assertEqual(result, ['2', '3', '14'])
+
+    def test_grep(self):
+        session = self._session('a1\nb2\na3\n')
+        result = session.getCmdResult('grep a').getvalue().split()
+
+        self.assertEqual(result, ['a1', 'a3'])
+
+    def test_grep_pipe(self):
+        session = self._session('a1\nb2\na3\n')
+        result = session.getCmdResult('grep a | wc -l').getvalue().split()
+
+        self.assertEqual(result, ['2'])
+
+
+if __name__ == '__main__':
+    unittest.main()
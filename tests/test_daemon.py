@@ -0,0 +1,108 @@
+import io
+import os
+import socket
+import tempfile
+import threading
+import unittest
+
+from src.client import ERROR, readFrame, runCommands
+from src.daemon import ShellServer
+
+
+class DaemonTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        tmpDir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpDir.cleanup)
+        self.path = os.path.join(tmpDir.name, 'sd.sock')
+
+        self.server = ShellServer(self.path)
+        thread = threading.Thread(target=self.server.serve_forever,
+                                  kwargs={'poll_interval': 0.05})
+        thread.start()
+
+        def stop() -> None:
+            self.server.shutdown()
+            thread.join()
+            self.server.server_close()
+
+        self.addCleanup(stop)
+
+    def _run(self, lines: list[str], **kwargs) -> tuple[int, str, str]:
+        out, err = io.BytesIO(), io.BytesIO()
+        status = runCommands(lines, self.path, out, err, **kwargs)
+        return status, out.getvalue().decode(), err.getvalue().decode()
+
+    def test_command(self):
+        self.assertEqual(self._run(['echo 42 | wc']), (0, '1 1 3\n', ''))
+
+    def test_session(self):
+        status, out, _ = self._run(['a=42', 'echo $a', 'exit', 'echo 43'])
+
+        self.assertEqual(status, 0)
+        self.assertEqual(out, '42\n')
+
+    def test_isolation(self):
+        self._run(['a=42'])
+        self.assertEqual(self._run(['echo $a']), (0, '\n', ''))
+
+    def test_error(self):
+        status, out, err = self._run(['head -n x', 'echo 42'])
+
+        self.assertEqual(status, 1)
+        self.assertEqual(out, '42\n')
+        self.assertIn('head', err)
+
+    def test_socket(self):
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+
+        with self.assertRaises(OSError):
+            ShellServer(self.path)
+
+    def test_shared_file_cache(self):
+        p = os.path.join(os.path.dirname(__file__), 'files/random')
+
+        self._run([f'wc {p}'])
+
+        self.assertIsNotNone(self.server.fileCache.lookup(p))
+
+    def test_cwd_isolation(self):
+        self.assertEqual(self._run(['cd /', 'pwd']), (0, '\n/\n', ''))
+        self.assertEqual(self._run(['pwd']), (0, f'{os.getcwd()}\n', ''))
+
+    def test_console_input(self):
+        # the console of the daemon isn't read
+        self.assertEqual(self._run(['cat']), (0, '\n', ''))
+
+    def test_client_cwd(self):
+        files = os.path.join(os.path.dirname(__file__), 'files')
+
+        status, out, _ = self._run(['wc random', 'pwd'], cwd=files)
+
+        self.assertEqual(status, 0)
+        self.assertEqual(out, f'5 40 253 random\n{files}\n')
+
+    def test_client_env(self):
+        env = {'PATH': os.environ['PATH'], 'SD_VALUE': '42'}
+
+        status, out, _ = self._run(['printenv SD_VALUE'], env=env)
+
+        self.assertEqual(status, 0)
+        self.assertEqual(out.split(), ['42'])
+
+    def test_diagnostics(self):
+        p = os.path.join(os.path.dirname(__file__), 'files/random')
+
+        status, out, err = self._run(['SHOWPLAN=1', f'cat {p} | wc'])
+
+        self.assertEqual(status, 0)
+        self.assertEqual(out, '5 40 253\n')
+        self.assertEqual(err, f'+ wc < {p}\n')
+
+    def test_no_hello(self):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(self.path)
+            sock.sendall(b'echo 42\n')
+
+            kind, _ = readFrame(sock.makefile('rb'))
+
+        self.assertEqual(kind, ERROR)
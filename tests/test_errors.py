@@ -28,12 +28,12 @@ class ErrorTestCase(CmdTestCase):
     def test_cat2(self):
         p = ['cat foo goo']
         self.assertErrorMsgEquals(
-            p, 'cat: cat supports only one file, but given 2')
+            p, 'cat: foo: no such file')
 
     def test_wc1(self):
         p = ['wc foo goo']
         self.assertErrorMsgEquals(
-            p, 'wc: wc supports only one file, but given 2')
+            p, 'wc: foo: no such file')
 
     def test_grep_a_null(self):
         p = ['grep -A']
@@ -51,6 +51,70 @@ class ErrorTestCase(CmdTestCase):
             p, 'grep: UnknownFile: no such file'
         )
 
+    def test_hash_key(self):
+        p = ['hash -x']
+        self.assertErrorMsgEquals(p, 'hash: -x: Unknown key')
+
+    def test_hash_not_found(self):
+        p = ['hash ababab']
+        self.assertErrorMsgEquals(p, 'hash: ababab: not found')
+
+    def test_timeout_value(self):
+        p = ['TIMEOUT=abc', 'echo 42']
+        self.assertErrorMsgEquals(
+            p, 'TIMEOUT: a number must be, but found abc')
+
+    def test_wait_unknown(self):
+        p = ['wait 3']
+        self.assertErrorMsgEquals(p, 'wait: 3: no such job')
+
+    def test_redirect_no_file(self):
+        p = ['cat <']
+        self.assertErrorMsgEquals(
+            p, 'syntax error near unexpected token `newline\'')
+
+    def test_redirect_no_cmd(self):
+        p = ['> file']
+        self.assertErrorMsgEquals(
+            p, 'syntax error: a command is expected')
+
+    def test_xargs_builtin_args(self):
+        p = ['echo a | xargs head file']
+        self.assertErrorMsgEquals(
+            p, 'xargs: head: too many args for builtin')
+
+    def test_xargs_num(self):
+        p = ['xargs -P x']
+        self.assertErrorMsgEquals(
+            p, 'xargs: after "-P" key a number must be, but found x')
+
+    def test_sort_field(self):
+        p = ['sort -k x']
+        self.assertErrorMsgEquals(
+            p, 'sort: invalid field specification: x')
+
+    def test_sort_size(self):
+        p = ['sort -S 1X']
+        self.assertErrorMsgEquals(p, 'sort: invalid buffer size: 1X')
+
+    def test_memlimit(self):
+        p = ['MEMLIMIT=lots', 'echo']
+        self.assertErrorMsgEquals(
+            p, 'MEMLIMIT: a size must be, but found lots')
+
+    def test_head_keys(self):
+        p = ['head -n 1 -c 1']
+        self.assertErrorMsgEquals(
+            p, 'head: -n and -c can\'t be used together')
+
+    def test_head_file(self):
+        p = ['head -n 1 foo']
+        self.assertErrorMsgEquals(p, 'head: foo: no such file')
+
+    def test_tail_file(self):
+        p = ['tail -f foo']
+        self.assertErrorMsgEquals(p, 'tail: foo: no such file')
+
     def test_external1(self):
         p = ['ping foo']
         self.assertErrorMsgEquals(
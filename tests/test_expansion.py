@@ -48,3 +48,41 @@ class ExpansionTestCase(unittest.TestCase):
         state = {'x': 'ex', 'y': 'it'}
         gold = 'exit'
         self.assertExpansion(line, state, gold)
+
+    def test_substitution(self):
+        def substitute(line: str) -> str:
+            return f'<{line}>'
+
+        self.assertEqual(expansion('echo $(wc -l $f) "$(pwd)"', {'f': 'x'},
+                                   substitute),
+                         'echo <wc -l $f> <pwd>')
+        self.assertEqual(expansion('a=$b$(echo)', {'b': '1'}, substitute),
+                         'a=1<echo>')
+
+    def test_substitution_quoted(self):
+        line = 'echo \'$(pwd)\''
+        self.assertEqual(expansion(line, {}, lambda _: 'x'), 'echo $(pwd)')
+
+    def test_substitution_nested(self):
+        self.assertEqual(expansion('$(echo $(pwd))', {}, str.upper),
+                         'ECHO $(PWD)')
+
+    def test_no_substitute(self):
+        self.assertExpansion('echo $(pwd)', {}, 'echo $(pwd)')
+
+    def test_glob(self):
+        def glob(pattern: str) -> list[str]:
+            return {'*.txt': ['a.txt', 'b.txt'], 'x[*]*': ['x*y']} \
+                .get(pattern, [])
+
+        self.assertEqual(expansion('cat *.txt "*.txt" *.py', {}, glob=glob),
+                         'cat a.txt b.txt *.txt *.py')
+        self.assertEqual(expansion('echo "x*"*', {}, glob=glob), 'echo x*y')
+        self.assertEqual(expansion('echo $a', {'a': '*.txt'}, glob=glob),
+                         'echo *.txt')
+        self.assertExpansion('echo *.txt', {}, 'echo *.txt')
+
+    def test_glob_space(self):
+        self.assertEqual(
+            expansion('cat *.txt', {}, glob=lambda _: ['a b.txt', 'c.txt']),
+            'cat a\\ b.txt c.txt')
@@ -0,0 +1,93 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from src import fanout
+from src.fanout import FanOut
+
+
+class FanOutTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        tmpDir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpDir.cleanup)
+        self.tmp = tmpDir.name
+
+    def _paths(self, count: int) -> list[str]:
+        return [os.path.join(self.tmp, f'f{i}') for i in range(count)]
+
+    def _read(self, path: str) -> bytes:
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def test_parallel(self):
+        paths = self._paths(3)
+        chunks = [f'line {i}\n'.encode() for i in range(10000)]
+
+        with mock.patch.object(fanout, 'BLOCK_SIZE', 1000):
+            with FanOut(paths) as files:
+                for chunk in chunks:
+                    files.write(chunk)
+
+        for path in paths:
+            self.assertEqual(self._read(path), b''.join(chunks))
+
+    def test_serial(self):
+        paths = self._paths(2)
+
+        with FanOut(paths, parallel=False) as files:
+            files.write(b'abc')
+            files.write(b'\xff\n')
+
+        for path in paths:
+            self.assertEqual(self._read(path), b'abc\xff\n')
+
+    def test_append(self):
+        path, = self._paths(1)
+
+        with open(path, 'wb') as f:
+            f.write(b'old\n')
+
+        with FanOut([path], append=True) as files:
+            files.write(b'new\n')
+
+        self.assertEqual(self._read(path), b'old\nnew\n')
+
+    def test_open_error(self):
+        good, = self._paths(1)
+        bad = os.path.join(self.tmp, 'nodir', 'f')
+
+        with self.assertRaises(FileNotFoundError):
+            FanOut([good, bad])
+
+    def _waitFor(self, path: str, data: bytes) -> bytes:
+        deadline = time.monotonic() + 5
+
+        while self._read(path) != data and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        return self._read(path)
+
+    def test_stalled(self):
+        for parallel in (False, True):
+            paths = self._paths(2)
+
+            with FanOut(paths, parallel=parallel) as files:
+                files.write(b'first\n')
+                for path in paths:
+                    self.assertEqual(
+                        self._waitFor(path, b'first\n'), b'first\n')
+
+                files.write(b'second\n')
+
+            for path in paths:
+                self.assertEqual(self._read(path), b'first\nsecond\n')
+
+    def test_no_files(self):
+        with FanOut([]) as files:
+            files.write(b'data')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import os
+import tempfile
+import unittest
+
+from src.filecache import FileCache
+
+
+class FileCacheTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        tmpDir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpDir.cleanup)
+        self.tmp = tmpDir.name
+
+    def _write(self, name: str, text: str) -> str:
+        path = os.path.join(self.tmp, name)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def test_hit(self):
+        cache = FileCache()
+        path = self._write('a', 'x y\nz\n')
+
+        entry = cache.get(path)
+
+        self.assertEqual(entry.lines, ['x y\n', 'z\n'])
+        self.assertEqual(entry.counts, (2, 3, 6))
+        self.assertIs(cache.get(path), entry)
+
+    def test_carriage_returns(self):
+        cache = FileCache()
+        path = os.path.join(self.tmp, 'crlf')
+        with open(path, 'wb') as f:
+            f.write(b'a\r\nb\rc\n')
+
+        entry = cache.get(path)
+
+        self.assertEqual(entry.lines, ['a\r\n', 'b\rc\n'])
+        self.assertEqual(entry.counts, (2, 3, 7))
+
+    def test_changed(self):
+        cache = FileCache()
+        path = self._write('a', 'old\n')
+        cache.get(path)
+
+        self._write('a', 'newer\n')
+
+        self.assertEqual(cache.get(path).lines, ['newer\n'])
+
+    def test_replaced(self):
+        # the same size and time, but another inode
+        cache = FileCache()
+        path = self._write('a', 'old\n')
+        stat = os.stat(path)
+        cache.get(path)
+
+        other = self._write('b', 'new\n')
+        os.utime(other, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        os.replace(other, path)
+
+        self.assertEqual(cache.get(path).lines, ['new\n'])
+
+    def test_eviction(self):
+        # an entry takes about 1.1K, the cache keeps 4 of them
+        paths = [self._write(name, name * 1000) for name in 'abcde']
+        cache = FileCache(maxSize=4600)
+
+        for path in paths[:4]:
+            cache.get(path)
+
+        # `a` is used recently, so `b` is evicted
+        cache.get(paths[0])
+        cache.get(paths[4])
+
+        self.assertIsNotNone(cache.lookup(paths[0]))
+        self.assertIsNone(cache.lookup(paths[1]))
+        self.assertLessEqual(cache.size, 4600)
+
+    def test_large_file(self):
+        cache = FileCache(maxSize=100)
+        path = self._write('a', 'a' * 1000)
+
+        self.assertIsNone(cache.get(path))
+
+    def test_many_lines(self):
+        # the lines take much more memory than the file size
+        cache = FileCache(maxSize=40000)
+        small = self._write('a', 'x' * 1000)
+        lines = self._write('b', '1\n' * 2000)
+
+        cache.get(small)
+
+        self.assertIsNone(cache.get(lines))
+        self.assertIsNone(cache.get(lines))
+        self.assertIsNotNone(cache.lookup(small))
+
+        # a changed file is checked again
+        self._write('b', '1\n')
+        self.assertEqual(cache.get(lines).lines, ['1\n'])
+
+    def test_lookup(self):
+        cache = FileCache()
+        path = self._write('a', 'a\n')
+
+        self.assertIsNone(cache.lookup(path))
+        self.assertIsNone(cache.lookup(os.path.join(self.tmp, 'none')))
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import time
+import unittest
+
+from src.findtree import FindTests, walkTree
+
+
+class FindTreeTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        tmpDir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpDir.cleanup)
+        self.tmp = tmpDir.name
+
+        for name, size in [('a.txt', 10), ('d/b.txt', 2000),
+                           ('d/e/c.log', 0), ('f/g.txt', 600)]:
+            path = os.path.join(self.tmp, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write('x' * size)
+
+        os.symlink('a.txt', os.path.join(self.tmp, 'link'))
+
+        old = time.time() - 3 * 24 * 60 * 60
+        os.utime(os.path.join(self.tmp, 'd/b.txt'), (old, old))
+
+    def _find(self, maxDepth=None, workers=4, **tests) -> list[str]:
+        match = FindTests(**tests).matcher(time.time())
+        return sorted(walkTree('.', self.tmp, match, maxDepth, workers))
+
+    def test_all(self):
+        self.assertEqual(self._find(), ['.', './a.txt', './d', './d/b.txt',
+                                        './d/e', './d/e/c.log', './f',
+                                        './f/g.txt', './link'])
+
+    def test_name(self):
+        self.assertEqual(self._find(name='*.txt'),
+                         ['./a.txt', './d/b.txt', './f/g.txt'])
+        self.assertEqual(self._find(name='[cd]*'), ['./d', './d/e/c.log'])
+
+    def test_type(self):
+        self.assertEqual(self._find(kind='d'), ['.', './d', './d/e', './f'])
+        self.assertEqual(self._find(kind='l'), ['./link'])
+        self.assertEqual(self._find(kind='f', name='*.log'), ['./d/e/c.log'])
+
+    def test_size(self):
+        self.assertEqual(self._find(kind='f', size='+1'),
+                         ['./d/b.txt', './f/g.txt'])
+        self.assertEqual(self._find(kind='f', size='-2k'),
+                         ['./a.txt', './d/e/c.log', './f/g.txt'])
+        self.assertEqual(self._find(kind='f', size='10c'), ['./a.txt'])
+
+    def test_mtime(self):
+        self.assertEqual(self._find(mtime='+2'), ['./d/b.txt'])
+        self.assertNotIn('./d/b.txt', self._find(mtime='-1'))
+
+    def test_max_depth(self):
+        self.assertEqual(self._find(0), ['.'])
+        self.assertEqual(self._find(1, kind='f'), ['./a.txt'])
+
+    def test_one_worker(self):
+        self.assertEqual(self._find(workers=1), self._find())
+
+    def test_file_root(self):
+        path = os.path.join(self.tmp, 'a.txt')
+        match = FindTests().matcher(time.time())
+
+        self.assertEqual(list(walkTree('a.txt', path, match)), ['a.txt'])
+
+    def test_stopped(self):
+        match = FindTests().matcher(time.time())
+        paths = walkTree('.', self.tmp, match)
+
+        self.assertEqual(next(paths), '.')
+        paths.close()
+
+    def test_errors(self):
+        with self.assertRaises(FileNotFoundError):
+            next(walkTree('x', os.path.join(self.tmp, 'x'),
+                          FindTests().matcher(time.time())))
+
+        for tests in [{'kind': 'x'}, {'size': '1q'}, {'mtime': '+'}]:
+            with self.subTest(tests=tests):
+                with self.assertRaises(ValueError):
+                    FindTests(**tests)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import tempfile
+import time
+import unittest
+
+from src.globbing import DirCache, expandGlob
+
+
+class GlobTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        tmpDir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpDir.cleanup)
+        self.tmp = tmpDir.name
+
+        for name in ['a.txt', 'b.txt', 'c.log', '.hidden.txt',
+                     'sub/x.txt', 'sub/y.log', 'dir.txt/z.txt']:
+            path = os.path.join(self.tmp, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(path, 'w').close()
+
+        self.cache = DirCache()
+        self._age(self.tmp)
+
+    def _age(self, path: str) -> None:
+        # a directory changed just now isn't cached
+        old = time.time() - 60
+        os.utime(path, (old, old))
+
+    def _glob(self, pattern: str) -> list[str]:
+        return expandGlob(pattern, self.tmp, self.cache)
+
+    def test_simple(self):
+        self.assertEqual(self._glob('*.txt'), ['a.txt', 'b.txt', 'dir.txt'])
+        self.assertEqual(self._glob('?.log'), ['c.log'])
+        self.assertEqual(self._glob('[ab].*'), ['a.txt', 'b.txt'])
+        self.assertEqual(self._glob('[!ab]*'), ['c.log', 'dir.txt', 'sub'])
+
+    def test_no_match(self):
+        self.assertEqual(self._glob('*.py'), [])
+        self.assertEqual(self._glob('nodir/*'), [])
+
+    def test_hidden(self):
+        self.assertNotIn('.hidden.txt', self._glob('*'))
+        self.assertEqual(self._glob('.h*'), ['.hidden.txt'])
+
+    def test_dirs(self):
+        self.assertEqual(self._glob('*/*.txt'), ['dir.txt/z.txt', 'sub/x.txt'])
+        self.assertEqual(self._glob('s*/y.log'), ['sub/y.log'])
+        self.assertEqual(self._glob('s*/none'), [])
+        self.assertEqual(self._glob('*/'), ['dir.txt/', 'sub/'])
+
+    def test_absolute(self):
+        self.assertEqual(expandGlob(f'{self.tmp}/sub/*', '/'),
+                         [f'{self.tmp}/sub/x.txt', f'{self.tmp}/sub/y.log'])
+
+    def test_cached(self):
+        self._glob('*.txt')
+        self.assertEqual(len(self.cache), 1)
+
+        listing = self.cache.listdir(self.tmp)
+        self.assertIs(self.cache.listdir(self.tmp), listing)
+
+    def test_changed(self):
+        self._glob('*.txt')
+        open(os.path.join(self.tmp, 'new.txt'), 'w').close()
+
+        self.assertIn('new.txt', self._glob('*.txt'))
+
+    def test_recent(self):
+        # the listing may miss an entry added in the same clock tick
+        os.utime(self.tmp)
+        self._glob('*')
+
+        self.assertEqual(len(self.cache), 0)
+
+    def test_eviction(self):
+        cache = DirCache(maxSize=1)
+        self._age(os.path.join(self.tmp, 'sub'))
+
+        expandGlob('*', self.tmp, cache)
+        expandGlob('sub/*', self.tmp, cache)
+
+        self.assertEqual(len(cache), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
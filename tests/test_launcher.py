@@ -0,0 +1,55 @@
+import os
+import shutil
+import unittest
+
+from src import launcher
+
+
+class LauncherTestCase(unittest.TestCase):
+    def test_roundtrip(self):
+        # more than a pipe buffer in both directions
+        data = b'0123456789abcdef\n' * 100000
+        proc = launcher.spawn(shutil.which('cat'), ['cat'])
+
+        self.assertEqual(proc.communicate(data), data)
+        self.assertEqual(proc.returncode, 0)
+
+    def test_unread_input(self):
+        proc = launcher.spawn(shutil.which('true'), ['true'])
+        self.assertEqual(proc.communicate(b'x' * (1 << 20)), b'')
+
+    def test_argv(self):
+        proc = launcher.spawn(shutil.which('echo'), ['echo', 'a', 'b'])
+        self.assertEqual(proc.communicate(), b'a b\n')
+
+    def test_abstract(self):
+        with self.assertRaises(TypeError):
+            launcher.Process(shutil.which('true'), ['true'])
+
+    def test_not_found(self):
+        with self.assertRaises(FileNotFoundError) as cm:
+            launcher.spawn(None, ['ababab'])
+
+        self.assertEqual(str(cm.exception),
+                         '[Errno 2] No such file or directory: \'ababab\'')
+
+    def test_stdout_fd(self):
+        readEnd, writeEnd = os.pipe()
+        proc = launcher.spawn(shutil.which('echo'), ['echo', '42'],
+                              stdout=writeEnd)
+        os.close(writeEnd)
+
+        self.assertEqual(proc.communicate(), b'')
+        self.assertEqual(os.read(readEnd, 100), b'42\n')
+        os.close(readEnd)
+
+    def test_iterate_close(self):
+        proc = launcher.spawn(shutil.which('yes'), ['yes'])
+        output = proc.iterate()
+
+        self.assertTrue(next(output).startswith(b'y\n'))
+
+        output.close()
+        proc.close()
+
+        self.assertIsNotNone(proc.returncode)
@@ -0,0 +1,58 @@
+import os
+import unittest
+
+from src.clparser import getCmdParser, parseRedirects
+from src.optimizer import formatPlan, optimizePipeline
+
+
+class OptimizerTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.path = os.path.join(os.path.dirname(__file__), 'files/random')
+
+    def _plan(self, line: str) -> str:
+        cmds = [getCmdParser(*parseRedirects(c)) for c in line.split(' | ')]
+        return formatPlan(optimizePipeline(cmds))
+
+    def test_identity(self):
+        self.assertEqual(self._plan('echo 42 | cat'), 'echo 42')
+        self.assertEqual(self._plan('echo 42 | cat | cat | wc'),
+                         'echo 42 | wc')
+
+    def test_first_cat(self):
+        # it reads the console
+        self.assertEqual(self._plan('cat | wc'), 'cat | wc')
+
+    def test_file_arg(self):
+        p = self.path
+
+        self.assertEqual(self._plan(f'cat {p} | grep -i pat'),
+                         f'grep -i pat {p}')
+        self.assertEqual(self._plan(f'cat {p} | head -n 3'),
+                         f'head -n 3 {p}')
+        self.assertEqual(self._plan(f'cat {p} | cat | sort -r'),
+                         f'sort -r {p}')
+
+    def test_input_redirect(self):
+        p = self.path
+
+        self.assertEqual(self._plan(f'cat {p} | wc'), f'wc < {p}')
+        self.assertEqual(self._plan(f'cat {p} | tr a-z A-Z'),
+                         f'tr a-z A-Z < {p}')
+        self.assertEqual(self._plan(f'cat {p} | tail -f'),
+                         f'tail -f < {p}')
+        self.assertEqual(self._plan(f'cat {p} | grep -r pat'),
+                         f'grep -r pat < {p}')
+
+    def test_not_folded(self):
+        p = self.path
+
+        for line in [f'cat {p}.missing | wc', f'cat {p} | wc < {p}',
+                     f'cat {p} > {p}.out | wc']:
+            self.assertEqual(self._plan(line), line)
+
+    def test_unchanged_input(self):
+        cmds = [getCmdParser(f'cat {self.path}'), getCmdParser('grep pat')]
+
+        optimizePipeline(cmds)
+
+        self.assertEqual(cmds[1].args, ['pat'])
@@ -1,7 +1,11 @@
 import unittest
 
-from src.clparser import CmdIR, VarDecl, getCmdParser
-from src.clparser import parsePipes
+from src.clparser import CmdCache, CmdIR, LoopIR, VarDecl, getCmdParser
+from src.clparser import Redirect
+from src.clparser import parseBackground, parseLoop, parsePipes
+from src.clparser import parseRedirects, splitWords
+from src.executor import EchoExecutor, processCmd
+from src.registry import registry
 
 
 class VarDeclTestCase(unittest.TestCase):
@@ -66,6 +70,12 @@ class VarDeclTestCase(unittest.TestCase):
         self.assertDeclFalse('a=\'')
         self.assertDeclFalse('a="')
 
+    def test_substitution(self):
+        self.assertDeclTrue('n=$(wc -l < f)')
+        self.assertDeclTrue('n="$(echo 1 | wc)"')
+        self.assertDeclFalse('n=$(wc -l < f) | cat')
+        self.assertDeclFalse('n=$(echo')
+
 
 class CmdTestCase(unittest.TestCase):
     def assertCmdEqual(self, line: str, name: str,
@@ -117,6 +127,143 @@ class CmdTestCase(unittest.TestCase):
         self.assertCmdEqual(line, 'grep',
                             ['42', 'README.md'], {'-A': '10'})
 
+    def test_grep_recursive(self):
+        line = 'grep -r 42 src tests'
+        self.assertCmdEqual(line, 'grep', ['42', 'src', 'tests'], {'-r': ''})
+
+    def test_joined_flags(self):
+        line = 'hash -rt ls'
+        self.assertCmdEqual(line, 'hash', ['ls'], {'-r': '', '-t': ''})
+
+    def test_keys_first(self):
+        line = 'xargs -P 2 grep -i 42'
+        self.assertCmdEqual(line, 'xargs', ['grep', '-i', '42'], {'-P': '2'})
+
+    def test_find(self):
+        line = 'find src -size -10k -name *.py -maxdepth 2'
+        self.assertCmdEqual(line, 'find', ['src'],
+                            {'-size': '-10k', '-name': '*.py',
+                             '-maxdepth': '2'})
+
+    def test_double_dash(self):
+        line = 'hash -d -- -t'
+        self.assertCmdEqual(line, 'hash', ['-t'], {'-d': ''})
+
+
+class ImmutableIRTestCase(unittest.TestCase):
+    def test_immutable(self):
+        cmd = getCmdParser('grep -i 42 f.txt')
+
+        with self.assertRaises(AttributeError):
+            cmd.args = ['43']
+
+        with self.assertRaises(AttributeError):
+            cmd.extra = 1
+
+        self.assertFalse(hasattr(cmd, '__dict__'))
+
+    def test_replace(self):
+        cmd = getCmdParser('grep -w 42 f.txt')
+        other = cmd.replace(args=['43', 'f.txt'])
+
+        self.assertEqual(cmd.args, ['42', 'f.txt'])
+        self.assertEqual(str(other), 'grep -w 43 f.txt')
+        self.assertTrue(other.compiled[-1].search('43'))
+        self.assertFalse(other.compiled[-1].search('42'))
+
+    def test_eq_keys(self):
+        self.assertNotEqual(getCmdParser('grep -i 42'),
+                            getCmdParser('grep -w 42'))
+        self.assertEqual(getCmdParser('grep -iw 42'),
+                         getCmdParser('grep -i -w 42'))
+
+    def test_compiled_once(self):
+        cmd = getCmdParser('grep -i -A 2 4.')
+        first, second = processCmd(cmd), processCmd(cmd)
+
+        self.assertIs(first.regex, second.regex)
+        self.assertEqual((first.iKey, first.aKey), (True, 2))
+
+    def test_external(self):
+        self.assertIsNone(getCmdParser('ls -la').compiled)
+
+
+class CmdCacheTestCase(unittest.TestCase):
+    def test_parsed_once(self):
+        cache = CmdCache()
+        cmd = cache.parse('grep 42', [Redirect('<', 'f')])
+
+        self.assertIs(cache.parse('grep 42', [Redirect('<', 'f')]), cmd)
+        self.assertIsNot(cache.parse('grep 42'), cmd)
+        self.assertIsNot(cache.parse('grep 42', [Redirect('<', 'g')]), cmd)
+
+    def test_lru(self):
+        cache = CmdCache(maxSize=2)
+        cmd = cache.parse('echo 1')
+        cache.parse('echo 2')
+        cache.parse('echo 1')
+        cache.parse('echo 3')
+
+        self.assertEqual(len(cache), 2)
+        self.assertIs(cache.parse('echo 1'), cmd)
+
+    def test_registry_changed(self):
+        cache = CmdCache()
+        cmd = cache.parse('rev 42')
+
+        registry.register('rev', CmdIR, EchoExecutor)
+        self.addCleanup(registry.unregister, 'rev')
+
+        self.assertIsNot(cache.parse('rev 42'), cmd)
+
+    def test_syntax_error(self):
+        cache = CmdCache()
+
+        with self.assertRaises(SyntaxError):
+            cache.parse('grep -A x 42')
+
+        self.assertEqual(len(cache), 0)
+
+
+class LoopTestCase(unittest.TestCase):
+    def test_for(self):
+        loop = parseLoop('for i in 1 "2 3"; do echo $i | wc; x=$i; done')
+
+        self.assertEqual(loop, LoopIR('for', ('i',), '1 "2 3"',
+                                      ('echo $i | wc', 'x=$i')))
+
+    def test_while(self):
+        loop = parseLoop('cat f | while read -r a b; do echo $b; done')
+        self.assertEqual(loop, LoopIR('while', ('a', 'b'), '',
+                                      ('echo $b',), 'cat f'))
+
+        loop = parseLoop('while read l; do echo "a;b"; done < f.txt')
+        self.assertEqual(loop.body, ('echo "a;b"',))
+        self.assertEqual(loop.inputFile, 'f.txt')
+
+    def test_nested(self):
+        line = 'for a in 1 2; do for b in x; do echo $a $b; done; echo; done'
+        loop = parseLoop(line)
+
+        self.assertEqual(loop.body, (LoopIR('for', ('b',), 'x',
+                                            ('echo $a $b',)), 'echo'))
+        self.assertEqual(str(loop), line)
+
+    def test_not_loop(self):
+        self.assertIsNone(parseLoop('echo for; while'))
+        self.assertIsNone(parseLoop('a=1'))
+
+    def test_errors(self):
+        for line in ['for i 1 2; do echo; done', 'for i in 1; echo; done',
+                     'for i in 1; do echo', 'for i in 1; do done',
+                     'while read; do echo; done',
+                     'echo | for i in 1; do; done',
+                     'for i in 1; do echo; done > f',
+                     'for i in 1; do echo; done; echo']:
+            with self.subTest(line=line):
+                with self.assertRaises(SyntaxError):
+                    parseLoop(line)
+
 
 class PipesTestCase(unittest.TestCase):
     def assertPipeEqual(self, line: str, cmds: list[str]):
@@ -139,3 +286,83 @@ class PipesTestCase(unittest.TestCase):
         line = 'cat file.txt | grep -i 42'
         result = ['cat file.txt', 'grep -i 42']
         self.assertPipeEqual(line, result)
+
+
+class SubstitutionTestCase(unittest.TestCase):
+    def test_pipes(self):
+        line = 'echo $(cat f | wc) | grep "$(echo a | cat)"'
+        self.assertEqual(parsePipes(line),
+                         ['echo $(cat f | wc)', 'grep "$(echo a | cat)"'])
+
+    def test_redirects(self):
+        self.assertRedirects('echo $(cat < a) > $(echo b)',
+                             'echo $(cat < a)', [('>', '$(echo b)')])
+
+    def test_words(self):
+        self.assertEqual(splitWords('a $(echo b c) "d e" \'$(f\''),
+                         ['a', '$(echo b c)', '"d e"', '\'$(f\''])
+
+    def test_nested(self):
+        line = 'echo $(echo $(cat f | wc) ")") | wc'
+        self.assertEqual(parsePipes(line),
+                         ['echo $(echo $(cat f | wc) ")")', 'wc'])
+
+    def assertRedirects(self, line: str, cmd: str,
+                        redirects: list[tuple[str, str]]):
+        rest, parsed = parseRedirects(line)
+
+        self.assertEqual(rest, cmd)
+        self.assertEqual(parsed, [Redirect(op, t) for op, t in redirects])
+
+
+class BackgroundTestCase(unittest.TestCase):
+    def test_background(self):
+        self.assertEqual(parseBackground('sleep 1 &'), ('sleep 1', True))
+
+    def test_foreground(self):
+        self.assertEqual(parseBackground('sleep 1'), ('sleep 1', False))
+
+    def test_quoted(self):
+        line = 'echo "&"'
+        self.assertEqual(parseBackground(line), (line, False))
+
+    def test_pipe(self):
+        line = 'cat f | grep a &'
+        self.assertEqual(parseBackground(line), ('cat f | grep a', True))
+
+    def test_substitution(self):
+        line = 'echo $(sleep 1 &)'
+        self.assertEqual(parseBackground(line), (line, False))
+
+    def test_errors(self):
+        for line in ['&', 'echo &&', 'echo | &', 'echo $(cat']:
+            with self.assertRaises(SyntaxError):
+                parseBackground(line)
+
+
+class RedirectsTestCase(unittest.TestCase):
+    def assertRedirects(self, line: str, cmd: str,
+                        redirects: list[tuple[str, str]]):
+        rest, parsed = parseRedirects(line)
+
+        self.assertEqual(rest, cmd)
+        self.assertEqual(parsed, [Redirect(op, t) for op, t in redirects])
+
+    def test_simple(self):
+        self.assertRedirects('cat < a > b', 'cat', [('<', 'a'), ('>', 'b')])
+
+    def test_append(self):
+        self.assertRedirects('echo 42 >>log', 'echo 42', [('>>', 'log')])
+
+    def test_no_spaces(self):
+        self.assertRedirects('cat<a>b', 'cat', [('<', 'a'), ('>', 'b')])
+
+    def test_quoted(self):
+        self.assertRedirects('echo ">" \'<\'', 'echo ">" \'<\'', [])
+
+    def test_quoted_target(self):
+        self.assertRedirects('echo 1 > "a b"', 'echo 1', [('>', '"a b"')])
+
+    def test_no_target(self):
+        with self.assertRaises(SyntaxError):
+            parseRedirects('echo 42 >')
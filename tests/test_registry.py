@@ -0,0 +1,68 @@
+import io
+import unittest
+from importlib import metadata
+from unittest import mock
+
+from src.clparser import CmdIR, GrepIR, getCmdParser
+from src.executor import CmdExecutor, GrepExecutor, ExternalExecutor
+from src.executor import processCmd
+from src.registry import CmdRegistry, ENTRY_POINT_GROUP, registry
+from src.session import Session
+
+
+class RevExecutor(CmdExecutor):
+    def execute(self, istream: io.StringIO) -> io.StringIO:
+        ostream = io.StringIO()
+        ostream.write(' '.join(self.args)[::-1])
+        return ostream
+
+
+class RegistryTestCase(unittest.TestCase):
+    def test_builtin(self):
+        self.assertEqual(registry.lookup('grep'), (GrepIR, GrepExecutor))
+
+    def test_unknown(self):
+        self.assertIsNone(registry.lookup('definitely-not-a-builtin'))
+
+    def test_parser(self):
+        self.assertIsInstance(getCmdParser('grep -i a'), GrepIR)
+        self.assertIs(type(getCmdParser('ls -la')), CmdIR)
+
+    def test_external(self):
+        executor = processCmd(CmdIR('ls -la'))
+        self.assertIsInstance(executor, ExternalExecutor)
+
+    def test_register(self):
+        registry.register('rev', CmdIR, RevExecutor)
+        self.addCleanup(registry.unregister, 'rev')
+
+        result = Session().getCmdResult('rev abc')
+        self.assertEqual(result.getvalue().rstrip(), 'cba')
+
+
+class PluginTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        ep = metadata.EntryPoint(name='rev',
+                                 value='tests.test_registry:RevExecutor',
+                                 group=ENTRY_POINT_GROUP)
+        patcher = mock.patch('src.registry.metadata.entry_points',
+                             return_value={ENTRY_POINT_GROUP: [ep]})
+        self.entryPoints = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_lazy(self):
+        reg = CmdRegistry()
+        self.entryPoints.assert_not_called()
+
+        self.assertEqual(reg.lookup('rev'), (CmdIR, RevExecutor))
+        self.assertEqual(reg.lookup('echo')[1].__name__, 'EchoExecutor')
+        self.entryPoints.assert_called_once()
+
+    def test_builtin_wins(self):
+        reg = CmdRegistry(builtins={'rev': ('.clparser:CmdIR',
+                                            '.executor:EchoExecutor')})
+        self.assertEqual(reg.lookup('rev')[1].__name__, 'EchoExecutor')
+        self.entryPoints.assert_not_called()
+
+    def test_names(self):
+        self.assertIn('rev', CmdRegistry().names())
@@ -0,0 +1,111 @@
+import io
+import os
+import tempfile
+import time
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+from src.filecache import FileCache
+from src.session import Session
+
+SESSIONS: int = 32
+ROUNDS: int = 20
+
+
+class SessionLoadTestCase(unittest.TestCase):
+    """
+    Many sessions run at once in a thread pool, each one in its own
+    directory with its own variables and input; none of them
+    may see the state of another
+
+    """
+
+    def setUp(self) -> None:
+        tmpDir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpDir.cleanup)
+        self.tmp = os.path.realpath(tmpDir.name)
+        self.fileCache = FileCache()
+
+        for num in range(SESSIONS):
+            os.mkdir(os.path.join(self.tmp, str(num)))
+
+            with open(os.path.join(self.tmp, str(num), 'id.txt'), 'w') as f:
+                f.write(f'session {num}\n' * num)
+
+    def _result(self, session: Session, line: str) -> str:
+        return session.getCmdResult(line).getvalue().rstrip()
+
+    def _runSession(self, num: int) -> list[str]:
+        """
+        Returns:
+            list[str]: the mismatches of the session
+
+        """
+
+        session = Session(fileCache=self.fileCache,
+                          stdin=io.StringIO(f'stdin {num}\n'))
+        home = os.path.join(self.tmp, str(num))
+        errors: list[str] = []
+
+        def check(line: str, gold: str) -> None:
+            result = self._result(session, line)
+            if result != gold:
+                errors.append(f'{num}: {line}: {result!r} != {gold!r}')
+
+        try:
+            check(f'cd {home}', '')
+            check('cat', f'stdin {num}')
+
+            for i in range(ROUNDS):
+                check(f'id={num}-{i}', '')
+                check('pwd', home)
+                check('echo $id', f'{num}-{i}')
+                check('cat id.txt | wc',
+                      f'{num} {num * 2} {num * len(f"session {num}") + num}')
+                check('grep session id.txt | head -n 1',
+                      f'session {num}' if num else '')
+                check('echo $id > out.txt', '')
+                check('cat out.txt', f'{num}-{i}')
+        finally:
+            session.endSession()
+
+        return errors
+
+    def test_isolation(self):
+        cwd = os.getcwd()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            errors = sum(pool.map(self._runSession, range(SESSIONS)), [])
+
+        self.assertEqual(errors, [])
+        self.assertEqual(os.getcwd(), cwd)
+
+    def test_throughput(self):
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            errors = sum(pool.map(self._runSession, range(SESSIONS)), [])
+
+        elapsed = time.perf_counter() - start
+        cmds = SESSIONS * (2 + ROUNDS * 7)
+
+        self.assertEqual(errors, [])
+        # a loose bound: it catches sessions serialized by some lock
+        # or commands which block, not a slow machine
+        self.assertLess(elapsed / cmds, 0.05)
+
+    def test_external_env(self):
+        env = dict(os.environ, SD_VAR='1')
+        first, second = Session(env=env), Session(env=env)
+        self.addCleanup(first.endSession)
+        self.addCleanup(second.endSession)
+
+        self._result(first, 'SD_VAR=2')
+
+        self.assertEqual(self._result(first, 'printenv SD_VAR'), '2')
+        self.assertEqual(self._result(second, 'printenv SD_VAR'), '1')
+        self.assertNotIn('SD_VAR', os.environ)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import io
+import unittest
+
+from src.spillbuffer import MemoryBudget, SpillBuffer
+
+
+class SpillBufferTestCase(unittest.TestCase):
+    def test_memory(self):
+        buffer = SpillBuffer(spillSize=100)
+        buffer.write('abc\n')
+        buffer.write('def\n')
+
+        self.assertFalse(buffer.spilled)
+        self.assertEqual(buffer.getvalue(), 'abc\ndef\n')
+
+        buffer.seek(0)
+        self.assertEqual(list(buffer), ['abc\n', 'def\n'])
+
+    def test_spill(self):
+        buffer = SpillBuffer(spillSize=10)
+        buffer.write('abж\n' * 3)
+        buffer.write('tail')
+
+        self.assertTrue(buffer.spilled)
+        self.assertEqual(buffer.getvalue(), 'abж\n' * 3 + 'tail')
+
+        # the position is kept
+        buffer.write('!')
+        buffer.seek(0)
+        self.assertEqual(buffer.readline(), 'abж\n')
+        self.assertEqual(buffer.read()[-5:], 'tail!')
+
+    def test_budget(self):
+        budget = MemoryBudget(10)
+        first = SpillBuffer(budget)
+        second = SpillBuffer(budget)
+
+        first.write('x' * 8)
+        second.write('y' * 8)
+
+        self.assertFalse(first.spilled)
+        self.assertTrue(second.spilled)
+        self.assertEqual(budget.used, 8)
+
+        first.close()
+        self.assertEqual(budget.used, 0)
+
+    def test_seek_end(self):
+        buffer = SpillBuffer(spillSize=4)
+        buffer.write('abc')
+        buffer.seek(0)
+        buffer.seek(0, io.SEEK_END)
+        buffer.write('def')
+
+        self.assertEqual(buffer.getvalue(), 'abcdef')
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+
+from src import trigram
+
+
+class PatternTrigramsTestCase(unittest.TestCase):
+    def _trigrams(self, *words: str) -> set:
+        return {int.from_bytes(w.encode(), 'big') for w in words}
+
+    def test_literal(self):
+        self.assertEqual(trigram.patternTrigrams('Abcd'),
+                         self._trigrams('abc', 'bcd'))
+
+    def test_regex(self):
+        # `x?` and the class break the literals
+        self.assertEqual(trigram.patternTrigrams('abx?[0-9]cde(fgh)'),
+                         self._trigrams('cde', 'fgh'))
+
+    def test_no_literals(self):
+        self.assertEqual(trigram.patternTrigrams('ab|cd'), set())
+        self.assertEqual(trigram.patternTrigrams('(abc'), set())
+
+    def test_ignore_case(self):
+        self.assertEqual(trigram.patternTrigrams('ЖЖab', ignoreCase=True),
+                         set())
+
+
+class TrigramIndexTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        tmpDir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpDir.cleanup)
+        self.root = tmpDir.name
+
+        os.mkdir(os.path.join(self.root, 'sub'))
+        self._write('a.txt', b'hello world\n')
+        self._write('sub/b.txt', b'goodbye world\n')
+        self._write('bin', b'hello\0world')
+
+    def _write(self, rel: str, data: bytes) -> None:
+        with open(os.path.join(self.root, rel), 'wb') as f:
+            f.write(data)
+
+    def test_candidates(self):
+        index, updated = trigram.TrigramIndex.build(self.root)
+
+        self.assertEqual(updated, 3)
+        self.assertEqual(index.candidates('hello'), {'a.txt'})
+        self.assertEqual(index.candidates('WORLD', ignoreCase=True),
+                         {'a.txt', os.path.join('sub', 'b.txt')})
+        self.assertEqual(index.candidates('absent'), set())
+
+    def test_load(self):
+        trigram.TrigramIndex.build(self.root)
+        index = trigram.TrigramIndex.load(self.root)
+
+        self.assertEqual(index.candidates('odby.'),
+                         {os.path.join('sub', 'b.txt')})
+        self.assertEqual(index.candidates('.*'),
+                         {'a.txt', os.path.join('sub', 'b.txt')})
+
+    def test_incremental(self):
+        trigram.TrigramIndex.build(self.root)
+        self._write('a.txt', b'changed\n')
+        os.utime(os.path.join(self.root, 'a.txt'), ns=(0, 0))
+
+        index, updated = trigram.TrigramIndex.build(self.root)
+
+        self.assertEqual(updated, 1)
+        self.assertEqual(index.candidates('hello'), set())
+        self.assertEqual(index.candidates('good'),
+                         {os.path.join('sub', 'b.txt')})
+
+    def test_not_indexed(self):
+        self.assertIsNone(trigram.TrigramIndex.load(self.root))
+
+        self._write(trigram.INDEX_NAME, b'garbage')
+        self.assertIsNone(trigram.TrigramIndex.load(self.root))